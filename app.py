@@ -1,10 +1,50 @@
 """
 Sistema de Geracao de Orcamentos - Brasil UP
 """
+import os
+import tempfile
+import threading
+from functools import wraps
+
 import streamlit as st
-import json
 from datetime import datetime, timedelta
-import requests
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from armazenamento import NumeroEmUso, obter_cache_leituras
+from cliente_http import Resultado
+from consultas import obter_consulta_cnpj, obter_resolvedor_cep
+from dinheiro import (
+    formatar_centavos,
+    formatar_moeda,
+    novo_item,
+    preco_item,
+    reais,
+    total_orcamento,
+    totalizar,
+    valor_item,
+)
+from editor_itens import (
+    COLUNA_DESCRICAO,
+    COLUNA_PRECO_UNITARIO,
+    COLUNA_QUANTIDADE,
+    COLUNA_REMOVER,
+    COLUNA_VALOR,
+    aplicar_edicao,
+    linhas_itens,
+)
+from grade_tamanhos import (
+    COLUNA_PRECO,
+    COLUNA_PRODUTO,
+    MAX_ERROS,
+    entradas_do_editor,
+    ler_csv_grade,
+    linhas_editor,
+    montar_itens_grade,
+    tamanhos_digitados,
+)
+from indice_clientes import obter_indice_clientes
+from instrumentacao import medido, medir, obter_instrumentacao
+from repositorio import obter_repositorio
 
 # Configuracao da pagina
 st.set_page_config(
@@ -80,44 +120,30 @@ st.markdown("""
 
 # === FUNCOES DE DADOS ===
 
-@st.cache_data
+# Persistencia via repositorio (SALESFLOW_BACKEND=json|sqlite)
+
+# Sugestoes no "Selecionar Cliente Cadastrado"
+MAX_SUGESTOES_CLIENTE = 20
+
+@medido("carregar_catalogo")
 def carregar_catalogo():
-    with open("catalogo.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Catalogo com indices (categorias, nomes, SKU, grades), refeito so quando muda."""
+    return obter_repositorio().carregar_catalogo()
 
 def salvar_catalogo(catalogo):
-    with open("catalogo.json", "w", encoding="utf-8") as f:
-        json.dump(catalogo, f, ensure_ascii=False, indent=2)
+    obter_repositorio().salvar_catalogo(catalogo)
 
+@medido("carregar_clientes")
 def carregar_clientes():
-    try:
-        with open("clientes.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Garante que tenha a estrutura correta
-            if "pessoas" not in data:
-                data["pessoas"] = []
-            return data
-    except:
-        return {"empresas": [], "pessoas": []}
+    return obter_repositorio().carregar_clientes()
 
 def salvar_clientes(clientes):
-    with open("clientes.json", "w", encoding="utf-8") as f:
-        json.dump(clientes, f, ensure_ascii=False, indent=2)
+    obter_repositorio().salvar_clientes(clientes)
 
-def consultar_cnpj(cnpj: str) -> dict:
-    """Consulta CNPJ na BrasilAPI (gratuita)."""
-    cnpj_limpo = "".join(filter(str.isdigit, cnpj))
-    if len(cnpj_limpo) != 14:
-        return None
-
-    try:
-        url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj_limpo}"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except:
-        return None
+@medido("consulta_cnpj")
+def consultar_cnpj(cnpj: str) -> Resultado:
+    """Consulta CNPJ na BrasilAPI (gratuita), com cache em memoria e disco."""
+    return obter_consulta_cnpj().consultar(cnpj)
 
 def formatar_cnpj(cnpj: str) -> str:
     """Formata CNPJ: 00.000.000/0000-00"""
@@ -126,87 +152,139 @@ def formatar_cnpj(cnpj: str) -> str:
         return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
     return cnpj
 
-def consultar_cep(cep: str) -> dict:
-    """Consulta CEP na ViaCEP (gratuita)."""
-    cep_limpo = "".join(filter(str.isdigit, cep))
-    if len(cep_limpo) != 8:
-        return None
-    try:
-        url = f"https://viacep.com.br/ws/{cep_limpo}/json/"
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            dados = response.json()
-            if "erro" not in dados:
-                return dados
-        return None
-    except:
-        return None
-
+@medido("consulta_cep")
+def consultar_cep(cep: str) -> Resultado:
+    """Consulta CEP: cache, tabela local e, por ultimo, ViaCEP (gratuita)."""
+    return obter_resolvedor_cep().consultar(cep)
+
+def mensagem_erro_consulta(resultado, nome):
+    """Texto para o usuario a partir do motivo da falha da consulta."""
+    if resultado.erro == "invalido":
+        return f"{nome} invalido."
+    if resultado.erro == "nao_encontrado":
+        return f"{nome} nao encontrado."
+    if resultado.erro == "circuito_aberto":
+        return "Servico de consulta fora do ar. Tente novamente em alguns segundos."
+    return f"Falha ao consultar {nome} ({resultado.erro}). Tente novamente."
+
+@medido("carregar_orcamentos")
 def carregar_orcamentos():
     """Carrega orcamentos salvos."""
-    try:
-        with open("orcamentos.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {"orcamentos": [], "sequencia": {}}
+    return obter_repositorio().carregar_orcamentos()
 
 def salvar_orcamentos(data):
     """Salva orcamentos."""
-    with open("orcamentos.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    obter_repositorio().salvar_orcamentos(data)
 
 def gerar_numero_orcamento():
     """
-    Gera numero ORS sequencial: ORS + MM + sequencia (comeca em 100)
-    Ex: Janeiro -> ORS01100, ORS01101...
-        Fevereiro -> ORS02100, ORS02101...
+    Gera numero ORS sequencial: ORS + AA + MM + sequencia (comeca em 100)
+    Ex: Janeiro/2026 -> ORS2601100, ORS2601101...
+        Fevereiro/2026 -> ORS2602100, ORS2602101...
+    Chamar apenas quando o orcamento for de fato salvo.
     """
-    data = carregar_orcamentos()
-    mes_atual = datetime.now().strftime("%m")  # "01", "02", etc.
-
-    # Pega a sequencia do mes atual (comeca em 100)
-    seq = data["sequencia"].get(mes_atual, 99) + 1
-    data["sequencia"][mes_atual] = seq
-    salvar_orcamentos(data)
-
-    return f"ORS{mes_atual}{seq:03d}"
-
-def salvar_orcamento(dados_orcamento):
-    """Salva um orcamento completo."""
-    data = carregar_orcamentos()
-
-    # Verifica se ja existe (para edicao)
-    existe = False
-    for i, orc in enumerate(data["orcamentos"]):
-        if orc["numero"] == dados_orcamento["numero"]:
-            data["orcamentos"][i] = dados_orcamento
-            existe = True
-            break
-
-    if not existe:
-        data["orcamentos"].append(dados_orcamento)
+    return obter_repositorio().proximo_numero()
 
-    salvar_orcamentos(data)
+def salvar_orcamento(dados_orcamento, novo=False):
+    """Salva um orcamento completo (cria ou substitui pelo numero; novo=True nunca substitui)."""
+    obter_repositorio().salvar_orcamento(dados_orcamento, novo=novo)
 
+@medido("buscar_orcamento")
 def buscar_orcamento(numero):
-    """Busca orcamento pelo numero."""
-    data = carregar_orcamentos()
-    for orc in data["orcamentos"]:
-        if orc["numero"] == numero:
-            return orc
-    return None
+    """Busca orcamento pelo numero (indice/chave primaria, O(1))."""
+    return obter_repositorio().buscar_orcamento(numero)
 
+@medido("listar_orcamentos")
 def listar_orcamentos():
-    """Lista todos os orcamentos."""
-    data = carregar_orcamentos()
-    return data["orcamentos"]
+    """Lista numero, cliente e data de todos os orcamentos (sem itens)."""
+    return obter_repositorio().resumo_orcamentos()
+
+def aquecer_modulos():
+    """Importa fpdf2/PIL, decodifica o logo e abre o cliente HTTP e os caches."""
+    from gerar_pdf import aquecer_assets
+    aquecer_assets()
+    obter_consulta_cnpj()
+    obter_resolvedor_cep()
+
+@st.cache_resource
+def aquecer_em_segundo_plano():
+    """Uma vez por processo, depois da primeira pagina: tira os imports pesados do cold start."""
+    thread = threading.Thread(target=aquecer_modulos, name="aquecimento", daemon=True)
+    thread.start()
+    return thread
+
+# === SECOES (FRAGMENTOS) ===
+
+def rerun_parcial():
+    """True se este rerun e so de uma secao (widget dentro de um st.fragment)."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def refazer_secao():
+    """Reroda so a secao atual num rerun parcial; num rerun completo, o app."""
+    st.rerun(scope="fragment" if rerun_parcial() else "app")
+
+def secao(nome):
+    """
+    Secao que reroda sozinha (st.fragment) quando um widget dela muda, medida
+    no span `nome`. O topo do app.py nao roda num rerun parcial: a secao abre
+    e fecha o rerun da instrumentacao ("rerun_parcial").
+    """
+    def decorar(funcao):
+        medida = medido(nome)(funcao)
+
+        @st.fragment
+        @wraps(funcao)
+        def fragmento():
+            if not rerun_parcial():
+                return medida()
+            obter_cache_leituras().inicio_rerun()
+            obter_instrumentacao().inicio_rerun("rerun_parcial")
+            try:
+                return medida()
+            finally:
+                obter_instrumentacao().fim_rerun()
+        return fragmento
+    return decorar
 
-def formatar_moeda(valor):
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+# === PDF EM SEGUNDO PLANO ===
 
-# Carrega dados
-catalogo = carregar_catalogo()
-clientes_data = carregar_clientes()
+# Quanto o rerun espera pelo PDF antes de mostrar o status e consultar de novo
+ESPERA_PDF = 0.5
+
+def mostrar_pdf(dados, rotulo, key):
+    """
+    Botao de download do PDF de `dados`, renderizado na fila_pdf. Enquanto o
+    PDF nao fica pronto, mostra o status e refaz o rerun (polling).
+    Retorna True quando o trabalho terminou (pronto ou erro).
+    """
+    from fila_pdf import ESTADO_ERRO, ESTADO_NA_FILA, FilaCheia, obter_fila_pdf
+    try:
+        trabalho = obter_fila_pdf().enviar(dados)
+    except FilaCheia:
+        st.warning("Muitos PDFs sendo gerados agora. Tente de novo em instantes.")
+        st.button("🔄 Tentar de novo", use_container_width=True, key=f"{key}_tentar")
+        return False
+    if not trabalho.aguardar(ESPERA_PDF):
+        situacao = "na fila" if trabalho.estado == ESTADO_NA_FILA else "sendo gerado"
+        st.info(f"⏳ PDF {situacao} ({trabalho.itens} itens, {trabalho.segundos:.0f}s)...")
+        refazer_secao()
+    if trabalho.estado == ESTADO_ERRO:
+        st.error(f"Erro ao gerar PDF: {trabalho.erro}")
+    else:
+        st.download_button(
+            label=rotulo,
+            data=trabalho.pdf,
+            file_name=f"Cotacao_{dados['numero']}.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+            key=key,
+        )
+    return True
+
+# Contadores do cache de leituras e spans valem por rerun (cada secao carrega o catalogo)
+obter_cache_leituras().inicio_rerun()
+obter_instrumentacao().inicio_rerun()
 
 # === INTERFACE ===
 
@@ -229,6 +307,10 @@ if "numero_orcamento" not in st.session_state:
     st.session_state.numero_orcamento = None
 if "editando" not in st.session_state:
     st.session_state.editando = False
+if "versao_itens" not in st.session_state:
+    st.session_state.versao_itens = 0  # key do editor de itens: zera as edicoes aplicadas
+if "versao_grade" not in st.session_state:
+    st.session_state.versao_grade = 0  # muda a key dos widgets da grade: limpa apos adicionar
 
 # Tabs principais
 tab_orcamento, tab_editar, tab_clientes, tab_produtos = st.tabs([
@@ -239,25 +321,32 @@ tab_orcamento, tab_editar, tab_clientes, tab_produtos = st.tabs([
 ])
 
 # === TAB EDITAR ORCAMENTO ===
-with tab_editar:
+@secao("aba_editar")
+def secao_editar():
+    catalogo = carregar_catalogo()
     st.subheader("✏️ Editar Orcamento Existente")
 
     # Busca por numero
     col_busca1, col_busca2 = st.columns([3, 1])
     with col_busca1:
-        busca_numero = st.text_input("Buscar por numero", placeholder="Ex: ORS01100", key="busca_ors")
+        busca_numero = st.text_input("Buscar por numero", placeholder="Ex: ORS2601100", key="busca_ors")
     with col_busca2:
         st.write("")
         st.write("")
         btn_buscar = st.button("🔍 Buscar", use_container_width=True)
 
     orc = None
+    numero_busca = busca_numero.upper().strip()
 
-    # Busca por numero digitado
-    if btn_buscar and busca_numero:
-        orc = buscar_orcamento(busca_numero.upper().strip())
+    # Busca por numero digitado. O numero achado fica na sessao: os reruns
+    # seguintes (polling do PDF, "Carregar para Edicao") mostram o mesmo orcamento
+    if btn_buscar and numero_busca:
+        orc = buscar_orcamento(numero_busca)
+        st.session_state.orc_buscado = numero_busca if orc else None
         if not orc:
             st.error(f"Orcamento '{busca_numero}' nao encontrado.")
+    elif numero_busca and st.session_state.get("orc_buscado") == numero_busca:
+        orc = buscar_orcamento(numero_busca)
 
     st.divider()
 
@@ -266,7 +355,7 @@ with tab_editar:
     if orcamentos:
         # Lista de orcamentos para selecionar
         opcoes = ["-- Selecione da lista --"] + [
-            f"{o['numero']} - {o['cliente']['nome']} ({o['data']})"
+            f"{o['numero']} - {o['cliente']} ({o['data']})"
             for o in reversed(orcamentos)
         ]
 
@@ -284,14 +373,14 @@ with tab_editar:
         **Numero:** {orc['numero']}
         **Cliente:** {orc['cliente']['nome']}
         **Data:** {orc['data']}
-        **Total:** {formatar_moeda(orc['total'])}
+        **Total:** {formatar_centavos(total_orcamento(orc))}
         **Itens:** {len(orc['itens'])}
         """)
 
         # Mostra itens
         st.markdown("**Itens do Orcamento:**")
         for item in orc["itens"]:
-            st.write(f"• {item['descricao']} - {item['quantidade']:.0f} x {formatar_moeda(item['preco_unitario'])} = {formatar_moeda(item['valor_total'])}")
+            st.write(f"• {item['descricao']} - {item['quantidade']:.0f} x {formatar_centavos(preco_item(item))} = {formatar_centavos(valor_item(item))}")
 
         st.divider()
 
@@ -320,28 +409,75 @@ with tab_editar:
                 st.session_state.obs_orcamento = orc.get("observacoes", "")
 
                 st.toast(f"Orcamento {orc['numero']} carregado!")
-                st.info("👆 Agora va para a aba **'Criar Orcamento'** para editar e gerar novo PDF.")
+                st.rerun()  # app inteiro: a aba "Criar Orcamento" mostra o que foi carregado
 
         with col2:
-            # Gerar PDF direto
-            from gerar_pdf import gerar_pdf_orcamento
-            try:
-                pdf_bytes = gerar_pdf_orcamento(orc)
-                st.download_button(
-                    label="📄 Baixar PDF",
-                    data=pdf_bytes,
-                    file_name=f"Cotacao_{orc['numero']}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-            except Exception as e:
-                st.error(f"Erro: {e}")
+            # PDF pela fila (em cache: reruns nao renderizam de novo)
+            mostrar_pdf(orc, "📄 Baixar PDF", key="download_editar")
+
+        if st.session_state.editando and st.session_state.numero_orcamento == orc["numero"]:
+            st.info("👆 Agora va para a aba **'Criar Orcamento'** para editar e gerar novo PDF.")
 
     elif not orcamentos:
         st.info("Nenhum orcamento salvo ainda. Crie um orcamento na aba 'Criar Orcamento'.")
 
+    # Exportacao em lote (ZIP com um PDF por orcamento)
+    if orcamentos:
+        with st.expander("📦 Exportar PDFs em lote"):
+            col_lote1, col_lote2 = st.columns(2)
+            with col_lote1:
+                lote_periodo = st.date_input(
+                    "Periodo",
+                    value=(datetime.now().date() - timedelta(days=30), datetime.now().date()),
+                    format="DD/MM/YYYY",
+                    key="lote_periodo"
+                )
+                lote_cliente = st.text_input("Cliente (nome ou CPF/CNPJ)", key="lote_cliente")
+            with col_lote2:
+                lote_vendedor = st.selectbox("Vendedor", ["Todos"] + catalogo["vendedores"], key="lote_vendedor")
+
+            if st.button("📦 Gerar ZIP", key="btn_lote"):
+                from exportar_lote import exportar_zip, selecionar_orcamentos
+                inicio_lote = lote_periodo[0] if lote_periodo else None
+                fim_lote = lote_periodo[-1] if lote_periodo else None
+                selecionados = selecionar_orcamentos(
+                    inicio_lote.isoformat() if inicio_lote else None,
+                    fim_lote.isoformat() if fim_lote else None,
+                    None if lote_vendedor == "Todos" else lote_vendedor,
+                    lote_cliente.strip() or None,
+                )
+                if not selecionados:
+                    st.warning("Nenhum orcamento no filtro.")
+                else:
+                    barra = st.progress(0.0, text=f"0/{len(selecionados)} PDFs")
+                    # Arquivo proprio por exportacao: sessoes do mesmo processo nao se cruzam
+                    with tempfile.NamedTemporaryFile(prefix="salesflow_lote_", suffix=".zip", delete=False) as f:
+                        caminho_zip = f.name
+                    try:
+                        exportar_zip(
+                            selecionados, caminho_zip,
+                            progresso=lambda feitos, total: barra.progress(feitos / total, text=f"{feitos}/{total} PDFs")
+                        )
+                        with open(caminho_zip, "rb") as f:
+                            st.session_state.lote_zip = f.read()
+                    finally:
+                        os.remove(caminho_zip)
+
+            if st.session_state.get("lote_zip"):
+                st.download_button(
+                    label="⬇️ Baixar ZIP",
+                    data=st.session_state.lote_zip,
+                    file_name=f"Cotacoes_{datetime.now():%Y%m%d}.zip",
+                    mime="application/zip",
+                    key="download_lote"
+                )
+
+with tab_editar:
+    secao_editar()
+
 # === TAB CADASTRO DE CLIENTES ===
-with tab_clientes:
+@secao("aba_clientes")
+def secao_clientes():
     tipo_cliente = st.radio("Tipo de Cliente", ["🏢 Pessoa Juridica (PJ)", "👤 Pessoa Fisica (PF)"], horizontal=True, key="tipo_cliente")
 
     if tipo_cliente == "🏢 Pessoa Juridica (PJ)":
@@ -358,8 +494,9 @@ with tab_clientes:
 
         if btn_consultar and cnpj_input:
             with st.spinner("Consultando CNPJ na Receita Federal..."):
-                dados = consultar_cnpj(cnpj_input)
-                if dados:
+                resultado = consultar_cnpj(cnpj_input)
+                if resultado:
+                    dados = resultado.dados
                     st.session_state.dados_cnpj = dados
                     st.session_state.emp_razao = dados.get("razao_social", "")
                     st.session_state.emp_fantasia = dados.get("nome_fantasia", "")
@@ -375,9 +512,9 @@ with tab_clientes:
                     st.session_state.emp_uf = dados.get("uf", "") or ""
                     st.session_state.emp_cep = str(dados.get("cep", "")) if dados.get("cep") else ""
                     st.success("CNPJ encontrado!")
-                    st.rerun()
+                    refazer_secao()
                 else:
-                    st.error("CNPJ nao encontrado ou invalido.")
+                    st.error(mensagem_erro_consulta(resultado, "CNPJ"))
 
         st.divider()
 
@@ -426,7 +563,6 @@ with tab_clientes:
         if st.button("💾 Salvar Empresa", use_container_width=True, type="primary"):
             if emp_razao and contato_nome:
                 nova_empresa = {
-                    "id": len(clientes_data["empresas"]) + 1,
                     "tipo": "PJ",
                     "razao_social": emp_razao,
                     "nome_fantasia": emp_fantasia,
@@ -451,8 +587,7 @@ with tab_clientes:
                     }],
                     "data_cadastro": datetime.now().strftime("%Y-%m-%d %H:%M")
                 }
-                clientes_data["empresas"].append(nova_empresa)
-                salvar_clientes(clientes_data)
+                obter_repositorio().adicionar_cliente(nova_empresa)
                 st.success(f"Empresa '{emp_razao}' cadastrada!")
                 st.session_state.dados_cnpj = None
                 for key in ["emp_razao", "emp_fantasia", "emp_cnpj", "emp_email", "emp_telefone",
@@ -461,7 +596,7 @@ with tab_clientes:
                             "cont_email", "cont_tel", "cnpj_consulta"]:
                     if key in st.session_state:
                         del st.session_state[key]
-                st.rerun()
+                st.rerun()  # app inteiro: a busca de clientes do orcamento ve o novo
             else:
                 st.error("Preencha a Razao Social e o Nome do Contato.")
 
@@ -492,16 +627,17 @@ with tab_clientes:
 
         if btn_cep and pf_cep:
             with st.spinner("Buscando endereco..."):
-                dados_cep = consultar_cep(pf_cep)
-                if dados_cep:
+                resultado = consultar_cep(pf_cep)
+                if resultado:
+                    dados_cep = resultado.dados
                     st.session_state.pf_log = dados_cep.get("logradouro", "")
                     st.session_state.pf_bairro = dados_cep.get("bairro", "")
                     st.session_state.pf_cidade = dados_cep.get("localidade", "")
                     st.session_state.pf_uf = dados_cep.get("uf", "")
                     st.success("Endereco encontrado!")
-                    st.rerun()
+                    refazer_secao()
                 else:
-                    st.error("CEP nao encontrado.")
+                    st.error(mensagem_erro_consulta(resultado, "CEP"))
 
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
@@ -524,7 +660,6 @@ with tab_clientes:
         if st.button("💾 Salvar Cliente PF", use_container_width=True, type="primary"):
             if pf_nome and pf_telefone:
                 nova_pessoa = {
-                    "id": len(clientes_data.get("pessoas", [])) + 1,
                     "tipo": "PF",
                     "nome": pf_nome,
                     "cpf": pf_cpf,
@@ -543,60 +678,95 @@ with tab_clientes:
                     },
                     "data_cadastro": datetime.now().strftime("%Y-%m-%d %H:%M")
                 }
-                if "pessoas" not in clientes_data:
-                    clientes_data["pessoas"] = []
-                clientes_data["pessoas"].append(nova_pessoa)
-                salvar_clientes(clientes_data)
+                obter_repositorio().adicionar_cliente(nova_pessoa)
                 st.success(f"Cliente '{pf_nome}' cadastrado!")
                 for key in ["pf_nome", "pf_cpf", "pf_rg", "pf_email", "pf_telefone",
                             "pf_whatsapp", "pf_log", "pf_num", "pf_comp", "pf_bairro",
                             "pf_cidade", "pf_uf", "pf_cep"]:
                     if key in st.session_state:
                         del st.session_state[key]
-                st.rerun()
+                st.rerun()  # app inteiro: a busca de clientes do orcamento ve o novo
             else:
                 st.error("Preencha o Nome e Telefone.")
 
     # === LISTA DE CLIENTES CADASTRADOS ===
+    # Paginada no repositorio: o custo do rerun depende do tamanho da pagina, nao da base
     st.divider()
     st.subheader("📋 Clientes Cadastrados")
 
-    # Empresas (PJ)
-    if clientes_data["empresas"]:
-        for emp in clientes_data["empresas"]:
-            with st.expander(f"🏢 {emp['razao_social']} - {emp.get('cnpj', 'Sem CNPJ')}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Nome Fantasia:** {emp.get('nome_fantasia', '-')}")
-                    st.write(f"**E-mail:** {emp.get('email', '-')}")
-                    st.write(f"**Telefone:** {emp.get('telefone', '-')}")
-                with col2:
-                    end = emp.get("endereco", {})
-                    st.write(f"**Endereco:** {end.get('logradouro', '')}, {end.get('numero', '')}")
-                    st.write(f"**Cidade:** {end.get('cidade', '')} - {end.get('uf', '')}")
-                st.markdown("**Contatos:**")
-                for cont in emp.get("contatos", []):
-                    st.write(f"- {cont['nome']} ({cont.get('cargo', '-')}) - {cont.get('telefone', '')}")
-
-    # Pessoas (PF)
-    if clientes_data.get("pessoas"):
-        for pf in clientes_data["pessoas"]:
-            with st.expander(f"👤 {pf['nome']} - {pf.get('cpf', 'Sem CPF')}"):
+    CLIENTES_POR_PAGINA = 20
+
+    def reiniciar_pagina_clientes():
+        st.session_state.pagina_clientes = 1
+
+    busca_cliente = st.text_input(
+        "Buscar cliente", placeholder="Nome, CNPJ ou CPF", key="busca_cliente",
+        on_change=reiniciar_pagina_clientes
+    )
+    pagina_cli = st.session_state.get("pagina_clientes", 1)
+    resumos_cli, total_cli = obter_repositorio().pagina_clientes(busca_cliente.strip(), pagina_cli, CLIENTES_POR_PAGINA)
+    paginas_cli = max(1, -(-total_cli // CLIENTES_POR_PAGINA))
+    if pagina_cli > paginas_cli:
+        pagina_cli = st.session_state.pagina_clientes = paginas_cli
+        resumos_cli, total_cli = obter_repositorio().pagina_clientes(busca_cliente.strip(), pagina_cli, CLIENTES_POR_PAGINA)
+
+    if resumos_cli:
+        st.dataframe(
+            [
+                {"Tipo": "🏢 PJ" if r["tipo"] == "PJ" else "👤 PF", "Nome": r["nome"],
+                 "Documento": r["documento"] or "-", "Cidade": r["cidade"] or "-"}
+                for r in resumos_cli
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            st.number_input(f"Pagina (de {paginas_cli})", min_value=1, max_value=paginas_cli, step=1, key="pagina_clientes")
+        with col2:
+            inicio_cli = (pagina_cli - 1) * CLIENTES_POR_PAGINA
+            st.caption(f"Mostrando {inicio_cli + 1}-{inicio_cli + len(resumos_cli)} de {total_cli} clientes")
+
+        # Detalhes so do cliente escolhido (carregado pelo id)
+        rotulos_cli = {(r["tipo"], r["id"]): f"{'🏢' if r['tipo'] == 'PJ' else '👤'} {r['nome']} - {r['documento'] or 'Sem documento'}"
+                       for r in resumos_cli}
+        sel_cli = st.selectbox(
+            "Ver detalhes", [None] + list(rotulos_cli),
+            format_func=lambda chave: "-- Selecione --" if chave is None else rotulos_cli[chave],
+            key="detalhe_cliente"
+        )
+        cli = obter_repositorio().buscar_cliente(*sel_cli) if sel_cli else None
+        if cli:
+            with st.container(border=True):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**CPF:** {pf.get('cpf', '-')}")
-                    st.write(f"**E-mail:** {pf.get('email', '-')}")
-                    st.write(f"**Telefone:** {pf.get('telefone', '-')}")
+                    if sel_cli[0] == "PJ":
+                        st.write(f"**Nome Fantasia:** {cli.get('nome_fantasia', '-')}")
+                    else:
+                        st.write(f"**CPF:** {cli.get('cpf', '-')}")
+                    st.write(f"**E-mail:** {cli.get('email', '-')}")
+                    st.write(f"**Telefone:** {cli.get('telefone', '-')}")
                 with col2:
-                    end = pf.get("endereco", {})
+                    end = cli.get("endereco", {})
                     st.write(f"**Endereco:** {end.get('logradouro', '')}, {end.get('numero', '')}")
                     st.write(f"**Cidade:** {end.get('cidade', '')} - {end.get('uf', '')}")
-
-    if not clientes_data["empresas"] and not clientes_data.get("pessoas"):
+                if sel_cli[0] == "PJ":
+                    st.markdown("**Contatos:**")
+                    for cont in cli.get("contatos", []):
+                        st.write(f"- {cont['nome']} ({cont.get('cargo', '-')}) - {cont.get('telefone', '')}")
+    elif busca_cliente.strip():
+        st.info("Nenhum cliente encontrado.")
+    else:
         st.info("Nenhum cliente cadastrado ainda.")
 
+with tab_clientes:
+    secao_clientes()
+
 # === TAB CADASTRO DE PRODUTOS ===
-with tab_produtos:
+@secao("aba_produtos")
+def secao_produtos():
+    catalogo = carregar_catalogo()
     st.subheader("Cadastrar Novo Produto")
 
     col1, col2 = st.columns(2)
@@ -613,292 +783,387 @@ with tab_produtos:
                 "nome": novo_nome.upper(),
                 "preco": novo_preco
             }
-            catalogo["produtos"].append(novo_produto)
-            salvar_catalogo(catalogo)
+            obter_repositorio().adicionar_produto(novo_produto)
             st.success(f"Produto '{novo_nome}' cadastrado com sucesso!")
-            st.cache_data.clear()
-            st.rerun()
+            st.rerun()  # app inteiro: o catalogo da aba do orcamento muda
         else:
             st.error("Preencha categoria e nome do produto.")
 
     st.divider()
     st.subheader("Produtos Cadastrados")
 
-    categorias_prod = sorted(set(p["categoria"] for p in catalogo["produtos"]))
-    for cat in categorias_prod:
+    for cat in catalogo.categorias:
         with st.expander(f"📁 {cat}"):
-            produtos_cat = [p for p in catalogo["produtos"] if p["categoria"] == cat]
-            for p in produtos_cat:
+            for p in catalogo.produtos_da_categoria(cat):
                 st.write(f"• {p['nome']} - {formatar_moeda(p['preco'])}")
 
+with tab_produtos:
+    secao_produtos()
+
 # === TAB ORCAMENTO ===
 
 # Callback para preencher campos quando cliente é selecionado
 def preencher_dados_cliente():
-    cliente_sel = st.session_state.sel_cliente
-    if cliente_sel == "-- Novo Cliente --":
+    chave = st.session_state.sel_cliente
+    cliente = obter_indice_clientes().por_id.get(chave) if chave else None
+    if cliente is None:
         for key in ["cli_nome", "cli_contato", "cli_end", "cli_cidade", "cli_cep", "cli_cnpj"]:
             if key in st.session_state:
                 st.session_state[key] = ""
         st.session_state.cli_uf = "MG"
+        return
+
+    end = cliente.get("endereco", {})
+    logr = end.get("logradouro", "")
+    num = end.get("numero", "")
+    if chave[0] == "PJ":
+        st.session_state.cli_nome = cliente.get("razao_social", "")
+        contatos = cliente.get("contatos", [])
+        st.session_state.cli_contato = contatos[0]["nome"] if contatos else ""
+        st.session_state.cli_cnpj = cliente.get("cnpj", "")
     else:
-        clientes = carregar_clientes()
-        # Tenta encontrar em empresas (PJ)
-        emp = next((e for e in clientes["empresas"] if f"🏢 {e['razao_social']}" == cliente_sel), None)
-        if emp:
-            st.session_state.cli_nome = emp.get("razao_social", "")
-            contatos = emp.get("contatos", [])
-            st.session_state.cli_contato = contatos[0]["nome"] if contatos else ""
-            end = emp.get("endereco", {})
-            logr = end.get("logradouro", "")
-            num = end.get("numero", "")
-            st.session_state.cli_end = f"{logr}, {num}".strip(", ") if logr or num else ""
-            st.session_state.cli_cidade = end.get("cidade", "")
-            st.session_state.cli_cep = end.get("cep", "")
-            st.session_state.cli_cnpj = emp.get("cnpj", "")
-            ufs = ["MG", "SP", "RJ", "ES", "BA", "GO", "DF", "PR", "SC", "RS", "Outro"]
-            uf_emp = end.get("uf", "MG")
-            st.session_state.cli_uf = uf_emp if uf_emp in ufs else "MG"
-        else:
-            # Tenta encontrar em pessoas (PF)
-            pf = next((p for p in clientes.get("pessoas", []) if f"👤 {p['nome']}" == cliente_sel), None)
-            if pf:
-                st.session_state.cli_nome = pf.get("nome", "")
-                st.session_state.cli_contato = ""
-                end = pf.get("endereco", {})
-                logr = end.get("logradouro", "")
-                num = end.get("numero", "")
-                st.session_state.cli_end = f"{logr}, {num}".strip(", ") if logr or num else ""
-                st.session_state.cli_cidade = end.get("cidade", "")
-                st.session_state.cli_cep = end.get("cep", "")
-                st.session_state.cli_cnpj = pf.get("cpf", "")
-                ufs = ["MG", "SP", "RJ", "ES", "BA", "GO", "DF", "PR", "SC", "RS", "Outro"]
-                uf_pf = end.get("uf", "MG")
-                st.session_state.cli_uf = uf_pf if uf_pf in ufs else "MG"
+        st.session_state.cli_nome = cliente.get("nome", "")
+        st.session_state.cli_contato = ""
+        st.session_state.cli_cnpj = cliente.get("cpf", "")
+    st.session_state.cli_end = f"{logr}, {num}".strip(", ") if logr or num else ""
+    st.session_state.cli_cidade = end.get("cidade", "")
+    st.session_state.cli_cep = end.get("cep", "")
+    ufs = ["MG", "SP", "RJ", "ES", "BA", "GO", "DF", "PR", "SC", "RS", "Outro"]
+    uf_cli = end.get("uf", "MG")
+    st.session_state.cli_uf = uf_cli if uf_cli in ufs else "MG"
+
+@medido("secao_cliente")
+def secao_cliente():
+    catalogo = carregar_catalogo()
+    st.subheader("📋 Dados do Cliente")
+
+    # Busca no indice de clientes (refeito so quando a base muda)
+    with medir("indice_clientes"):
+        indice_clientes = obter_indice_clientes()
+    busca_cli = st.text_input(
+        "Buscar cliente cadastrado", placeholder="Razao social, nome fantasia, CNPJ ou CPF", key="busca_cli_orc"
+    )
+    opcoes_cli = [None] + indice_clientes.buscar(busca_cli, limite=MAX_SUGESTOES_CLIENTE)
+    if st.session_state.get("sel_cliente") not in opcoes_cli:
+        st.session_state.sel_cliente = None
+
+    st.selectbox(
+        "Selecionar Cliente Cadastrado",
+        opcoes_cli,
+        format_func=lambda chave: "-- Novo Cliente --" if chave is None else indice_clientes.rotulo(chave),
+        key="sel_cliente",
+        on_change=preencher_dados_cliente
+    )
+
+    st.text_input("Nome / Razao Social *", key="cli_nome")
+    st.text_input("Contato", key="cli_contato")
+    st.text_input("Endereco", key="cli_end")
 
-with tab_orcamento:
-    col_form, col_preview = st.columns([1, 1])
+    col1, col2 = st.columns(2)
+    with col1:
+        st.text_input("Cidade", key="cli_cidade")
+        st.text_input("CEP", key="cli_cep")
+    with col2:
+        ufs = ["MG", "SP", "RJ", "ES", "BA", "GO", "DF", "PR", "SC", "RS", "Outro"]
+        st.selectbox("Estado", ufs, key="cli_uf")
+        st.text_input("CPF/CNPJ", key="cli_cnpj")
 
-    with col_form:
-        st.subheader("📋 Dados do Cliente")
+    st.divider()
+    st.subheader("📝 Dados do Orcamento")
 
-        # Recarrega clientes (pode ter sido atualizado)
-        clientes_data = carregar_clientes()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.selectbox("Vendedor", catalogo["vendedores"], key="vendedor")
+        data_orcamento = st.date_input("Data", datetime.now(), key="data_orc")
+    with col2:
+        validade_dias = st.number_input("Validade (dias)", value=catalogo["validade_dias"], min_value=1, key="validade")
+        data_expiracao = data_orcamento + timedelta(days=validade_dias)
+        st.text_input("Expiracao", value=data_expiracao.strftime("%d/%m/%Y"), disabled=True, key="exp")
 
-        # Monta lista de clientes (PJ + PF)
-        lista_clientes = ["-- Novo Cliente --"]
-        lista_clientes += [f"🏢 {e['razao_social']}" for e in clientes_data["empresas"]]
-        lista_clientes += [f"👤 {p['nome']}" for p in clientes_data.get("pessoas", [])]
+@medido("secao_itens")
+def secao_itens():
+    catalogo = carregar_catalogo()
+    st.divider()
+    st.subheader("🛒 Adicionar Produtos")
 
-        cliente_selecionado = st.selectbox(
-            "Selecionar Cliente Cadastrado",
-            lista_clientes,
-            key="sel_cliente",
-            on_change=preencher_dados_cliente
-        )
+    modo_adicao = st.radio("Modo", ["Catalogo", "Grade de Tamanhos", "Produto Avulso"], horizontal=True, key="modo")
+
+    if modo_adicao == "Catalogo":
+        categoria_sel = st.selectbox("Categoria", catalogo.categorias, key="cat_sel")
+        produto_sel = st.selectbox("Produto", catalogo.nomes_da_categoria(categoria_sel), key="prod_sel")
+        produto_dados = catalogo.produto(produto_sel) if produto_sel else None
 
-        cliente_nome = st.text_input("Nome / Razao Social *", key="cli_nome")
-        cliente_contato = st.text_input("Contato", key="cli_contato")
-        cliente_endereco = st.text_input("Endereco", key="cli_end")
+        if produto_dados:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                grade = catalogo.grade(categoria_sel)
+                if grade:
+                    tamanho_sel = st.selectbox("Tamanho", grade, key="tam_grade")
+                else:
+                    tamanho_sel = st.text_input("Tamanho", value="M", key="tam_sel")
+            with col2:
+                quantidade = st.number_input("Quantidade", value=1, min_value=1, key="qtd")
+            with col3:
+                preco_unit = st.number_input(
+                    "Preco Unitario (R$)",
+                    value=produto_dados["preco"],
+                    format="%.2f",
+                    key="preco_unit",
+                    help="Altere se necessario"
+                )
+
+            descricao_final = f"{produto_sel} {tamanho_sel}"
+
+    elif modo_adicao == "Grade de Tamanhos":
+        # Matriz produto x tamanho inteira num clique: valida tudo e entra de uma vez
+        versao = st.session_state.versao_grade
+        origem = st.radio("Entrada", ["Tabela", "CSV"], horizontal=True, key="origem_grade")
+        erros_grade = []
+
+        if origem == "Tabela":
+            categoria_grade = st.selectbox("Categoria", catalogo.categorias, key="cat_grade")
+            tamanhos = catalogo.grade(categoria_grade)
+            if not tamanhos:
+                tamanhos = tamanhos_digitados(
+                    st.text_input("Tamanhos (separados por virgula)", value="P, M, G, GG", key="tams_livres")
+                )
+            colunas = {
+                COLUNA_PRODUTO: st.column_config.TextColumn(COLUNA_PRODUTO, disabled=True, width="large"),
+                COLUNA_PRECO: st.column_config.NumberColumn(COLUNA_PRECO, min_value=0.01, format="%.2f"),
+            }
+            colunas.update(
+                (t, st.column_config.NumberColumn(t, min_value=0, step=1, format="%d")) for t in tamanhos
+            )
+            registros = st.data_editor(
+                linhas_editor(catalogo, categoria_grade, tamanhos),
+                column_config=colunas,
+                hide_index=True,
+                use_container_width=True,
+                key=f"editor_grade_{versao}_{categoria_grade}_{'|'.join(tamanhos)}",
+            )
+            entradas = entradas_do_editor(registros, tamanhos)
+        else:
+            arquivo_csv = st.file_uploader("Arquivo CSV", type=["csv", "txt"], key=f"csv_grade_{versao}")
+            texto_csv = st.text_area(
+                "Ou cole o CSV",
+                placeholder="produto;tamanho;quantidade[;preco]  ou  produto;P;M;G;GG",
+                height=120,
+                key=f"texto_grade_{versao}",
+            )
+            conteudo = arquivo_csv.getvalue().decode("utf-8-sig") if arquivo_csv else texto_csv
+            entradas, erros_grade = ler_csv_grade(conteudo)
+
+        itens_grade, erros = montar_itens_grade(catalogo, entradas)
+        erros_grade += erros
+        if erros_grade:
+            st.error("\n\n".join(erros_grade[:MAX_ERROS]) + (
+                f"\n\n... e mais {len(erros_grade) - MAX_ERROS} erro(s)" if len(erros_grade) > MAX_ERROS else ""
+            ))
+        elif itens_grade:
+            resumo_grade = totalizar(itens_grade)
+            st.caption(
+                f"{len(itens_grade)} itens, {resumo_grade.pecas:.0f} pecas, {formatar_centavos(resumo_grade.total)}"
+            )
+
+        if st.button(
+            "➕ Adicionar Grade", use_container_width=True, key="btn_add_grade",
+            disabled=not itens_grade or bool(erros_grade),
+        ):
+            st.session_state.itens.extend(itens_grade)
+            st.session_state.versao_grade += 1
+            st.success(f"{len(itens_grade)} itens adicionados")
+            refazer_secao()
 
+    else:
         col1, col2 = st.columns(2)
         with col1:
-            cliente_cidade = st.text_input("Cidade", key="cli_cidade")
-            cliente_cep = st.text_input("CEP", key="cli_cep")
+            descricao_final = st.text_input("Descricao do Produto", key="desc_avulso").upper()
         with col2:
-            ufs = ["MG", "SP", "RJ", "ES", "BA", "GO", "DF", "PR", "SC", "RS", "Outro"]
-            cliente_estado = st.selectbox("Estado", ufs, key="cli_uf")
-            cliente_cnpj = st.text_input("CPF/CNPJ", key="cli_cnpj")
+            tamanho_sel = st.text_input("Tamanho", value="", key="tam_avulso")
 
-        st.divider()
-        st.subheader("📝 Dados do Orcamento")
+        if tamanho_sel:
+            descricao_final = f"{descricao_final} {tamanho_sel}"
 
         col1, col2 = st.columns(2)
         with col1:
-            vendedor = st.selectbox("Vendedor", catalogo["vendedores"], key="vendedor")
-            data_orcamento = st.date_input("Data", datetime.now(), key="data_orc")
+            quantidade = st.number_input("Quantidade", value=1, min_value=1, key="qtd_avulso")
         with col2:
-            validade_dias = st.number_input("Validade (dias)", value=catalogo["validade_dias"], min_value=1, key="validade")
-            data_expiracao = data_orcamento + timedelta(days=validade_dias)
-            st.text_input("Expiracao", value=data_expiracao.strftime("%d/%m/%Y"), disabled=True, key="exp")
-
-        st.divider()
-        st.subheader("🛒 Adicionar Produtos")
-
-        modo_adicao = st.radio("Modo", ["Catalogo", "Produto Avulso"], horizontal=True, key="modo")
-
-        if modo_adicao == "Catalogo":
-            categorias = sorted(set(p["categoria"] for p in catalogo["produtos"]))
-            categoria_sel = st.selectbox("Categoria", categorias, key="cat_sel")
-
-            produtos_cat = [p for p in catalogo["produtos"] if p["categoria"] == categoria_sel]
-            produto_nomes = [p["nome"] for p in produtos_cat]
-            produto_sel = st.selectbox("Produto", produto_nomes, key="prod_sel")
-
-            produto_dados = next((p for p in produtos_cat if p["nome"] == produto_sel), None)
-
-            if produto_dados:
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    tamanho_sel = st.text_input("Tamanho", value="M", key="tam_sel")
-                with col2:
-                    quantidade = st.number_input("Quantidade", value=1, min_value=1, key="qtd")
-                with col3:
-                    preco_unit = st.number_input(
-                        "Preco Unitario (R$)",
-                        value=produto_dados["preco"],
-                        format="%.2f",
-                        key="preco_unit",
-                        help="Altere se necessario"
-                    )
-
-                descricao_final = f"{produto_sel} {tamanho_sel}"
-
+            preco_unit = st.number_input("Preco Unitario (R$)", value=50.0, format="%.2f", key="preco_avulso")
+
+    if modo_adicao != "Grade de Tamanhos" and st.button("➕ Adicionar Item", use_container_width=True, key="btn_add"):
+        if descricao_final and quantidade > 0 and preco_unit > 0:
+            item = novo_item(descricao_final, quantidade, preco_unit)
+            if modo_adicao == "Catalogo":
+                # Produto e categoria de origem: metricas por produto (metricas.py)
+                item["produto"] = produto_sel
+                item["categoria"] = categoria_sel
+            st.session_state.itens.append(item)
+            st.success(f"Item adicionado: {item['descricao']}")
+            refazer_secao()
         else:
-            col1, col2 = st.columns(2)
-            with col1:
-                descricao_final = st.text_input("Descricao do Produto", key="desc_avulso").upper()
-            with col2:
-                tamanho_sel = st.text_input("Tamanho", value="", key="tam_avulso")
-
-            if tamanho_sel:
-                descricao_final = f"{descricao_final} {tamanho_sel}"
+            st.error("Preencha todos os campos.")
 
-            col1, col2 = st.columns(2)
-            with col1:
-                quantidade = st.number_input("Quantidade", value=1, min_value=1, key="qtd_avulso")
-            with col2:
-                preco_unit = st.number_input("Preco Unitario (R$)", value=50.0, format="%.2f", key="preco_avulso")
-
-        if st.button("➕ Adicionar Item", use_container_width=True, key="btn_add"):
-            if descricao_final and quantidade > 0 and preco_unit > 0:
-                item = {
-                    "descricao": descricao_final,
-                    "quantidade": quantidade,
-                    "preco_unitario": preco_unit,
-                    "valor_total": quantidade * preco_unit
-                }
-                st.session_state.itens.append(item)
-                st.success(f"Item adicionado: {item['descricao']}")
-                st.rerun()
-            else:
-                st.error("Preencha todos os campos.")
-
-        st.divider()
-        st.subheader("📝 Informacoes Importantes")
-        observacoes = st.text_area(
-            "Observacoes do Orcamento",
-            placeholder="Ex: Frete por conta do cliente. Prazo de entrega: 15 dias uteis. Pagamento: 50% entrada + 50% na entrega.",
-            height=100,
-            key="obs_orcamento"
-        )
-
-    with col_preview:
-        st.subheader("👁️ Preview do Orcamento")
+    st.divider()
+    st.subheader("📝 Informacoes Importantes")
+    st.text_area(
+        "Observacoes do Orcamento",
+        placeholder="Ex: Frete por conta do cliente. Prazo de entrega: 15 dias uteis. Pagamento: 50% entrada + 50% na entrega.",
+        height=100,
+        key="obs_orcamento"
+    )
+
+@medido("secao_preview")
+def secao_preview():
+    catalogo = carregar_catalogo()
+    st.subheader("👁️ Preview do Orcamento")
+
+    # Campos do formulario pelo session_state: esta secao pode rodar sem as outras
+    estado = st.session_state
+    data_orcamento = estado.data_orc
+    data_expiracao = data_orcamento + timedelta(days=estado.validade)
+    vendedor = estado.vendedor
+    cliente_nome, cliente_contato, cliente_endereco = estado.cli_nome, estado.cli_contato, estado.cli_end
+    cliente_cidade, cliente_estado, cliente_cep = estado.cli_cidade, estado.cli_uf, estado.cli_cep
+    cliente_cnpj = estado.cli_cnpj
+    observacoes = estado.obs_orcamento
+
+    # Usa numero existente (edicao); orcamento novo so recebe numero ao salvar
+    if st.session_state.numero_orcamento and st.session_state.editando:
+        numero_orcamento = st.session_state.numero_orcamento
+    else:
+        numero_orcamento = st.session_state.get("numero_orcamento_novo")
 
-        # Usa numero existente (edicao) ou gera novo
-        if st.session_state.numero_orcamento and st.session_state.editando:
-            numero_orcamento = st.session_state.numero_orcamento
-        else:
-            if "numero_orcamento_novo" not in st.session_state:
-                st.session_state.numero_orcamento_novo = gerar_numero_orcamento()
-            numero_orcamento = st.session_state.numero_orcamento_novo
+    st.markdown(f"""
+    **Cotacao n°** {numero_orcamento or "(gerado ao salvar)"}
+    **Data:** {data_orcamento.strftime("%d/%m/%Y")}
+    **Expiracao:** {data_expiracao.strftime("%d/%m/%Y")}
+    **Vendedor:** {vendedor}
+    """)
 
+    if cliente_nome:
         st.markdown(f"""
-        **Cotacao n°** {numero_orcamento}
-        **Data:** {data_orcamento.strftime("%d/%m/%Y")}
-        **Expiracao:** {data_expiracao.strftime("%d/%m/%Y")}
-        **Vendedor:** {vendedor}
+        ---
+        **Cliente:** {cliente_nome}
+        {cliente_endereco}
+        {cliente_cidade} {cliente_estado} {cliente_cep}
+        **CPF/CNPJ:** {cliente_cnpj}
         """)
 
-        if cliente_nome:
-            st.markdown(f"""
-            ---
-            **Cliente:** {cliente_nome}
-            {cliente_endereco}
-            {cliente_cidade} {cliente_estado} {cliente_cep}
-            **CPF/CNPJ:** {cliente_cnpj}
-            """)
-
+    st.markdown("---")
+
+    if st.session_state.itens:
+        st.markdown("**Itens:**")
+
+        # Uma tabela editavel num form: as edicoes so viram um diff ao aplicar
+        chave_editor = f"editor_itens_{st.session_state.versao_itens}"
+        with st.form("form_itens", border=False):
+            st.data_editor(
+                linhas_itens(st.session_state.itens),
+                column_config={
+                    COLUNA_DESCRICAO: st.column_config.TextColumn(COLUNA_DESCRICAO, required=True, width="large"),
+                    COLUNA_QUANTIDADE: st.column_config.NumberColumn(COLUNA_QUANTIDADE, min_value=1, step=1),
+                    COLUNA_PRECO_UNITARIO: st.column_config.NumberColumn(
+                        COLUNA_PRECO_UNITARIO, min_value=0.01, format="%.2f"
+                    ),
+                    COLUNA_VALOR: st.column_config.TextColumn(COLUNA_VALOR),
+                    COLUNA_REMOVER: st.column_config.CheckboxColumn(COLUNA_REMOVER, default=False),
+                },
+                disabled=[COLUNA_VALOR],
+                hide_index=True,
+                use_container_width=True,
+                key=chave_editor,
+            )
+            aplicar_itens = st.form_submit_button("✔️ Aplicar alteracoes", use_container_width=True)
+
+        if aplicar_itens:
+            alteracoes = st.session_state[chave_editor]["edited_rows"]
+            novos_itens, erros_itens = aplicar_edicao(st.session_state.itens, alteracoes)
+            if erros_itens:
+                st.error("\n\n".join(erros_itens))
+            elif alteracoes:
+                st.session_state.itens = novos_itens
+                st.session_state.versao_itens += 1
+                refazer_secao()
+
+        # Soma em centavos inteiros: o mesmo total vai para o PDF
+        totais = totalizar(st.session_state.itens)
         st.markdown("---")
+        st.markdown(f"### Total: {formatar_centavos(totais.total)}")
 
-        if st.session_state.itens:
-            st.markdown("**Itens:**")
+        if observacoes:
+            st.markdown("---")
+            st.warning(f"**Informacoes Importantes:**\n\n{observacoes}")
 
-            total = 0
-            for i, item in enumerate(st.session_state.itens):
-                col1, col2, col3, col4 = st.columns([3, 1, 1, 0.5])
-                with col1:
-                    st.text(item["descricao"])
-                with col2:
-                    st.text(f"{item['quantidade']:.0f} Un")
-                with col3:
-                    st.text(formatar_moeda(item["valor_total"]))
-                with col4:
-                    if st.button("🗑️", key=f"del_{i}"):
-                        st.session_state.itens.pop(i)
-                        st.rerun()
-                total += item["valor_total"]
+        st.divider()
 
-            st.markdown("---")
-            st.markdown(f"### Total: {formatar_moeda(total)}")
-
-            if observacoes:
-                st.markdown("---")
-                st.warning(f"**Informacoes Importantes:**\n\n{observacoes}")
-
-            st.divider()
-
-            if st.button("📄 Gerar PDF", type="primary", use_container_width=True):
-                dados_orcamento = {
-                    "numero": numero_orcamento,
-                    "data": data_orcamento.strftime("%d/%m/%Y"),
-                    "data_iso": data_orcamento.strftime("%Y-%m-%d"),
-                    "expiracao": data_expiracao.strftime("%d/%m/%Y"),
-                    "vendedor": vendedor,
-                    "cliente": {
-                        "nome": cliente_nome,
-                        "contato": cliente_contato,
-                        "endereco": cliente_endereco,
-                        "cidade": cliente_cidade,
-                        "estado": cliente_estado,
-                        "cep": cliente_cep,
-                        "cnpj": cliente_cnpj
-                    },
-                    "itens": st.session_state.itens.copy(),
-                    "total": total,
-                    "empresa": catalogo["empresa"],
-                    "observacoes": observacoes
-                }
+        if st.button("📄 Gerar PDF", type="primary", use_container_width=True):
+            novo = not numero_orcamento
+            if novo:
+                numero_orcamento = gerar_numero_orcamento()
+                st.session_state.numero_orcamento_novo = numero_orcamento
+
+            dados_orcamento = {
+                "numero": numero_orcamento,
+                "data": data_orcamento.strftime("%d/%m/%Y"),
+                "data_iso": data_orcamento.strftime("%Y-%m-%d"),
+                "expiracao": data_expiracao.strftime("%d/%m/%Y"),
+                "vendedor": vendedor,
+                "cliente": {
+                    "nome": cliente_nome,
+                    "contato": cliente_contato,
+                    "endereco": cliente_endereco,
+                    "cidade": cliente_cidade,
+                    "estado": cliente_estado,
+                    "cep": cliente_cep,
+                    "cnpj": cliente_cnpj
+                },
+                "itens": st.session_state.itens.copy(),
+                "total": reais(totais.total),
+                "total_centavos": totais.total,
+                "empresa": catalogo["empresa"],
+                "observacoes": observacoes
+            }
 
-                # Salva o orcamento
-                salvar_orcamento(dados_orcamento)
-
-                from gerar_pdf import gerar_pdf_orcamento
-
-                try:
-                    pdf_bytes = gerar_pdf_orcamento(dados_orcamento)
-                    st.download_button(
-                        label="⬇️ Baixar PDF",
-                        data=pdf_bytes,
-                        file_name=f"Cotacao_{numero_orcamento}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
-                    st.success(f"Orcamento {numero_orcamento} salvo!")
-                except Exception as e:
-                    st.error(f"Erro ao gerar PDF: {e}")
-        else:
-            st.info("Adicione produtos ao orcamento.")
+            # Salva o orcamento; o PDF vai para a fila e e acompanhado nos reruns
+            try:
+                salvar_orcamento(dados_orcamento, novo=novo)
+            except NumeroEmUso:
+                # Numero ja usado por outro orcamento: o proximo clique aloca outro
+                del st.session_state.numero_orcamento_novo
+                st.error(f"O numero {numero_orcamento} ja existe. Clique em Gerar PDF de novo.")
+            else:
+                st.session_state.pdf_pendente = dados_orcamento
+                st.rerun()  # app inteiro: a lista da aba "Editar Orcamento" inclui o novo
+
+        pendente = st.session_state.get("pdf_pendente")
+        if pendente and mostrar_pdf(pendente, "⬇️ Baixar PDF", key="download_orcamento"):
+            st.session_state.pdf_pendente = None
+            st.success(f"Orcamento {pendente['numero']} salvo!")
+    else:
+        st.info("Adicione produtos ao orcamento.")
+
+# Uma secao so: o preview le o que as secoes do cliente e dos itens gravam no session_state
+@secao("aba_orcamento")
+def aba_orcamento():
+    col_form, col_preview = st.columns([1, 1])
+    with col_form:
+        secao_cliente()
+        secao_itens()
+    with col_preview:
+        secao_preview()
 
     st.divider()
     if st.button("🗑️ Limpar Orcamento", use_container_width=True):
         st.session_state.itens = []
         st.session_state.numero_orcamento = None
         st.session_state.editando = False
+        st.session_state.pdf_pendente = None
         if "numero_orcamento_novo" in st.session_state:
             del st.session_state.numero_orcamento_novo
-        st.rerun()
+        st.rerun()  # app inteiro: a aba "Editar Orcamento" deixa de mostrar a edicao
+
+with tab_orcamento:
+    aba_orcamento()
 
 # === RODAPE ===
 st.markdown("---")
@@ -908,3 +1173,21 @@ st.markdown("""
     <p style="margin: 5px 0; font-size: 12px;">Desenvolvido por <strong>Be Data</strong> | Automacoes e Inteligencia de Dados</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Diagnostico: leituras de dados deste rerun (SALESFLOW_DIAGNOSTICO=1)
+if os.environ.get("SALESFLOW_DIAGNOSTICO") == "1":
+    leituras = obter_cache_leituras().contadores_rerun()
+    st.caption("Leituras neste rerun: " + " | ".join(
+        f"{arquivo}: {c['hits']} hits, {c['parses']} parses" for arquivo, c in leituras.items()
+    ))
+    st.caption("Spans neste rerun: " + " | ".join(
+        f"{nome}: {ms:.1f} ms" for nome, ms in obter_instrumentacao().spans_rerun()
+    ))
+    with st.expander("Metricas (Prometheus)"):
+        st.code(obter_instrumentacao().texto_prometheus(), language="text")
+
+# Fecha o span do rerun (e grava o snapshot Prometheus, se configurado)
+obter_instrumentacao().fim_rerun()
+
+# Primeira pagina ja enviada: modulos pesados carregam em segundo plano
+aquecer_em_segundo_plano()
@@ -0,0 +1,633 @@
+"""
+Armazenamento de orcamentos em diario (journal) append-only.
+
+Cada criacao/edicao de orcamento vira uma linha JSON anexada ao diario
+(orcamentos.jsonl). O orcamentos.json continua no formato original e
+funciona como snapshot: so e reescrito na compactacao, que roda quando o
+diario passa do limite de registros.
+
+Nos dois modos os orcamentos ficam indexados em memoria por numero, e o
+indice so e refeito quando a versao do arquivo no disco (inode, mtime,
+tamanho) muda.
+
+CacheLeituras guarda o conteudo ja parseado dos demais arquivos de dados
+(clientes.json, consultas do SQLite) pela mesma ideia de versao. Tudo que
+sai dos caches e visao somente leitura (VistaDict/VistaLista): quem precisa
+alterar pede copia_editavel(). Hits e parses sao contados por rerun.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+
+ARQUIVO_ORCAMENTOS = "orcamentos.json"
+ARQUIVO_DIARIO = "orcamentos.jsonl"
+ARQUIVO_SEQUENCIA = "sequencia.json"
+
+# Quantidade de registros no diario que dispara a compactacao
+LIMITE_COMPACTACAO = int(os.environ.get("SALESFLOW_LIMITE_COMPACTACAO", "500"))
+
+# "diario" (padrao) ou "json" (reescreve o arquivo inteiro a cada save)
+MODO_ORCAMENTOS = os.environ.get("SALESFLOW_MODO_ORCAMENTOS", "diario")
+
+# Numeros ORS reservados por processo a cada ida ao disco (1 = sem lacunas)
+BLOCO_NUMEROS = int(os.environ.get("SALESFLOW_BLOCO_NUMEROS", "1"))
+
+# Releituras de carregar_sem_trava() se a base for compactada no meio
+TENTATIVAS_LEITURA = 5
+
+logger = logging.getLogger("salesflow.armazenamento")
+
+
+# === UTILITARIOS DE ARQUIVO ===
+
+@contextmanager
+def trava_arquivo(caminho):
+    """Lock exclusivo entre processos usando um arquivo de trava."""
+    with open(caminho, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def escrever_json_atomico(caminho, dados):
+    """Grava JSON em arquivo temporario e troca de uma vez (os.replace)."""
+    tmp = f"{caminho}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, caminho)
+
+
+def assinatura_arquivo(caminho):
+    """Identifica a versao do arquivo no disco (None se nao existe)."""
+    try:
+        st = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# === VISOES SOMENTE LEITURA ===
+
+def _somente_leitura(self, *args, **kwargs):
+    raise TypeError("visao somente leitura (use copia_editavel)")
+
+
+class VistaDict(dict):
+    """dict compartilhado pelo cache; copy() devolve um dict comum."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _somente_leitura
+    clear = pop = popitem = setdefault = update = _somente_leitura
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __deepcopy__(self, memo):
+        return copia_editavel(self)
+
+
+class VistaLista(list):
+    """list compartilhada pelo cache; copy() devolve uma list comum."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _somente_leitura
+    append = extend = insert = pop = remove = clear = sort = reverse = _somente_leitura
+
+    def copy(self):
+        return list(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def __deepcopy__(self, memo):
+        return copia_editavel(self)
+
+
+def somente_leitura(obj):
+    """Converte dicts/lists (recursivo) em visoes; visoes ja prontas sao reaproveitadas."""
+    if isinstance(obj, (VistaDict, VistaLista)):
+        return obj
+    if isinstance(obj, dict):
+        return VistaDict((k, somente_leitura(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return VistaLista(somente_leitura(v) for v in obj)
+    return obj
+
+
+def copia_editavel(obj):
+    """Copia profunda com dict/list comuns."""
+    if isinstance(obj, dict):
+        return {k: copia_editavel(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [copia_editavel(v) for v in obj]
+    return obj
+
+
+# === CACHE DE LEITURAS ===
+
+class CacheLeituras:
+    """
+    Conteudo parseado por chave (caminho do arquivo ou consulta), reaproveitado
+    enquanto a versao (assinatura do arquivo, contador do banco) for a mesma.
+
+    obter(chave, versao, carregar): hit ou carregar() + visao somente leitura
+    atualizar(chave, versao, dados): apos escrita propria, sem parse de novo
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._itens = {}  # chave -> (versao, dados)
+        self._total = Counter()  # (chave, evento) -> n
+        self._rerun = threading.local()  # cada sessao do Streamlit roda numa thread
+
+    def contar(self, chave, evento):
+        """evento: "hits", "parses" ou "incrementais" (diario reaplicado em parte)."""
+        with self._lock:
+            self._total[(chave, evento)] += 1
+        contadores = getattr(self._rerun, "contadores", None)
+        if contadores is not None:
+            contadores[(chave, evento)] += 1
+
+    def obter(self, chave, versao, carregar):
+        with self._lock:
+            item = self._itens.get(chave)
+        if item is not None and item[0] == versao:
+            self.contar(chave, "hits")
+            return item[1]
+        dados = somente_leitura(carregar())
+        with self._lock:
+            self._itens[chave] = (versao, dados)
+        self.contar(chave, "parses")
+        return dados
+
+    def atualizar(self, chave, versao, dados):
+        dados = somente_leitura(dados)
+        with self._lock:
+            self._itens[chave] = (versao, dados)
+        return dados
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def inicio_rerun(self):
+        """Zera os contadores da thread atual (chamar no topo do app.py)."""
+        self._rerun.contadores = Counter()
+
+    @staticmethod
+    def _agrupar(contador):
+        resumo = {}
+        for (chave, evento), n in contador.items():
+            resumo.setdefault(str(chave), {"hits": 0, "parses": 0, "incrementais": 0})[evento] = n
+        return resumo
+
+    def contadores_rerun(self):
+        """{chave: {"hits", "parses", "incrementais"}} desde o inicio_rerun() desta thread."""
+        return self._agrupar(getattr(self._rerun, "contadores", Counter()))
+
+    def estatisticas(self):
+        """Mesmo formato, acumulado desde o inicio do processo."""
+        with self._lock:
+            return self._agrupar(self._total)
+
+
+_cache_leituras = CacheLeituras()
+
+
+def obter_cache_leituras():
+    """Cache unico por processo (compartilhado entre sessoes)."""
+    return _cache_leituras
+
+
+# === DIARIO DE ORCAMENTOS ===
+
+class DiarioOrcamentos:
+    """
+    Visao em memoria dos orcamentos = snapshot (orcamentos.json) + diario.
+
+    Registros do diario:
+        {"op": "orcamento", "dados": {...}}          -> cria/substitui pelo numero
+        {"op": "sequencia", "mes": "01", "valor": 101}  -> legado (antes do AlocadorNumeros)
+    """
+
+    def __init__(self, arquivo=ARQUIVO_ORCAMENTOS, diario=ARQUIVO_DIARIO,
+                 limite_compactacao=LIMITE_COMPACTACAO, compactar_em_segundo_plano=True):
+        self.arquivo = arquivo
+        self.diario = diario
+        self.trava = f"{arquivo}.lock"
+        self.limite_compactacao = limite_compactacao
+        self.compactar_em_segundo_plano = compactar_em_segundo_plano
+
+        self._lock = threading.RLock()
+        self._thread_compactacao = None
+        self._orcamentos = {}  # numero -> orcamento (mantem ordem de criacao)
+        self._sequencia = {}
+        self._versao_snapshot = False  # forca carga na primeira leitura
+        self._offset = 0  # bytes do diario ja aplicados
+        self._registros = 0  # registros do diario ja aplicados
+
+    # --- leitura ---
+
+    def _precisa_recarregar(self):
+        if assinatura_arquivo(self.arquivo) != self._versao_snapshot:
+            return True
+        try:
+            tamanho = os.path.getsize(self.diario)
+        except FileNotFoundError:
+            tamanho = 0
+        # Diario menor que o ja lido = outro processo compactou
+        return tamanho < self._offset
+
+    def _tem_novidade(self):
+        try:
+            return os.path.getsize(self.diario) > self._offset
+        except FileNotFoundError:
+            return False
+
+    def _sincronizar(self):
+        """Aplica o que mudou no disco desde a ultima leitura."""
+        with self._lock:
+            if self._precisa_recarregar():
+                with trava_arquivo(self.trava):
+                    self._recarregar()
+            elif self._tem_novidade():
+                if self._aplicar_diario():
+                    obter_cache_leituras().contar(self.arquivo, "incrementais")
+                else:
+                    # Outro processo compactou durante a leitura sem trava
+                    with trava_arquivo(self.trava):
+                        self._recarregar()
+            else:
+                obter_cache_leituras().contar(self.arquivo, "hits")
+
+    def _recarregar(self):
+        obter_cache_leituras().contar(self.arquivo, "parses")
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {"orcamentos": [], "sequencia": {}}
+
+        self._orcamentos = {orc["numero"]: somente_leitura(orc) for orc in data.get("orcamentos", [])}
+        self._sequencia = dict(data.get("sequencia", {}))
+        self._versao_snapshot = assinatura_arquivo(self.arquivo)
+        self._offset = 0
+        self._registros = 0
+        return self._aplicar_diario()
+
+    def _aplicar_diario(self):
+        """
+        Aplica o diario a partir do offset ja lido. False se o snapshot mudou
+        ou o diario encolheu (compactacao de outro processo): recarregar tudo.
+        Linha completa invalida e pulada (com aviso no log); so a ultima linha,
+        ainda sem \n, fica para a proxima leitura.
+        """
+        try:
+            f = open(self.diario, "rb")
+        except FileNotFoundError:
+            return True
+        with f:
+            if os.fstat(f.fileno()).st_size < self._offset or assinatura_arquivo(self.arquivo) != self._versao_snapshot:
+                return False
+            f.seek(self._offset)
+            for linha in f:
+                # Linha sem \n = escrita de outro processo ainda em andamento
+                if not linha.endswith(b"\n"):
+                    break
+                if linha.strip():
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        registro = None
+                    if isinstance(registro, dict) and "op" in registro:
+                        self._aplicar(registro)
+                        self._registros += 1
+                    else:
+                        # Escrita interrompida (ou offset no meio de uma linha
+                        # do diario novo: a assinatura do snapshot pega abaixo)
+                        logger.warning("%s: linha invalida no byte %d ignorada", self.diario, self._offset)
+                self._offset += len(linha)
+        return assinatura_arquivo(self.arquivo) == self._versao_snapshot
+
+    def _aplicar(self, registro):
+        if registro["op"] == "orcamento":
+            orc = somente_leitura(registro["dados"])
+            self._orcamentos[orc["numero"]] = orc
+        elif registro["op"] == "sequencia":
+            self._sequencia[registro["mes"]] = registro["valor"]
+
+    def carregar(self):
+        """Retorna no formato do orcamentos.json: {"orcamentos": [...], "sequencia": {...}}."""
+        with self._lock:
+            self._sincronizar()
+            return {
+                "orcamentos": list(self._orcamentos.values()),
+                "sequencia": dict(self._sequencia),
+            }
+
+    def carregar_sem_trava(self):
+        """
+        Como carregar(), mas sem a trava de arquivo (nem cria o .lock): para
+        ler a base de fora do app. Compactacao no meio da leitura: le de novo.
+        """
+        with self._lock:
+            for _ in range(TENTATIVAS_LEITURA):
+                if self._recarregar():
+                    break
+            else:
+                raise ValueError(f"{self.arquivo} compactado durante a leitura {TENTATIVAS_LEITURA} vezes")
+            return {
+                "orcamentos": list(self._orcamentos.values()),
+                "sequencia": dict(self._sequencia),
+            }
+
+    def buscar(self, numero):
+        """Busca pelo numero em O(1) (None se nao existe)."""
+        with self._lock:
+            self._sincronizar()
+            return self._orcamentos.get(numero)
+
+    # --- escrita ---
+
+    def _anexar(self, registro):
+        linha = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with trava_arquivo(self.trava):
+                # Garante que a visao inclui tudo que outros processos gravaram
+                if self._precisa_recarregar():
+                    self._recarregar()
+                else:
+                    self._aplicar_diario()
+                with open(self.diario, "ab") as f:
+                    # Sobrou uma linha sem \n com a trava na mao: escrita que
+                    # morreu no meio. Fecha a linha (vira invalida e e pulada)
+                    # para o registro novo nao grudar nela.
+                    if f.tell() > self._offset:
+                        f.write(b"\n")
+                    f.write(linha)
+                    self._offset = f.tell()
+                self._aplicar(registro)
+                self._registros += 1
+            precisa_compactar = self._registros >= self.limite_compactacao
+
+        if precisa_compactar:
+            if self.compactar_em_segundo_plano:
+                self._agendar_compactacao()
+            else:
+                self.compactar()
+
+    def salvar_orcamento(self, orcamento):
+        """Cria ou substitui (mesmo numero) um orcamento."""
+        self._anexar({"op": "orcamento", "dados": orcamento})
+
+    def salvar_tudo(self, data):
+        """Substitui todo o conteudo (equivale ao antigo salvar_orcamentos)."""
+        with self._lock:
+            with trava_arquivo(self.trava):
+                self._orcamentos = {orc["numero"]: somente_leitura(orc) for orc in data.get("orcamentos", [])}
+                self._sequencia = dict(data.get("sequencia", {}))
+                self._gravar_snapshot()
+
+    # --- compactacao ---
+
+    def _gravar_snapshot(self):
+        escrever_json_atomico(self.arquivo, {
+            "orcamentos": list(self._orcamentos.values()),
+            "sequencia": self._sequencia,
+        })
+        # Se cair aqui, o diario e reaplicado sobre o snapshot novo;
+        # os registros sao idempotentes, entao o resultado e o mesmo.
+        open(self.diario, "wb").close()
+        self._versao_snapshot = assinatura_arquivo(self.arquivo)
+        self._offset = 0
+        self._registros = 0
+
+    def compactar(self):
+        """Incorpora o diario no orcamentos.json e zera o diario."""
+        with self._lock:
+            with trava_arquivo(self.trava):
+                if self._precisa_recarregar():
+                    lido = self._recarregar()
+                else:
+                    lido = self._aplicar_diario()
+                if not lido:
+                    # Zerar o diario agora perderia o que nao foi aplicado
+                    logger.warning("%s: compactacao adiada, diario nao foi lido inteiro", self.diario)
+                    return
+                if self._registros:
+                    self._gravar_snapshot()
+
+    def _agendar_compactacao(self):
+        with self._lock:
+            if self._thread_compactacao and self._thread_compactacao.is_alive():
+                return
+            self._thread_compactacao = threading.Thread(
+                target=self.compactar, name="compactacao-orcamentos", daemon=True
+            )
+            self._thread_compactacao.start()
+
+
+# === MODO JSON (LEGADO) ===
+
+class OrcamentosJSON:
+    """
+    Modo legado: orcamentos.json inteiro reescrito a cada save.
+    Mantem o arquivo parseado e um indice numero -> posicao em memoria.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_ORCAMENTOS):
+        self.arquivo = arquivo
+        self.trava = f"{arquivo}.lock"
+        self._lock = threading.RLock()
+        self._data = {"orcamentos": [], "sequencia": {}}
+        self._indice = {}  # numero -> posicao em self._data["orcamentos"]
+        self._versao = False
+
+    def _sincronizar(self):
+        versao = assinatura_arquivo(self.arquivo)
+        if versao == self._versao:
+            obter_cache_leituras().contar(self.arquivo, "hits")
+            return
+        obter_cache_leituras().contar(self.arquivo, "parses")
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data["orcamentos"] = [somente_leitura(orc) for orc in data.get("orcamentos", [])]
+        data.setdefault("sequencia", {})
+        self._data = data
+        self._indice = {orc["numero"]: i for i, orc in enumerate(data["orcamentos"])}
+        self._versao = versao
+
+    def _gravar(self):
+        escrever_json_atomico(self.arquivo, self._data)
+        self._versao = assinatura_arquivo(self.arquivo)
+
+    def carregar(self):
+        with self._lock:
+            self._sincronizar()
+            return {
+                "orcamentos": list(self._data["orcamentos"]),
+                "sequencia": dict(self._data["sequencia"]),
+            }
+
+    def buscar(self, numero):
+        with self._lock:
+            self._sincronizar()
+            pos = self._indice.get(numero)
+            return None if pos is None else self._data["orcamentos"][pos]
+
+    def salvar_orcamento(self, orcamento):
+        with self._lock, trava_arquivo(self.trava):
+            self._sincronizar()
+            orcamento = somente_leitura(orcamento)
+            pos = self._indice.get(orcamento["numero"])
+            if pos is None:
+                self._indice[orcamento["numero"]] = len(self._data["orcamentos"])
+                self._data["orcamentos"].append(orcamento)
+            else:
+                self._data["orcamentos"][pos] = orcamento
+            self._gravar()
+
+    def salvar_tudo(self, data):
+        with self._lock, trava_arquivo(self.trava):
+            self._data = {
+                "orcamentos": [somente_leitura(orc) for orc in data.get("orcamentos", [])],
+                "sequencia": dict(data.get("sequencia", {})),
+            }
+            self._indice = {orc["numero"]: i for i, orc in enumerate(self._data["orcamentos"])}
+            self._gravar()
+
+    def compactar(self):
+        """Nada a fazer: o arquivo ja e reescrito inteiro a cada save."""
+
+
+# === NUMERACAO ORS ===
+
+class NumeroEmUso(Exception):
+    """Orcamento novo com um numero que ja esta salvo: o existente nao e substituido."""
+
+
+def maior_sequencia(numeros, chave, padrao):
+    """Maior sequencia entre os numeros ORS do mes `chave` ("AAAA-MM"), ou `padrao`."""
+    prefixo = f"ORS{chave[2:4]}{chave[5:7]}"
+    return max(
+        (int(n[len(prefixo):]) for n in numeros if n.startswith(prefixo) and n[len(prefixo):].isdigit()),
+        default=padrao,
+    )
+
+
+class AlocadorNumeros:
+    """
+    Gera numeros ORS de forma atomica entre sessoes e processos.
+
+    O contador de cada ano/mes fica em sequencia.json e so e alterado
+    segurando o arquivo de trava. Com bloco > 1 o processo reserva varios
+    numeros de uma vez e os entrega da memoria, sem I/O; numeros
+    reservados e nao usados (ex: restart do worker) viram lacunas.
+
+    Mes sem contador (sequencia.json apagado ou perdido) comeca depois do
+    maior numero do mes ja salvo, para nao repetir numeros.
+    """
+
+    INICIO = 100  # primeira sequencia de cada mes
+
+    def __init__(self, arquivo=ARQUIVO_SEQUENCIA, bloco=BLOCO_NUMEROS):
+        self.arquivo = arquivo
+        self.trava = f"{arquivo}.lock"
+        self.bloco = max(1, bloco)
+        self._lock = threading.Lock()
+        self._reservas = {}  # "AAAA-MM" -> [proxima, ultima] reservadas
+
+    def _reservar(self, chave):
+        with trava_arquivo(self.trava):
+            try:
+                with open(self.arquivo, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                data = {}
+            ultima = data[chave] if chave in data else self._maior_salvo(chave)
+            data[chave] = ultima + self.bloco
+            escrever_json_atomico(self.arquivo, data)
+        return [ultima + 1, ultima + self.bloco]
+
+    def _maior_salvo(self, chave):
+        orcamentos = obter_orcamentos().carregar()["orcamentos"]
+        return maior_sequencia((orc["numero"] for orc in orcamentos), chave, self.INICIO - 1)
+
+    def proximo(self, agora=None):
+        """Proximo numero: ORS + AA + MM + sequencia. Ex: ORS2601100."""
+        agora = agora or datetime.now()
+        chave = agora.strftime("%Y-%m")
+        with self._lock:
+            faixa = self._reservas.get(chave)
+            if faixa is None or faixa[0] > faixa[1]:
+                faixa = self._reservas[chave] = self._reservar(chave)
+            seq = faixa[0]
+            faixa[0] += 1
+        return f"ORS{agora:%y%m}{seq:03d}"
+
+
+_alocador = None
+_orcamentos = None
+_orcamentos_lock = threading.Lock()
+
+
+def obter_orcamentos():
+    """Instancia unica por processo (sobrevive aos reruns do Streamlit)."""
+    global _orcamentos
+    with _orcamentos_lock:
+        if _orcamentos is None:
+            _orcamentos = DiarioOrcamentos() if MODO_ORCAMENTOS == "diario" else OrcamentosJSON()
+        return _orcamentos
+
+
+def reiniciar_caches():
+    """Descarta o que o processo guardou em memoria: a proxima leitura vai ao disco (benchmarks)."""
+    global _orcamentos
+    with _orcamentos_lock:
+        _orcamentos = None
+    _cache_leituras.limpar()
+
+
+def obter_alocador():
+    """Alocador unico por processo (reservas em bloco sao compartilhadas)."""
+    global _alocador
+    with _orcamentos_lock:
+        if _alocador is None:
+            _alocador = AlocadorNumeros()
+        return _alocador
+
+
+if __name__ == "__main__":
+    # python armazenamento.py compactar
+    import sys
+
+    if sys.argv[1:] == ["compactar"]:
+        obter_orcamentos().compactar()
+        print(f"Diario compactado em {ARQUIVO_ORCAMENTOS}")
+    else:
+        print("Uso: python armazenamento.py compactar")
@@ -0,0 +1,10 @@
+"""
+Medicoes de desempenho do SalesFlow (rodar da raiz do projeto).
+
+    python -m benchmarks.importtime   # orcamento de import do startup do app
+    python -m benchmarks.dados        # base sintetica (clientes, orcamentos, catalogo)
+    python -m benchmarks.suite        # micro e macro benchmarks -> JSON
+    python -m benchmarks.comparar     # compara dois resultados da suite
+    python -m benchmarks.pdf          # tempo e memoria do PDF por numero de itens
+    python -m benchmarks.interacao    # latencia por interacao do app (AppTest)
+"""
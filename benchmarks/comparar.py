@@ -0,0 +1,52 @@
+"""
+Compara dois resultados da suite (mediana de cada benchmark).
+
+    python -m benchmarks.comparar antes.json depois.json [--limite 10]
+
+Saida != 0 quando algum benchmark ficou mais lento que o limite (%).
+"""
+
+import argparse
+import json
+
+
+def carregar(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def comparar(antes, depois, limite=10.0):
+    """Linhas (nome, antes_ms, depois_ms, variacao %) e nomes acima do limite."""
+    linhas, regressoes = [], []
+    for nome, atual in depois["resultados"].items():
+        anterior = antes["resultados"].get(nome)
+        if anterior is None:
+            linhas.append((nome, None, atual["mediana_ms"], None))
+            continue
+        variacao = (atual["mediana_ms"] / anterior["mediana_ms"] - 1) * 100 if anterior["mediana_ms"] else 0.0
+        linhas.append((nome, anterior["mediana_ms"], atual["mediana_ms"], variacao))
+        if variacao > limite:
+            regressoes.append(nome)
+    return linhas, regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmarks.suite")
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--limite", type=float, default=10.0, help="piora maxima aceita (%%)")
+    args = parser.parse_args()
+
+    antes, depois = carregar(args.antes), carregar(args.depois)
+    if antes["parametros"] != depois["parametros"]:
+        print("Aviso: parametros diferentes entre as execucoes.")
+    print(f"{'benchmark':32} {antes.get('commit') or '-':>12} {depois.get('commit') or '-':>12}  variacao")
+    linhas, regressoes = comparar(antes, depois, args.limite)
+    for nome, ms_antes, ms_depois, variacao in linhas:
+        if variacao is None:
+            print(f"{nome:32} {'-':>12} {ms_depois:>12.3f}  (novo)")
+        else:
+            marca = "  <- mais lento" if nome in regressoes else ""
+            print(f"{nome:32} {ms_antes:>12.3f} {ms_depois:>12.3f}  {variacao:+7.1f}%{marca}")
+    if regressoes:
+        raise SystemExit(f"{len(regressoes)} benchmark(s) mais lentos que {args.limite:g}%")
@@ -0,0 +1,204 @@
+"""
+Gerador de bases sinteticas (mesma semente -> mesmos arquivos).
+
+Gera no diretorio de saida os arquivos que o app le, no formato real:
+
+    catalogo.json    empresa, vendedores e grades do catalogo do projeto,
+                     produtos reais + variacoes ate --produtos
+    clientes.json    empresas (PJ) e pessoas (PF) com id, documento e endereco
+    orcamentos.json  snapshot {"orcamentos": [...], "sequencia": {...}}
+    sequencia.json   contadores ORS por mes, coerentes com os orcamentos
+
+    python -m benchmarks.dados --clientes 50000 --orcamentos 200000 --saida /tmp/base
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+from catalogo import Catalogo
+from dinheiro import novo_item, reais, totalizar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RAMOS = ("Construtora", "Metalurgica", "Transportes", "Supermercado", "Padaria", "Clinica",
+         "Auto Posto", "Industria", "Comercio", "Hotel", "Restaurante", "Mineração", "Logística",
+         "Farmácia", "Condomínio", "Escola", "Hospital", "Frigorífico", "Laticínios", "Serralheria")
+SOBRENOMES = ("Silva", "Souza", "Oliveira", "Santos", "Pereira", "Costa", "Almeida", "Ribeiro",
+              "Carvalho", "Gomes", "Araújo", "Conceição", "Magalhães", "Nogueira", "Batista",
+              "Fonseca", "Guimarães", "Brandão", "Assunção", "Mendonça", "Barbosa", "Teixeira")
+NOMES = ("Ana", "João", "Maria", "José", "Antônio", "Francisca", "Carlos", "Paulo", "Lúcia",
+         "Marcos", "Luís", "Fernanda", "Patrícia", "Rafael", "Juliana", "Sebastião", "Cláudia")
+SUFIXOS = ("LTDA", "ME", "EIRELI", "S/A", "LTDA EPP")
+CIDADES = (("Belo Horizonte", "MG"), ("Betim", "MG"), ("Contagem", "MG"), ("São Paulo", "SP"),
+           ("Campinas", "SP"), ("Rio de Janeiro", "RJ"), ("Vitória", "ES"), ("Salvador", "BA"),
+           ("Goiânia", "GO"), ("Brasília", "DF"), ("Curitiba", "PR"), ("Florianópolis", "SC"))
+CORES = ("AZUL", "PRETA", "BRANCA", "CINZA", "VERDE", "LARANJA", "VERMELHA", "AMARELA")
+
+
+def gerar_catalogo(rng, produtos=200):
+    """Catalogo do projeto com os produtos reais e variacoes de cor ate `produtos`."""
+    with open(os.path.join(RAIZ, "catalogo.json"), "r", encoding="utf-8") as f:
+        catalogo = json.load(f)
+    base = list(catalogo["produtos"])
+    lista = base[:produtos]
+    while len(lista) < produtos:
+        origem = base[len(lista) % len(base)]
+        cor = CORES[(len(lista) // len(base) - 1) % len(CORES)]
+        lista.append({
+            "categoria": origem["categoria"],
+            "nome": f"{origem['nome']} {cor} {len(lista) // (len(base) * len(CORES)) + 1}",
+            "preco": round(origem["preco"] * rng.uniform(0.9, 1.2), 2),
+            "sku": f"SKU{len(lista):06d}",
+        })
+    catalogo["produtos"] = lista
+    return catalogo
+
+
+def _endereco(rng):
+    cidade, uf = rng.choice(CIDADES)
+    return {
+        "logradouro": f"Rua {rng.choice(SOBRENOMES)} {rng.choice(NOMES)}",
+        "numero": str(rng.randint(1, 3000)),
+        "complemento": rng.choice(("", "", "Sala 2", "Galpão 3", "Apto 101")),
+        "bairro": rng.choice(("Centro", "Industrial", "Jardim América", "Savassi", "Eldorado")),
+        "cidade": cidade,
+        "uf": uf,
+        "cep": f"{rng.randint(10000, 99999)}-{rng.randint(0, 999):03d}",
+    }
+
+
+def gerar_clientes(rng, total=2000, fracao_pj=0.7):
+    """clientes.json com ids sequenciais por tipo e CNPJ/CPF unicos."""
+    empresas, pessoas = [], []
+    for _ in range(total):
+        if rng.random() < fracao_pj:
+            n = len(empresas) + 1
+            sobrenome = rng.choice(SOBRENOMES)
+            razao = f"{rng.choice(RAMOS)} {sobrenome} {rng.choice(SOBRENOMES)} {rng.choice(SUFIXOS)}"
+            d = f"{n:08d}0001{rng.randint(0, 99):02d}"
+            empresas.append({
+                "id": n,
+                "tipo": "PJ",
+                "razao_social": razao.upper(),
+                "nome_fantasia": f"{rng.choice(RAMOS)} {sobrenome}".upper() if rng.random() < 0.6 else "",
+                "cnpj": f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}",
+                "ie": "",
+                "email": f"contato{n}@exemplo.com.br",
+                "telefone": f"(31) 3{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}",
+                "endereco": _endereco(rng),
+                "contatos": [{"nome": f"{rng.choice(NOMES)} {sobrenome}", "cargo": "Compras",
+                              "email": f"compras{n}@exemplo.com.br", "telefone": ""}],
+                "data_cadastro": "2025-01-01 08:00",
+            })
+        else:
+            n = len(pessoas) + 1
+            d = f"{n:09d}{rng.randint(0, 99):02d}"
+            pessoas.append({
+                "id": n,
+                "tipo": "PF",
+                "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+                "cpf": f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}",
+                "rg": "",
+                "email": f"cliente{n}@exemplo.com.br",
+                "telefone": f"(31) 9{rng.randint(0, 9999):04d}-{rng.randint(0, 9999):04d}",
+                "whatsapp": "",
+                "endereco": _endereco(rng),
+                "data_cadastro": "2025-01-01 08:00",
+            })
+    return {"empresas": empresas, "pessoas": pessoas}
+
+
+def gerar_itens(rng, catalogo, quantidade):
+    """`quantidade` itens de um Catalogo, com tamanho da grade da categoria."""
+    itens = []
+    for _ in range(quantidade):
+        produto = rng.choice(catalogo["produtos"])
+        tamanho = rng.choice(catalogo.grade(produto["categoria"]) or ("U",))
+        qtd = rng.choice((1, 2, 5, 10, 10, 20, 30, 50, 100))
+        itens.append(novo_item(
+            f"{produto['nome']} {tamanho}", qtd, produto["preco"],
+            produto=produto["nome"], categoria=produto["categoria"],
+        ))
+    return itens
+
+
+def gerar_orcamento(rng, catalogo, cliente, numero, dia, itens):
+    """Orcamento no formato salvo pelo app."""
+    total = totalizar(itens).total
+    return {
+        "numero": numero,
+        "data": dia.strftime("%d/%m/%Y"),
+        "data_iso": dia.isoformat(),
+        "expiracao": (dia + timedelta(days=catalogo["validade_dias"])).strftime("%d/%m/%Y"),
+        "vendedor": rng.choice(catalogo["vendedores"]),
+        "cliente": {
+            "nome": cliente.get("razao_social") or cliente["nome"],
+            "contato": (cliente.get("contatos") or [{}])[0].get("nome", ""),
+            "endereco": f"{cliente['endereco']['logradouro']}, {cliente['endereco']['numero']}",
+            "cidade": cliente["endereco"]["cidade"],
+            "estado": cliente["endereco"]["uf"],
+            "cep": cliente["endereco"]["cep"],
+            "cnpj": cliente.get("cnpj") or cliente.get("cpf", ""),
+        },
+        "itens": itens,
+        "total": reais(total),
+        "total_centavos": total,
+        "empresa": catalogo["empresa"],
+        "observacoes": "Frete por conta do cliente. Prazo de entrega: 15 dias uteis.",
+        "status": "aprovado" if rng.random() < 0.35 else "emitido",
+    }
+
+
+def gerar_orcamentos(rng, catalogo, clientes, total=5000, meses=24, hoje=date(2026, 1, 31)):
+    """Orcamentos dos ultimos `meses`, em ordem de data, numerados como o AlocadorNumeros."""
+    catalogo = Catalogo(catalogo)
+    todos = clientes["empresas"] + clientes["pessoas"]
+    dias = sorted(hoje - timedelta(days=rng.randrange(meses * 30)) for _ in range(total))
+    sequencia, orcamentos = {}, []
+    for dia in dias:
+        chave = dia.strftime("%Y-%m")
+        seq = sequencia[chave] = sequencia.get(chave, 99) + 1
+        itens = gerar_itens(rng, catalogo, min(rng.randint(1, 6), rng.randint(1, 12)))
+        orcamentos.append(gerar_orcamento(rng, catalogo, rng.choice(todos), f"ORS{dia:%y%m}{seq:03d}", dia, itens))
+    return {"orcamentos": orcamentos, "sequencia": sequencia}
+
+
+def gravar_base(saida, clientes=2000, orcamentos=5000, produtos=200, semente=42):
+    """Gera e grava a base em `saida`; retorna a contagem de cada arquivo."""
+    rng = random.Random(semente)
+    catalogo = gerar_catalogo(rng, produtos)
+    base_clientes = gerar_clientes(rng, clientes)
+    base_orcamentos = gerar_orcamentos(rng, catalogo, base_clientes, orcamentos)
+
+    os.makedirs(saida, exist_ok=True)
+    arquivos = {
+        "catalogo.json": catalogo,
+        "clientes.json": base_clientes,
+        "orcamentos.json": base_orcamentos,
+        "sequencia.json": base_orcamentos["sequencia"],
+    }
+    for nome, dados in arquivos.items():
+        with open(os.path.join(saida, nome), "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+    return {
+        "produtos": len(catalogo["produtos"]),
+        "empresas": len(base_clientes["empresas"]),
+        "pessoas": len(base_clientes["pessoas"]),
+        "orcamentos": len(base_orcamentos["orcamentos"]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera uma base sintetica do SalesFlow")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--orcamentos", type=int, default=5000)
+    parser.add_argument("--produtos", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", required=True)
+    args = parser.parse_args()
+
+    totais = gravar_base(args.saida, args.clientes, args.orcamentos, args.produtos, args.semente)
+    print(f"Base em {args.saida}: " + ", ".join(f"{v} {k}" for k, v in totais.items()))
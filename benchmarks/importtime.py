@@ -0,0 +1,96 @@
+"""
+Orcamento de import do startup do app (python -X importtime).
+
+Le os imports de topo do app.py (sem o streamlit, que e custo do framework),
+importa esses modulos num processo limpo algumas vezes e compara o melhor
+tempo cumulativo com o orcamento. Tambem falha se algum modulo pesado, que
+deve carregar sob demanda ou em segundo plano, entrar no caminho de startup.
+
+    python -m benchmarks.importtime [--orcamento-ms 40] [--rodadas 5]
+
+Saida != 0 quando o orcamento estoura: serve de checagem de regressao.
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orcamento dos imports do projeto no startup (ms, melhor de N rodadas)
+ORCAMENTO_MS = float(os.environ.get("SALESFLOW_ORCAMENTO_IMPORT_MS", "40"))
+# Nao podem ser importados antes da primeira pagina
+PROIBIDOS = ("fpdf", "requests", "gerar_pdf")
+# Custo do framework, fora do orcamento
+IGNORADOS = ("streamlit",)
+
+
+def modulos_startup(arquivo=os.path.join(RAIZ, "app.py")):
+    """Modulos importados no topo do app.py (imports dentro de funcoes ficam de fora)."""
+    with open(arquivo, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    modulos = []
+    for no in arvore.body:
+        if isinstance(no, ast.Import):
+            nomes = [alias.name for alias in no.names]
+        elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+            nomes = [no.module]
+        else:
+            continue
+        for nome in nomes:
+            if nome.split(".")[0] not in IGNORADOS and nome not in modulos:
+                modulos.append(nome)
+    return modulos
+
+
+def medir(modulos):
+    """
+    Uma rodada em processo novo: ({modulo de topo: us cumulativo}, modulos carregados).
+    """
+    codigo = f"import {', '.join(modulos)}"
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True,
+    ).stderr
+    # Nivel 0 = importado pelo proprio comando (site/encodings sao do interpretador)
+    raizes = {nome.split(".")[0] for nome in modulos} | set(modulos)
+    tempos, carregados = {}, set()
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split("|")
+        if not cumulativo.strip().isdigit():
+            continue  # cabecalho
+        carregados.add(nome.strip())
+        if not nome.startswith("  ") and nome.strip() in raizes:
+            tempos[nome.strip()] = int(cumulativo)
+    return tempos, carregados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_MS)
+    parser.add_argument("--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    modulos = modulos_startup()
+    rodadas = [medir(modulos) for _ in range(args.rodadas)]
+    melhor, carregados = min(rodadas, key=lambda r: sum(r[0].values()))
+    total_ms = sum(melhor.values()) / 1000
+
+    for nome, us in sorted(melhor.items(), key=lambda item: -item[1])[:15]:
+        print(f"{us / 1000:8.1f} ms  {nome}")
+    print(f"{total_ms:8.1f} ms  total (orcamento {args.orcamento_ms:.0f} ms, melhor de {args.rodadas})")
+
+    proibidos = sorted(m for m in carregados if m.split(".")[0] in PROIBIDOS)
+    if proibidos:
+        print(f"ERRO: modulos pesados no startup: {', '.join(proibidos)}")
+    if total_ms > args.orcamento_ms:
+        print("ERRO: orcamento de import estourado")
+    return 1 if proibidos or total_ms > args.orcamento_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Latencia por interacao: quanto custa, do lado do servidor, cada clique ou
+tecla no app, sobre uma base sintetica.
+
+Sobe o app.py com `streamlit run` (headless) num diretorio com a base gerada
+por benchmarks/dados.py, conecta no websocket do servidor como o navegador
+faz e cronometra, do envio do novo valor do widget ate o fim do rerun, cada
+interacao comum do orcamento:
+
+    digitar_cliente      nome do cliente (secao do orcamento)
+    buscar_cliente       busca de cliente cadastrado
+    trocar_categoria     categoria do catalogo (secao de itens)
+    mudar_quantidade     quantidade do item
+    paginar_clientes     pagina da aba Clientes
+
+Os widgets ficam dentro de secoes (st.fragment), entao o navegador pede um
+rerun so da secao. Com --completo o pedido vai sem o fragmento e o servidor
+refaz o script inteiro, como antes das secoes. A saida tem o formato da
+suite:
+
+    python -m benchmarks.interacao --completo --saida antes.json
+    python -m benchmarks.interacao --saida depois.json
+    python -m benchmarks.comparar antes.json depois.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+from benchmarks.dados import RAIZ, gravar_base
+from benchmarks.suite import FORMATO, commit_atual, resumo
+
+PREFIXO_WIDGET = "$$WIDGET_ID-"
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(base, porta, timeout=60):
+    """Sobe o `streamlit run app.py` com `base` como diretorio atual."""
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(RAIZ, "app.py"),
+         "--server.headless=true", f"--server.port={porta}", "--server.address=127.0.0.1",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false"],
+        cwd=base, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"streamlit run saiu: {processo.stderr.read().decode()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{porta}/_stcore/health", timeout=1):
+                return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError("streamlit run nao respondeu")
+
+
+class Sessao:
+    """Uma aba do navegador: manda BackMsg e le ForwardMsg pelo websocket."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.pagina = ""
+        self.widgets = {}  # key -> (tipo, proto, fragment_id)
+
+    async def rodar(self, estado=None, fragmento=""):
+        """Pede um rerun (so do `fragmento`, se dado) e espera ele terminar."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.pagina
+        msg.rerun_script.fragment_id = fragmento
+        if estado is not None:
+            msg.rerun_script.widget_states.widgets.append(estado)
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+
+        while True:
+            dados = await self.ws.read_message()
+            if dados is None:
+                raise RuntimeError("websocket fechado pelo servidor")
+            fm = ForwardMsg()
+            fm.ParseFromString(dados)
+            tipo = fm.WhichOneof("type")
+            if tipo == "new_session":
+                self.pagina = fm.new_session.page_script_hash
+            elif tipo == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                self._registrar(fm.delta)
+            elif tipo == "script_finished":
+                if fm.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app.py nao compila")
+                if fm.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return
+
+    def _registrar(self, delta):
+        elemento = delta.new_element
+        tipo = elemento.WhichOneof("type")
+        proto = getattr(elemento, tipo)
+        if tipo == "exception":
+            raise RuntimeError(f"app.py falhou: {proto.message}")
+        wid = getattr(proto, "id", "")
+        if isinstance(wid, str) and wid.startswith(PREFIXO_WIDGET):
+            chave = wid[len(PREFIXO_WIDGET):].split("-", 1)[-1]
+            self.widgets[chave] = (tipo, proto, delta.fragment_id)
+
+    def estado(self, chave, valor):
+        """WidgetState com o novo `valor` do widget `chave`, e o fragmento dele."""
+        from streamlit.proto.NumberInput_pb2 import NumberInput
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        tipo, proto, fragmento = self.widgets[chave]
+        estado = WidgetState(id=proto.id)
+        if tipo == "text_input":
+            estado.string_value = valor
+        elif tipo == "selectbox":
+            estado.int_value = list(proto.options).index(valor)
+        elif tipo == "number_input" and proto.data_type == NumberInput.INT:
+            estado.int_value = int(valor)
+        else:
+            estado.double_value = float(valor)
+        return estado, fragmento
+
+
+async def _executar(porta, rodadas, semente, completo, mostrar):
+    from tornado.httpclient import HTTPRequest
+    from tornado.websocket import websocket_connect
+
+    rng = random.Random(semente)
+    ws = await websocket_connect(HTTPRequest(
+        f"ws://127.0.0.1:{porta}/_stcore/stream",
+        headers={"Origin": f"http://127.0.0.1:{porta}"},
+    ), max_message_size=512 * 1024 * 1024)
+    sessao = Sessao(ws)
+    await sessao.rodar()
+    categorias = list(sessao.widgets["cat_sel"][1].options)
+    clientes = [op.split(" - ")[0][2:].split()[0] for op in sessao.widgets["sel_cliente"][1].options[1:]]
+    pagina_proto = sessao.widgets["pagina_clientes"][1]
+    paginas = int(pagina_proto.max) if pagina_proto.has_max else 1
+
+    interacoes = {
+        "digitar_cliente": ("cli_nome", lambda i: f"CLIENTE {i}"),
+        "buscar_cliente": ("busca_cli_orc", lambda i: rng.choice(clientes)[:4] if clientes else f"cli {i}"),
+        "trocar_categoria": ("cat_sel", lambda i: categorias[i % len(categorias)]),
+        "mudar_quantidade": ("qtd", lambda i: i + 2),
+        "paginar_clientes": ("pagina_clientes", lambda i: i % paginas + 1),
+    }
+    resultados = {}
+    for nome, (chave, valor) in interacoes.items():
+        tempos = []
+        for i in range(rodadas):
+            estado, fragmento = sessao.estado(chave, valor(i))
+            inicio = time.perf_counter_ns()
+            await sessao.rodar(estado, "" if completo else fragmento)
+            tempos.append((time.perf_counter_ns() - inicio) / 1e6)
+        resultados[nome] = resumo("interacao", tempos)
+        mostrar(f"{nome:32} {resultados[nome]['mediana_ms']:>10.3f} ms")
+    ws.close()
+    return resultados
+
+
+def executar(porta, rodadas=10, semente=42, completo=False, mostrar=print):
+    """Roda as interacoes contra o servidor em `porta`. Retorna {nome: resumo}."""
+    return asyncio.run(_executar(porta, rodadas, semente, completo, mostrar))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por interacao do app (streamlit run)")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--orcamentos", type=int, default=5000)
+    parser.add_argument("--produtos", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--rodadas", type=int, default=10)
+    parser.add_argument("--completo", action="store_true",
+                        help="refaz o script inteiro a cada interacao (sem rerun parcial)")
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrao: so imprime)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="salesflow-interacao-") as base:
+        totais = gravar_base(base, args.clientes, args.orcamentos, args.produtos, args.semente)
+        shutil.copy(os.path.join(RAIZ, "logo_bedata.png"), base)
+        porta = porta_livre()
+        servidor = subir_servidor(base, porta)
+        try:
+            resultados = executar(porta, args.rodadas, args.semente, args.completo)
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+    relatorio = {
+        "formato": FORMATO,
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {**vars(args), **totais},
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"Resultado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
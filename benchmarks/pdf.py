@@ -0,0 +1,113 @@
+"""
+Escala do PDF: tempo e pico de memoria de gerar_pdf_orcamento por numero de itens.
+
+Gera orcamentos sinteticos (benchmarks/dados.py) de N itens, com algumas
+descricoes longas que quebram em varias linhas, e mede o melhor tempo de
+algumas rodadas e o pico de memoria Python (tracemalloc, numa rodada
+separada para nao distorcer o tempo). O custo por item deve ficar estavel:
+tempo e memoria crescendo linear com o numero de itens.
+
+    python -m benchmarks.pdf [--itens 100 1000 5000] [--rodadas 3] [--saida pdf.json]
+
+Saida != 0 quando o custo por item do maior orcamento passa de --tolerancia
+vezes o do menor (crescimento mais que linear).
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from benchmarks.dados import RAIZ, gerar_catalogo, gerar_clientes, gerar_itens, gerar_orcamento
+
+DESCRICAO_LONGA = (
+    "CAMISA POLO PIQUET MANGA CURTA COM BORDADO DO LOGO NO PEITO E SERIGRAFIA "
+    "NAS COSTAS, GOLA E PUNHO EM RIBANA"
+)
+
+
+def orcamento(rng, catalogo, cliente, itens):
+    """Orcamento com `itens` itens; 1 em cada 10 com descricao longa."""
+    lista = gerar_itens(rng, catalogo, itens)
+    for item in lista[::10]:
+        item["descricao"] = f"{DESCRICAO_LONGA} {item['descricao']}"
+    return gerar_orcamento(rng, catalogo, cliente, "ORS2601999", date(2026, 1, 31), lista)
+
+
+def medir(dados, rodadas):
+    """(melhor tempo em ms, pico de memoria em KB, paginas, tamanho em KB)."""
+    from gerar_pdf import gerar_pdf_orcamento, montar_pdf_orcamento
+
+    tempos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        pdf_bytes = gerar_pdf_orcamento(dados)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    pdf = montar_pdf_orcamento(dados)
+    bytes(pdf.output())
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tempos), pico / 1024, pdf.pages_count, len(pdf_bytes) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--itens", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--tolerancia", type=float, default=2.0,
+                        help="razao maxima entre o custo por item do maior e do menor N (>= 100 itens)")
+    parser.add_argument("--saida", help="arquivo JSON do resultado")
+    args = parser.parse_args()
+
+    sys.path.insert(0, RAIZ)
+    from catalogo import Catalogo
+    from gerar_pdf import aquecer_assets
+
+    rng = random.Random(args.semente)
+    catalogo = Catalogo(gerar_catalogo(rng))
+    cliente = gerar_clientes(rng, 1, fracao_pj=1.0)["empresas"][0]
+    aquecer_assets()
+
+    print(f"{'itens':>7} {'paginas':>8} {'ms':>9} {'us/item':>9} {'pico KB':>9} {'KB/item':>8} {'PDF KB':>8}")
+    resultados = {}
+    for n in sorted(args.itens):
+        ms, pico_kb, paginas, tamanho_kb = medir(orcamento(rng, catalogo, cliente, n), args.rodadas)
+        resultados[n] = {
+            "paginas": paginas,
+            "ms": round(ms, 3),
+            "us_por_item": round(ms * 1000 / n, 3),
+            "pico_kb": round(pico_kb, 1),
+            "kb_por_item": round(pico_kb / n, 3),
+            "pdf_kb": round(tamanho_kb, 1),
+        }
+        r = resultados[n]
+        print(f"{n:>7} {paginas:>8} {ms:>9.1f} {r['us_por_item']:>9.1f} {pico_kb:>9.0f} {r['kb_por_item']:>8.2f} {tamanho_kb:>8.0f}")
+
+    # Custos fixos (header, logo) dominam orcamentos pequenos: compara a partir de 100 itens
+    grandes = [n for n in resultados if n >= 100]
+    razao = None
+    if len(grandes) >= 2:
+        menor, maior = resultados[grandes[0]], resultados[grandes[-1]]
+        razao = maior["us_por_item"] / menor["us_por_item"]
+        print(f"custo por item: {grandes[-1]} itens / {grandes[0]} itens = {razao:.2f}x "
+              f"(tolerancia {args.tolerancia:g}x)")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados, "razao": razao},
+                      f, ensure_ascii=False, indent=2)
+        print(f"Resultado em {args.saida}")
+    if razao is not None and razao > args.tolerancia:
+        print("ERRO: tempo por item cresce com o tamanho do orcamento")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Micro e macro benchmarks dos caminhos quentes, sobre uma base sintetica.
+
+Gera a base (benchmarks/dados.py) num diretorio temporario, roda o backend
+escolhido sobre ela e grava os tempos em JSON para comparar entre commits:
+
+    python -m benchmarks.suite --clientes 50000 --orcamentos 200000 --saida antes.json
+    python -m benchmarks.suite --backend sqlite --saida sqlite.json
+    python -m benchmarks.comparar antes.json depois.json
+
+Micro: carregar/salvar/buscar orcamento, carregar clientes, indice e selecao
+de cliente, alocacao de numero e gerar_pdf_orcamento com 1, 50 e 2000 itens.
+Macro: abertura do app (primeiro rerun) e fluxo completo de um orcamento.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from benchmarks.dados import RAIZ, gerar_itens, gerar_orcamento, gravar_base
+
+FORMATO = 1
+
+
+def cronometrar(funcao, rodadas, preparar=None):
+    """Tempos (ms) de `rodadas` chamadas; preparar() roda antes de cada uma, fora do tempo."""
+    tempos = []
+    for _ in range(rodadas):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter_ns()
+        funcao()
+        tempos.append((time.perf_counter_ns() - inicio) / 1e6)
+    return tempos
+
+
+def resumo(tipo, tempos, ops=1):
+    mediana = statistics.median(tempos)
+    return {
+        "tipo": tipo,
+        "rodadas": len(tempos),
+        "ops": ops,
+        "min_ms": round(min(tempos), 3),
+        "mediana_ms": round(mediana, 3),
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "max_ms": round(max(tempos), 3),
+        "us_por_op": round(mediana * 1000 / ops, 3),
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(backend="json", rodadas=5, semente=42, mostrar=print):
+    """Roda a suite no diretorio atual (base ja gravada). Retorna {nome: resumo}."""
+    from armazenamento import obter_alocador, reiniciar_caches
+    from gerar_pdf import aquecer_assets, gerar_pdf_orcamento
+    from indice_clientes import IndiceClientes
+    from repositorio import RepositorioJSON, RepositorioSQLite, migrar_json_para_sqlite
+
+    if backend == "sqlite":
+        migrar_json_para_sqlite("salesflow.db")
+        repo = RepositorioSQLite("salesflow.db", catalogo_inicial=None)
+        proximo_numero = repo.proximo_numero
+    else:
+        repo = RepositorioJSON()
+        proximo_numero = obter_alocador().proximo
+
+    repo.reconstruir_metricas()
+    rng = random.Random(semente)
+    catalogo = repo.carregar_catalogo()
+    numeros = [orc["numero"] for orc in repo.carregar_orcamentos()["orcamentos"]]
+    clientes = repo.carregar_clientes()
+    todos = clientes["empresas"] + clientes["pessoas"]
+    termos = [
+        termo
+        for cliente in rng.sample(todos, min(50, len(todos)))
+        for termo in (
+            (cliente.get("razao_social") or cliente["nome"])[:4],        # prefixo do nome
+            (cliente.get("razao_social") or cliente["nome"]).split()[1],  # palavra do meio
+            (cliente.get("cnpj") or cliente["cpf"])[:6],                  # documento com mascara
+        )
+    ]
+    resultados = {}
+
+    def medir(nome, tipo, funcao, preparar=None, ops=1, vezes=rodadas):
+        resultados[nome] = resumo(tipo, cronometrar(funcao, vezes, preparar), ops)
+        mostrar(f"{nome:32} {resultados[nome]['mediana_ms']:>10.3f} ms  ({resultados[nome]['us_por_op']:.1f} us/op)")
+
+    # --- micro ---
+
+    medir("carregar_orcamentos_frio", "micro", repo.carregar_orcamentos, reiniciar_caches)
+    medir("carregar_orcamentos_quente", "micro", repo.carregar_orcamentos)
+    medir("carregar_clientes_frio", "micro", repo.carregar_clientes, reiniciar_caches)
+    medir("carregar_clientes_quente", "micro", repo.carregar_clientes)
+
+    amostra = rng.sample(numeros, min(1000, len(numeros)))
+    medir("buscar_orcamento", "micro", lambda: [repo.buscar_orcamento(n) for n in amostra], ops=len(amostra))
+
+    edicoes = [repo.buscar_orcamento(n) for n in rng.sample(numeros, min(50, len(numeros)))]
+    medir("salvar_orcamento", "micro", lambda: [repo.salvar_orcamento(orc) for orc in edicoes], ops=len(edicoes))
+
+    medir("proximo_numero", "micro", lambda: [proximo_numero() for _ in range(100)], ops=100)
+
+    medir("indice_clientes_montar", "micro", lambda: IndiceClientes(repo.carregar_clientes()))
+    indice = IndiceClientes(repo.carregar_clientes())
+    medir(
+        "selecao_cliente", "micro",
+        lambda: [indice.por_id[chave] for termo in termos for chave in indice.buscar(termo, 20)],
+        ops=len(termos),
+    )
+    medir("pagina_clientes", "micro", lambda: repo.pagina_clientes("silva", 1, 50))
+
+    aquecer_assets()
+    cliente = todos[0]
+    hoje = date(2026, 1, 31)
+    for itens in (1, 50, 2000):
+        orc = gerar_orcamento(rng, catalogo, cliente, "ORS2601999", hoje, gerar_itens(rng, catalogo, itens))
+        medir(f"gerar_pdf_{itens}_itens", "micro", lambda: gerar_pdf_orcamento(orc),
+              vezes=rodadas if itens < 2000 else min(rodadas, 3))
+
+    # --- macro ---
+
+    def abertura():
+        # Primeiro rerun: catalogo, clientes e indice da busca, lista do "Editar"
+        repo.carregar_catalogo()
+        IndiceClientes(repo.carregar_clientes())
+        repo.resumo_orcamentos()
+
+    medir("abertura_app", "macro", abertura, reiniciar_caches)
+
+    def fluxo():
+        # Busca o cliente, numera, salva e gera o PDF de um orcamento com 10 itens
+        chave = indice.buscar(termos[0], 20)[0]
+        escolhido = indice.por_id[chave]
+        orc = gerar_orcamento(rng, catalogo, escolhido, proximo_numero(), hoje, gerar_itens(rng, catalogo, 10))
+        repo.salvar_orcamento(orc)
+        gerar_pdf_orcamento(orc)
+
+    medir("fluxo_orcamento", "macro", fluxo)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes do SalesFlow")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--orcamentos", type=int, default=5000)
+    parser.add_argument("--produtos", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrao: so imprime)")
+    args = parser.parse_args()
+
+    saida = os.path.abspath(args.saida) if args.saida else None
+    sys.path.insert(0, RAIZ)
+    with tempfile.TemporaryDirectory(prefix="salesflow-bench-") as base:
+        inicio = time.perf_counter()
+        totais = gravar_base(base, args.clientes, args.orcamentos, args.produtos, args.semente)
+        print(f"Base gerada em {time.perf_counter() - inicio:.1f}s: " + ", ".join(f"{v} {k}" for k, v in totais.items()))
+        # Os arquivos do app sao relativos ao diretorio atual
+        os.chdir(base)
+        resultados = executar(args.backend, args.rodadas, args.semente)
+        os.chdir(RAIZ)
+
+    relatorio = {
+        "formato": FORMATO,
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {**vars(args), **totais},
+        "resultados": resultados,
+    }
+    if saida:
+        with open(saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"Resultado em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Catalogo de produtos com indices pre-calculados.
+
+carregar_catalogo() do repositorio devolve um Catalogo: continua sendo o dict
+do catalogo.json (catalogo["vendedores"], catalogo["empresa"], ...), somente
+leitura, com os indices montados uma vez por versao do catalogo:
+
+    categorias               -> categorias em ordem alfabetica
+    produtos_da_categoria(c) -> produtos da categoria, na ordem do cadastro
+    nomes_da_categoria(c)    -> nomes para o selectbox
+    produto(nome)            -> produto pelo nome (primeiro cadastrado)
+    produto_por_sku(sku)     -> produto pelo campo opcional "sku"
+    grade(c)                 -> tamanhos da categoria (tamanhos_padrao)
+
+A grade vem de tamanhos_padrao: chave igual a categoria ou a sua primeira
+palavra, sem acento e em minusculas ("Camisas PV" -> "camisas"). Categoria
+sem grade devolve tupla vazia (tamanho digitado livre).
+"""
+
+import unicodedata
+
+from armazenamento import VistaDict, somente_leitura
+
+
+def chave_grade(texto):
+    """ "Calças Jeans" -> "calcas jeans" (chaves de tamanhos_padrao)."""
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower().strip()
+
+
+class Catalogo(VistaDict):
+    """Dict somente leitura do catalogo + indices por categoria, nome e SKU."""
+
+    __slots__ = ("categorias", "_por_categoria", "_nomes", "_por_nome", "_por_sku", "_grades")
+
+    def __init__(self, dados):
+        super().__init__(somente_leitura(dados))
+        produtos = self.get("produtos", ())
+        tamanhos = self.get("tamanhos_padrao", {})
+
+        por_categoria = {}
+        self._por_nome = {}
+        self._por_sku = {}
+        for produto in produtos:
+            por_categoria.setdefault(produto["categoria"], []).append(produto)
+            self._por_nome.setdefault(produto["nome"], produto)
+            if produto.get("sku"):
+                self._por_sku[produto["sku"]] = produto
+
+        self.categorias = tuple(sorted(por_categoria))
+        self._por_categoria = {cat: tuple(lista) for cat, lista in por_categoria.items()}
+        self._nomes = {cat: tuple(p["nome"] for p in lista) for cat, lista in por_categoria.items()}
+        self._grades = {}
+        for cat in self.categorias:
+            chave = chave_grade(cat)
+            grade = tamanhos.get(chave) or tamanhos.get(chave.split()[0] if chave else "") or ()
+            self._grades[cat] = tuple(grade)
+
+    def produtos_da_categoria(self, categoria):
+        return self._por_categoria.get(categoria, ())
+
+    def nomes_da_categoria(self, categoria):
+        return self._nomes.get(categoria, ())
+
+    def produto(self, nome):
+        return self._por_nome.get(nome)
+
+    def produto_por_sku(self, sku):
+        return self._por_sku.get(sku)
+
+    def grade(self, categoria):
+        return self._grades.get(categoria, ())
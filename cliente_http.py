@@ -0,0 +1,227 @@
+"""
+Cliente HTTP compartilhado para as APIs externas (BrasilAPI, ViaCEP).
+
+- Uma requests.Session por processo: conexoes keep-alive reaproveitadas
+  (pool por host), sem novo handshake TCP+TLS a cada consulta.
+- Retentativas limitadas com backoff exponencial e jitter, dentro de um
+  prazo total para nao travar a thread do Streamlit.
+- Circuit breaker por host: apos falhas seguidas (timeout, conexao, 5xx)
+  o host fica "aberto" e as chamadas falham na hora ate o tempo de espera
+  passar; depois uma chamada de teste decide se fecha de novo.
+- Latencia por endpoint guardada para percentis (p50/p90/p99).
+
+Falhas viram ErroHTTP com um tipo ("timeout", "conexao", "status",
+"circuito_aberto") em vez de um None silencioso.
+
+requests (~130 ms de import) so e carregado quando o primeiro ClienteHTTP e
+criado, fora do caminho de startup do app.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+
+# Status que valem nova tentativa (e contam como falha do host)
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+class ErroHTTP(Exception):
+    """Falha de uma chamada externa, com tipo para o app exibir a causa."""
+
+    def __init__(self, tipo, detalhe=""):
+        super().__init__(f"{tipo}: {detalhe}" if detalhe else tipo)
+        self.tipo = tipo
+        self.detalhe = detalhe
+
+
+class Resultado:
+    """Resultado de uma consulta: dados, ou o motivo de nao ter dados."""
+
+    __slots__ = ("dados", "erro", "detalhe")
+
+    def __init__(self, dados=None, erro=None, detalhe=""):
+        self.dados = dados
+        self.erro = erro  # None, "invalido", "nao_encontrado" ou tipo do ErroHTTP
+        self.detalhe = detalhe
+
+    def __bool__(self):
+        return self.dados is not None
+
+    def __repr__(self):
+        return f"Resultado(dados={self.dados!r}, erro={self.erro!r})"
+
+
+class Circuito:
+    """Circuit breaker de um host: fechado -> aberto -> meio-aberto -> fechado."""
+
+    def __init__(self, limite_falhas, tempo_aberto):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.falhas < self.limite_falhas:
+            return "fechado"
+        return "aberto" if time.monotonic() < self.aberto_ate else "meio-aberto"
+
+    def permite(self):
+        with self._lock:
+            estado = self.estado
+            if estado == "fechado":
+                return True
+            if estado == "meio-aberto" and not self._teste_em_andamento:
+                self._teste_em_andamento = True  # so uma chamada de teste por vez
+                return True
+            return False
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self._teste_em_andamento = False
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.falhas >= self.limite_falhas:
+                self.aberto_ate = time.monotonic() + self.tempo_aberto
+
+
+def _limitar(timeout, restante):
+    """Timeout da tentativa sem passar do que resta do prazo (numero ou (conexao, leitura))."""
+    if isinstance(timeout, tuple):
+        return tuple(min(t, restante) for t in timeout)
+    return min(timeout, restante)
+
+
+class ClienteHTTP:
+    """GET com pool de conexoes, retentativas e circuit breaker por host."""
+
+    def __init__(self, tentativas=3, backoff_base=0.25, backoff_max=2.0, timeout=(3.05, 5),
+                 prazo=8.0, limite_falhas=3, tempo_aberto=30.0, conexoes_por_host=10, amostras=1000):
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout  # (conexao, leitura) em segundos
+        self.prazo = prazo  # tempo maximo somando todas as tentativas
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.amostras = amostras
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._excecoes = (requests.Timeout, requests.RequestException)
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=8, pool_maxsize=conexoes_por_host, max_retries=0)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+
+        self._lock = threading.Lock()
+        self._circuitos = {}  # host -> Circuito
+        self._latencias = {}  # endpoint -> deque de ms
+
+    def _circuito(self, host):
+        with self._lock:
+            if host not in self._circuitos:
+                self._circuitos[host] = Circuito(self.limite_falhas, self.tempo_aberto)
+            return self._circuitos[host]
+
+    def _registrar(self, endpoint, inicio):
+        ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            if endpoint not in self._latencias:
+                self._latencias[endpoint] = deque(maxlen=self.amostras)
+            self._latencias[endpoint].append(ms)
+
+    def get(self, url, endpoint=None, timeout=None):
+        """
+        Retorna a resposta (inclusive 4xx, que nao sao retentadas).
+        Levanta ErroHTTP se todas as tentativas falharem ou o circuito estiver aberto.
+        """
+        host = urlsplit(url).netloc
+        endpoint = endpoint or host
+        circuito = self._circuito(host)
+        excecao_timeout, excecao_requisicao = self._excecoes
+        limite = time.monotonic() + self.prazo
+        erro = None
+
+        for tentativa in range(self.tentativas):
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                erro = erro or ErroHTTP("timeout", f"prazo de {self.prazo}s esgotado")
+                break
+            if not circuito.permite():
+                raise ErroHTTP("circuito_aberto", host)
+
+            inicio = time.perf_counter()
+            try:
+                resposta = self.sessao.get(url, timeout=_limitar(timeout or self.timeout, restante))
+            except excecao_timeout as e:
+                erro = ErroHTTP("timeout", str(e))
+            except excecao_requisicao as e:
+                erro = ErroHTTP("conexao", str(e))
+            except Exception:
+                # Erro inesperado: conta como falha, senao o teste do meio-aberto nunca e liberado
+                circuito.falha()
+                raise
+            else:
+                if resposta.status_code not in STATUS_RETENTAVEIS:
+                    self._registrar(endpoint, inicio)
+                    circuito.sucesso()
+                    return resposta
+                erro = ErroHTTP("status", str(resposta.status_code))
+            self._registrar(endpoint, inicio)
+            circuito.falha()
+
+            # Backoff exponencial com jitter total, respeitando o prazo
+            espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** tentativa))
+            if tentativa == self.tentativas - 1 or time.monotonic() + espera >= limite:
+                break
+            time.sleep(espera)
+
+        raise erro
+
+    def percentis(self):
+        """{endpoint: {"n", "p50_ms", "p90_ms", "p99_ms"}} das ultimas chamadas."""
+        with self._lock:
+            amostras = {endpoint: sorted(valores) for endpoint, valores in self._latencias.items()}
+
+        def percentil(valores, p):
+            return round(valores[min(len(valores) - 1, int(p / 100 * len(valores)))], 3)
+
+        return {
+            endpoint: {
+                "n": len(valores),
+                "p50_ms": percentil(valores, 50),
+                "p90_ms": percentil(valores, 90),
+                "p99_ms": percentil(valores, 99),
+            }
+            for endpoint, valores in amostras.items()
+            if valores
+        }
+
+    def circuitos(self):
+        """Estado do circuit breaker de cada host."""
+        with self._lock:
+            return {host: {"estado": c.estado, "falhas": c.falhas} for host, c in self._circuitos.items()}
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente_http():
+    """Cliente unico por processo (pool de conexoes compartilhado entre sessoes)."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteHTTP()
+        return _cliente
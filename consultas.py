@@ -0,0 +1,473 @@
+"""
+Consultas externas (BrasilAPI e ViaCEP) com cache em duas camadas.
+
+    1. LRU em memoria do processo
+    2. SQLite em disco (SALESFLOW_CACHE_CONSULTAS, padrao cache_consultas.db)
+
+Respostas "nao encontrado" (404) tambem sao guardadas (cache negativo,
+TTL proprio). Entradas vencidas ha pouco sao devolvidas na hora enquanto
+uma thread atualiza em segundo plano (stale-while-revalidate).
+
+CEPs ainda passam por uma tabela local opcional (SALESFLOW_TABELA_CEP),
+lida via mmap, antes de ir a rede. Montagem da tabela a partir de CSV:
+    python consultas.py indexar-ceps ceps.csv ceps.idx
+
+As chamadas de rede usam o cliente compartilhado (cliente_http.py) e as
+consultas retornam Resultado: dados, ou o motivo ("invalido",
+"nao_encontrado", "timeout", "circuito_aberto", ...).
+
+As URLs base podem ser trocadas (SALESFLOW_BRASILAPI_URL, SALESFLOW_VIACEP_URL
+ou parametro) para apontar para um servidor HTTP local em testes.
+"""
+
+import csv
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from cliente_http import ErroHTTP, Resultado, obter_cliente_http
+
+
+URL_BRASILAPI_CNPJ = os.environ.get("SALESFLOW_BRASILAPI_URL", "https://brasilapi.com.br/api/cnpj/v1")
+URL_VIACEP = os.environ.get("SALESFLOW_VIACEP_URL", "https://viacep.com.br/ws")
+ARQUIVO_CACHE = os.environ.get("SALESFLOW_CACHE_CONSULTAS", "cache_consultas.db")
+ARQUIVO_TABELA_CEP = os.environ.get("SALESFLOW_TABELA_CEP", "")
+
+DIA = 24 * 60 * 60
+TTL_CNPJ = float(os.environ.get("SALESFLOW_TTL_CNPJ", str(30 * DIA)))
+TTL_CNPJ_NEGATIVO = float(os.environ.get("SALESFLOW_TTL_CNPJ_NEGATIVO", str(DIA)))
+TTL_CEP = float(os.environ.get("SALESFLOW_TTL_CEP", str(90 * DIA)))
+TTL_CEP_NEGATIVO = float(os.environ.get("SALESFLOW_TTL_CEP_NEGATIVO", str(DIA)))
+# Por quanto tempo apos vencer a entrada ainda e servida enquanto atualiza
+JANELA_REVALIDACAO = float(os.environ.get("SALESFLOW_JANELA_REVALIDACAO", str(30 * DIA)))
+
+
+def somente_digitos(texto):
+    return "".join(filter(str.isdigit, texto or ""))
+
+
+# === CACHE EM DUAS CAMADAS ===
+
+class CacheTTL:
+    """
+    Cache chave -> valor com TTL, em memoria (LRU) e opcionalmente em disco.
+
+    consultar(chave, buscar): buscar(chave) retorna o valor ou None
+    (nao encontrado, vira cache negativo). Excecoes sao falhas
+    transitorias: nao vao para o cache e sao repassadas a quem consultou.
+    """
+
+    def __init__(self, nome, ttl, ttl_negativo, janela_revalidacao=JANELA_REVALIDACAO,
+                 max_memoria=2048, arquivo=ARQUIVO_CACHE):
+        self.nome = nome
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.janela_revalidacao = janela_revalidacao
+        self.max_memoria = max_memoria
+        self.arquivo = arquivo
+
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()  # chave -> (valor, gravado_em)
+        self._local = threading.local()
+        self._revalidando = set()
+        self._contadores = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "hits_vencidos": 0,
+            "misses": 0,
+            "negativos": 0,
+            "erros": 0,
+            "revalidacoes": 0,
+        }
+        self._latencia = {"consultas": 0, "soma_ms": 0.0, "max_ms": 0.0}
+        self._latencia_rede = {"consultas": 0, "soma_ms": 0.0, "max_ms": 0.0}
+
+    # --- disco ---
+
+    def _conexao(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.arquivo, timeout=5, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "nome TEXT NOT NULL, chave TEXT NOT NULL, valor TEXT, gravado_em REAL NOT NULL, "
+                "PRIMARY KEY (nome, chave))"
+            )
+            self._local.con = con
+        return con
+
+    def _ler_disco(self, chave):
+        if not self.arquivo:
+            return None
+        row = self._conexao().execute(
+            "SELECT valor, gravado_em FROM cache WHERE nome = ? AND chave = ?", (self.nome, chave)
+        ).fetchone()
+        if row is None:
+            return None
+        valor, gravado_em = row
+        return (json.loads(valor) if valor is not None else None, gravado_em)
+
+    def _gravar_disco(self, chave, valor, gravado_em):
+        if not self.arquivo:
+            return
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO cache (nome, chave, valor, gravado_em) VALUES (?, ?, ?, ?)",
+            (self.nome, chave, json.dumps(valor, ensure_ascii=False) if valor is not None else None, gravado_em),
+        )
+
+    # --- memoria ---
+
+    def _ler_memoria(self, chave):
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                self._memoria.move_to_end(chave)
+            return entrada
+
+    def _gravar_memoria(self, chave, entrada):
+        with self._lock:
+            self._memoria[chave] = entrada
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    # --- consulta ---
+
+    def _idade_maxima(self, valor):
+        return self.ttl if valor is not None else self.ttl_negativo
+
+    def _contar(self, contador):
+        with self._lock:
+            self._contadores[contador] += 1
+
+    def _medir(self, latencia, inicio):
+        ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            latencia["consultas"] += 1
+            latencia["soma_ms"] += ms
+            latencia["max_ms"] = max(latencia["max_ms"], ms)
+
+    def _buscar_e_gravar(self, chave, buscar):
+        inicio = time.perf_counter()
+        try:
+            valor = buscar(chave)
+        finally:
+            self._medir(self._latencia_rede, inicio)
+        entrada = (valor, time.time())
+        self._gravar_memoria(chave, entrada)
+        self._gravar_disco(chave, *entrada)
+        return valor
+
+    def _revalidar(self, chave, buscar):
+        with self._lock:
+            if chave in self._revalidando:
+                return
+            self._revalidando.add(chave)
+            self._contadores["revalidacoes"] += 1
+
+        def tarefa():
+            try:
+                self._buscar_e_gravar(chave, buscar)
+            except Exception:
+                self._contar("erros")
+            finally:
+                with self._lock:
+                    self._revalidando.discard(chave)
+
+        threading.Thread(target=tarefa, name=f"revalida-{self.nome}", daemon=True).start()
+
+    def consultar(self, chave, buscar):
+        inicio = time.perf_counter()
+        try:
+            return self._consultar(chave, buscar)
+        finally:
+            self._medir(self._latencia, inicio)
+
+    def _consultar(self, chave, buscar):
+        agora = time.time()
+        entrada = self._ler_memoria(chave)
+        contador = "hits_memoria"
+        if entrada is None:
+            entrada = self._ler_disco(chave)
+            contador = "hits_disco"
+            if entrada is not None:
+                self._gravar_memoria(chave, entrada)
+
+        if entrada is not None:
+            valor, gravado_em = entrada
+            idade = agora - gravado_em
+            idade_maxima = self._idade_maxima(valor)
+            if idade <= idade_maxima:
+                self._contar(contador)
+                if valor is None:
+                    self._contar("negativos")
+                return valor
+            if valor is not None and idade <= idade_maxima + self.janela_revalidacao:
+                self._contar("hits_vencidos")
+                self._revalidar(chave, buscar)
+                return valor
+
+        self._contar("misses")
+        try:
+            valor = self._buscar_e_gravar(chave, buscar)
+        except Exception:
+            self._contar("erros")
+            raise
+        if valor is None:
+            self._contar("negativos")
+        return valor
+
+    def limpar_memoria(self):
+        with self._lock:
+            self._memoria.clear()
+
+    def estatisticas(self):
+        """Contadores de hit/miss e latencia (total e so da rede)."""
+        with self._lock:
+            def resumo(lat):
+                media = lat["soma_ms"] / lat["consultas"] if lat["consultas"] else 0.0
+                return {"consultas": lat["consultas"], "media_ms": round(media, 3), "max_ms": round(lat["max_ms"], 3)}
+
+            return {
+                **self._contadores,
+                "em_memoria": len(self._memoria),
+                "latencia": resumo(self._latencia),
+                "latencia_rede": resumo(self._latencia_rede),
+            }
+
+
+# === CNPJ (BrasilAPI) ===
+
+class ConsultaCNPJ:
+    """Consulta de CNPJ na BrasilAPI com CacheTTL."""
+
+    def __init__(self, url_base=URL_BRASILAPI_CNPJ, cache=None, http=None):
+        self.url_base = url_base.rstrip("/")
+        self.cache = cache or CacheTTL("cnpj", TTL_CNPJ, TTL_CNPJ_NEGATIVO)
+        self.http = http or obter_cliente_http()
+        self.invalidos = 0
+
+    def _buscar(self, cnpj_limpo):
+        response = self.http.get(f"{self.url_base}/{cnpj_limpo}", endpoint="brasilapi_cnpj")
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code in (400, 404):
+            return None  # nao existe: cache negativo
+        raise ErroHTTP("status", str(response.status_code))
+
+    def consultar(self, cnpj):
+        """Resultado com os dados da empresa ou o motivo da falha."""
+        cnpj_limpo = somente_digitos(cnpj)
+        if len(cnpj_limpo) != 14:
+            self.invalidos += 1
+            return Resultado(erro="invalido")
+        try:
+            dados = self.cache.consultar(cnpj_limpo, self._buscar)
+        except ErroHTTP as e:
+            return Resultado(erro=e.tipo, detalhe=e.detalhe)
+        return Resultado(dados) if dados is not None else Resultado(erro="nao_encontrado")
+
+    def estatisticas(self):
+        return {**self.cache.estatisticas(), "invalidos": self.invalidos}
+
+
+# === CEP (tabela local + ViaCEP) ===
+
+class TabelaCEP:
+    """
+    Tabela local de CEPs em arquivo binario lido via mmap: o SO carrega
+    so as paginas tocadas pela busca binaria, sem inflar a RAM do processo.
+
+    Formato (inteiros little-endian):
+        b"CEP1", n_ceps (uint32), n_faixas (uint32)
+        n_ceps   x (cep, offset)          ordenados por cep
+        n_faixas x (inicio, fim, offset)  ordenados por inicio
+        registros "logradouro\tbairro\tlocalidade\tuf\n" (UTF-8)
+
+    Faixas (ex: 32600000-32689999 -> Betim/MG) so tem cidade e UF e servem
+    de reserva quando o CEP exato nao e conhecido e a rede falha.
+    """
+
+    MAGICO = b"CEP1"
+    CABECALHO = struct.Struct("<4sII")
+    CEP = struct.Struct("<II")
+    FAIXA = struct.Struct("<III")
+
+    def __init__(self, caminho):
+        with open(caminho, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, self._n_ceps, self._n_faixas = self.CABECALHO.unpack_from(self._mm, 0)
+        if magico != self.MAGICO:
+            raise ValueError(f"{caminho} nao e uma tabela de CEP")
+        self._inicio_ceps = self.CABECALHO.size
+        self._inicio_faixas = self._inicio_ceps + self._n_ceps * self.CEP.size
+
+    def _busca_binaria(self, estrutura, inicio, n, cep):
+        """Maior registro cuja primeira chave e <= cep (ou None)."""
+        lo, hi = 0, n
+        while lo < hi:
+            meio = (lo + hi) // 2
+            if estrutura.unpack_from(self._mm, inicio + meio * estrutura.size)[0] <= cep:
+                lo = meio + 1
+            else:
+                hi = meio
+        return estrutura.unpack_from(self._mm, inicio + (lo - 1) * estrutura.size) if lo else None
+
+    def _registro(self, offset, cep):
+        fim = self._mm.find(b"\n", offset)
+        logradouro, bairro, localidade, uf = self._mm[offset:fim].decode("utf-8").split("\t")
+        return {
+            "cep": f"{cep[:5]}-{cep[5:]}",
+            "logradouro": logradouro,
+            "bairro": bairro,
+            "localidade": localidade,
+            "uf": uf,
+        }
+
+    def buscar(self, cep):
+        """CEP exato (8 digitos) ou None."""
+        achado = self._busca_binaria(self.CEP, self._inicio_ceps, self._n_ceps, int(cep))
+        if achado and achado[0] == int(cep):
+            return self._registro(achado[1], cep)
+        return None
+
+    def buscar_faixa(self, cep):
+        """Cidade/UF da faixa que contem o CEP, ou None."""
+        achado = self._busca_binaria(self.FAIXA, self._inicio_faixas, self._n_faixas, int(cep))
+        if achado and achado[0] <= int(cep) <= achado[1]:
+            return self._registro(achado[2], cep)
+        return None
+
+    @classmethod
+    def construir(cls, entrada_csv, saida):
+        """
+        Gera a tabela a partir de CSV (separador ';', com cabecalho):
+            cep;logradouro;bairro;localidade;uf
+        Faixas usam "inicio-fim" na coluna cep (ex: 32600000-32689999).
+        """
+        ceps, faixas, dados = [], [], bytearray()
+        with open(entrada_csv, "r", encoding="utf-8", newline="") as f:
+            for linha in csv.DictReader(f, delimiter=";"):
+                offset = len(dados)
+                campos = [linha.get(c, "").replace("\t", " ").strip()
+                          for c in ("logradouro", "bairro", "localidade", "uf")]
+                dados += ("\t".join(campos) + "\n").encode("utf-8")
+                digitos = somente_digitos(linha["cep"])
+                if len(digitos) == 16:
+                    faixas.append((int(digitos[:8]), int(digitos[8:]), offset))
+                else:
+                    ceps.append((int(digitos), offset))
+        ceps.sort()
+        faixas.sort()
+
+        base = cls.CABECALHO.size + len(ceps) * cls.CEP.size + len(faixas) * cls.FAIXA.size
+        with open(saida, "wb") as f:
+            f.write(cls.CABECALHO.pack(cls.MAGICO, len(ceps), len(faixas)))
+            for cep, offset in ceps:
+                f.write(cls.CEP.pack(cep, base + offset))
+            for inicio, fim, offset in faixas:
+                f.write(cls.FAIXA.pack(inicio, fim, base + offset))
+            f.write(dados)
+        return len(ceps), len(faixas)
+
+
+class ResolvedorCEP:
+    """
+    Resolve CEP na ordem: cache em memoria, cache em disco, tabela local,
+    ViaCEP. Se a rede falhar, usa a faixa da tabela local (cidade/UF).
+    """
+
+    def __init__(self, url_base=URL_VIACEP, cache=None, tabela=None, http=None):
+        self.url_base = url_base.rstrip("/")
+        self.http = http or obter_cliente_http()
+        self.cache = cache or CacheTTL("cep", TTL_CEP, TTL_CEP_NEGATIVO)
+        if tabela is None and ARQUIVO_TABELA_CEP and os.path.exists(ARQUIVO_TABELA_CEP):
+            tabela = TabelaCEP(ARQUIVO_TABELA_CEP)
+        self.tabela = tabela
+        self.invalidos = 0
+        self.hits_tabela = 0
+        self.hits_faixa = 0
+
+    def _buscar(self, cep_limpo):
+        if self.tabela:
+            dados = self.tabela.buscar(cep_limpo)
+            if dados:
+                self.hits_tabela += 1
+                return dados
+        response = self.http.get(f"{self.url_base}/{cep_limpo}/json/", endpoint="viacep")
+        if response.status_code == 200:
+            dados = response.json()
+            return None if "erro" in dados else dados
+        if response.status_code in (400, 404):
+            return None
+        raise ErroHTTP("status", str(response.status_code))
+
+    def consultar(self, cep):
+        """Resultado com o endereco (logradouro, bairro, localidade, uf) ou o motivo da falha."""
+        cep_limpo = somente_digitos(cep)
+        if len(cep_limpo) != 8:
+            self.invalidos += 1
+            return Resultado(erro="invalido")
+        try:
+            dados = self.cache.consultar(cep_limpo, self._buscar)
+            resultado = Resultado(dados) if dados is not None else Resultado(erro="nao_encontrado")
+        except ErroHTTP as e:
+            resultado = Resultado(erro=e.tipo, detalhe=e.detalhe)
+        if not resultado and self.tabela:
+            faixa = self.tabela.buscar_faixa(cep_limpo)
+            if faixa:
+                self.hits_faixa += 1
+                return Resultado(faixa)
+        return resultado
+
+    def estatisticas(self):
+        return {
+            **self.cache.estatisticas(),
+            "invalidos": self.invalidos,
+            "hits_tabela": self.hits_tabela,
+            "hits_faixa": self.hits_faixa,
+        }
+
+
+_consulta_cnpj = None
+_resolvedor_cep = None
+_consultas_lock = threading.Lock()
+
+
+def obter_consulta_cnpj():
+    """Instancia unica por processo (cache compartilhado entre sessoes)."""
+    global _consulta_cnpj
+    with _consultas_lock:
+        if _consulta_cnpj is None:
+            _consulta_cnpj = ConsultaCNPJ()
+        return _consulta_cnpj
+
+
+def obter_resolvedor_cep():
+    """Instancia unica por processo (cache compartilhado entre sessoes)."""
+    global _resolvedor_cep
+    with _consultas_lock:
+        if _resolvedor_cep is None:
+            _resolvedor_cep = ResolvedorCEP()
+        return _resolvedor_cep
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ferramentas de consulta do SalesFlow")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_indexar = sub.add_parser("indexar-ceps", help="gera a tabela local de CEPs a partir de CSV")
+    p_indexar.add_argument("entrada")
+    p_indexar.add_argument("saida")
+    args = parser.parse_args()
+
+    if args.comando == "indexar-ceps":
+        n_ceps, n_faixas = TabelaCEP.construir(args.entrada, args.saida)
+        print(f"{args.saida}: {n_ceps} CEPs, {n_faixas} faixas")
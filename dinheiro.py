@@ -0,0 +1,147 @@
+"""
+Dinheiro em centavos inteiros: totais exatos e formatacao BRL por tabela.
+
+Os itens continuam com preco_unitario e valor_total em reais (formato dos
+JSON e do PDF), mas agora tambem guardam os centavos, que sao a fonte da
+verdade:
+
+    {"preco_unitario": 44.9, "valor_total": 449.0,
+     "preco_centavos": 4490, "valor_centavos": 44900, ...}
+
+O orcamento guarda "total_centavos". Itens antigos (so com os floats) sao
+convertidos na leitura com arredondamento meio-para-cima, entao preview,
+PDF e metricas somam os mesmos inteiros, sem deriva de float.
+
+    novo_item(descricao, quantidade, preco)   -> item com reais e centavos
+    totalizar(itens, desconto_percentual)     -> Totais (subtotal, desconto,
+                                                 total, por_categoria)
+    formatar_centavos(4490) / formatar_moeda(44.9) -> "R$ 44,90"
+"""
+
+import math
+
+
+def centavos(valor):
+    """Reais (float/int) -> centavos, meio-para-cima (0.285 -> 29, nao 28)."""
+    if isinstance(valor, int):
+        return valor * 100
+    # 1e-6 absorve o erro binario: 0.285 * 100 == 28.499999999999996
+    c = math.floor(abs(valor) * 100 + 0.5 + 1e-6)
+    return c if valor >= 0 else -c
+
+
+def reais(valor_centavos):
+    return valor_centavos / 100
+
+
+def preco_item(item):
+    """Preco unitario do item em centavos (itens antigos: convertido do float)."""
+    c = item.get("preco_centavos")
+    return c if c is not None else centavos(item["preco_unitario"])
+
+
+def valor_item(item):
+    """Valor total do item em centavos (itens antigos: convertido do float)."""
+    c = item.get("valor_centavos")
+    return c if c is not None else centavos(item["valor_total"])
+
+
+def total_orcamento(orc):
+    """Total do orcamento em centavos."""
+    c = orc.get("total_centavos")
+    return c if c is not None else centavos(orc["total"])
+
+
+def novo_item(descricao, quantidade, preco, **extras):
+    """Item de orcamento a partir do preco em reais; valor = quantidade x preco em centavos."""
+    preco_c = centavos(preco)
+    valor_c = quantidade * preco_c if isinstance(quantidade, int) else centavos(quantidade * preco_c / 100)
+    item = {
+        "descricao": descricao,
+        "quantidade": quantidade,
+        "preco_unitario": reais(preco_c),
+        "valor_total": reais(valor_c),
+        "preco_centavos": preco_c,
+        "valor_centavos": valor_c,
+    }
+    item.update(extras)
+    return item
+
+
+class Totais:
+    """Totais de um orcamento em centavos."""
+
+    __slots__ = ("subtotal", "desconto", "total", "por_categoria", "pecas")
+
+    def __init__(self, subtotal, desconto, por_categoria, pecas):
+        self.subtotal = subtotal
+        self.desconto = desconto
+        self.total = subtotal - desconto
+        self.por_categoria = por_categoria
+        self.pecas = pecas
+
+    def __repr__(self):
+        return f"Totais(subtotal={self.subtotal}, desconto={self.desconto}, total={self.total})"
+
+
+def desconto_centavos(valor, percentual):
+    """Desconto de `percentual` % sobre `valor` centavos, arredondado meio-para-cima."""
+    pontos = centavos(percentual)  # 12.5% -> 1250 centesimos de ponto percentual
+    return (valor * pontos + 5000) // 10000
+
+
+def totalizar(itens, desconto_percentual=0, por_categoria=False):
+    """
+    Soma os itens de uma vez (inteiros, sem deriva). Com por_categoria=True
+    tambem agrupa os subtotais pela "categoria" do item ("Avulso" sem categoria).
+    """
+    valores = [valor_item(item) for item in itens]
+    subtotal = sum(valores)
+    pecas = sum(item["quantidade"] for item in itens)
+    categorias = {}
+    if por_categoria:
+        for item, valor in zip(itens, valores):
+            categoria = item.get("categoria") or "Avulso"
+            categorias[categoria] = categorias.get(categoria, 0) + valor
+    desconto = desconto_centavos(subtotal, desconto_percentual) if desconto_percentual else 0
+    return Totais(subtotal, desconto, categorias, pecas)
+
+
+# === FORMATACAO BRL ===
+
+# Grupos de milhar prontos: "0".."999" (grupo da esquerda, com e sem ".") e "000".."999"
+_GRUPO = [str(i) for i in range(1000)]
+_GRUPO_PONTO = [f"{i}." for i in range(1000)]
+_GRUPO_3 = [f"{i:03d}" for i in range(1000)]
+_CENTAVOS = [f",{i:02d}" for i in range(100)]
+
+# Textos ja formatados (precos e valores se repetem entre itens e reruns)
+_formatados = {}
+MAX_FORMATADOS = 65536
+
+
+def _formatar(valor):
+    if valor < 0:
+        return "R$ -" + _formatar(-valor)[3:]
+    inteiro, cent = divmod(valor, 100)
+    if inteiro < 1000:
+        return "R$ " + _GRUPO[inteiro] + _CENTAVOS[cent]
+    if inteiro < 1000000:
+        milhar, resto = divmod(inteiro, 1000)
+        return "R$ " + _GRUPO_PONTO[milhar] + _GRUPO_3[resto] + _CENTAVOS[cent]
+    return "R$ " + f"{inteiro:,}".replace(",", ".") + _CENTAVOS[cent]
+
+
+def formatar_centavos(valor):
+    """4490 -> "R$ 44,90"; 123456789 -> "R$ 1.234.567,89" (mesmo texto do antigo formatar_moeda)."""
+    texto = _formatados.get(valor)
+    if texto is None:
+        if len(_formatados) >= MAX_FORMATADOS:
+            _formatados.clear()
+        texto = _formatados[valor] = _formatar(valor)
+    return texto
+
+
+def formatar_moeda(valor):
+    """Formata valor em reais (float): 1234.5 -> "R$ 1.234,50"."""
+    return formatar_centavos(centavos(valor))
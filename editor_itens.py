@@ -0,0 +1,84 @@
+"""
+Edicao dos itens do orcamento em lote: uma tabela, um diff, um rerun.
+
+O preview mostra os itens num st.data_editor dentro de um st.form; nada roda
+enquanto o usuario edita. Ao clicar "Aplicar alteracoes" o Streamlit entrega
+so as celulas alteradas (edited_rows: {linha: {coluna: valor}}), que viram a
+nova lista de itens de uma vez:
+
+    linhas_itens(itens)                 -> tabela para o data_editor
+    aplicar_edicao(itens, alteracoes)   -> (itens, erros)
+
+Itens alterados sao refeitos com novo_item() (centavos recalculados) e
+mantem os demais campos (produto, categoria); os nao alterados sao os mesmos
+objetos. Com qualquer erro nada muda.
+"""
+
+from dinheiro import centavos, formatar_centavos, novo_item, preco_item, reais, valor_item
+
+COLUNA_DESCRICAO = "Descricao"
+COLUNA_QUANTIDADE = "Quantidade"
+COLUNA_PRECO_UNITARIO = "Preco Unit. (R$)"
+COLUNA_VALOR = "Valor"
+COLUNA_REMOVER = "Remover"
+
+# Campos refeitos por novo_item(); os demais passam adiante
+CAMPOS_VALOR = ("descricao", "quantidade", "preco_unitario", "valor_total", "preco_centavos", "valor_centavos")
+
+
+def linhas_itens(itens):
+    """Uma linha por item: descricao, quantidade e preco editaveis, valor so leitura."""
+    return [
+        {
+            COLUNA_DESCRICAO: item["descricao"],
+            COLUNA_QUANTIDADE: item["quantidade"],
+            COLUNA_PRECO_UNITARIO: reais(preco_item(item)),
+            COLUNA_VALOR: formatar_centavos(valor_item(item)),
+            COLUNA_REMOVER: False,
+        }
+        for item in itens
+    ]
+
+
+def _positivo(valor):
+    # None/NaN (celula apagada) e texto nao passam
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor > 0
+
+
+def aplicar_edicao(itens, alteracoes):
+    """
+    Aplica as alteracoes do data_editor ({linha: {coluna: valor}}) e devolve
+    (novos itens, erros). Com erro, devolve a lista original.
+    """
+    novos, erros = list(itens), []
+    removidos = set()
+    for linha, mudancas in alteracoes.items():
+        linha = int(linha)
+        if not 0 <= linha < len(itens):
+            continue
+        if mudancas.get(COLUNA_REMOVER):
+            removidos.add(linha)
+            continue
+        item = itens[linha]
+        descricao = str(mudancas.get(COLUNA_DESCRICAO, item["descricao"]) or "").strip()
+        quantidade = mudancas.get(COLUNA_QUANTIDADE, item["quantidade"])
+        preco = mudancas.get(COLUNA_PRECO_UNITARIO, reais(preco_item(item)))
+        onde = f"Linha {linha + 1}"
+        if not descricao:
+            erros.append(f"{onde}: descricao vazia")
+        elif not _positivo(quantidade):
+            erros.append(f"{onde}: quantidade invalida ({quantidade})")
+        elif not _positivo(preco):
+            erros.append(f"{onde}: preco invalido ({preco})")
+        else:
+            if isinstance(quantidade, float) and quantidade.is_integer():
+                quantidade = int(quantidade)
+            if (descricao, quantidade, centavos(preco)) == (item["descricao"], item["quantidade"], preco_item(item)):
+                continue  # editou e voltou ao valor original
+            extras = {k: v for k, v in item.items() if k not in CAMPOS_VALOR}
+            novos[linha] = novo_item(descricao, quantidade, preco, **extras)
+    if erros:
+        return list(itens), erros
+    if removidos:
+        novos = [item for i, item in enumerate(novos) if i not in removidos]
+    return novos, erros
@@ -0,0 +1,160 @@
+"""
+Exportacao em lote: varios orcamentos em um unico ZIP de PDFs.
+
+- Selecao por periodo, vendedor e cliente (filtrar_orcamentos do repositorio).
+- Renderizacao em paralelo num pool de processos (fpdf2 e CPU puro, threads
+  nao escalam por causa do GIL); cada processo decodifica o logo uma vez.
+- Cada PDF e gravado no ZIP assim que fica pronto, com no maximo
+  2 x processos PDFs pendentes: a memoria nao cresce com o tamanho do lote.
+- Callback de progresso (feitos, total) para a barra do Streamlit e a CLI.
+
+Uso pela linha de comando:
+    python exportar_lote.py --inicio 2026-01-01 --fim 2026-01-31 [--vendedor X] [--cliente Y] [--saida lote.zip]
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import types
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+from repositorio import obter_repositorio
+
+
+# Processos do pool (padrao: todos os nucleos)
+PROCESSOS = int(os.environ.get("SALESFLOW_PROCESSOS_PDF", "0")) or os.cpu_count() or 1
+# PDFs minimos por processo: subir um processo (spawn + imports) custa ~8 PDFs
+PDFS_POR_PROCESSO = 8
+
+# sys.modules["__main__"] e global: uma troca por vez entre as sessoes
+_principal_lock = threading.Lock()
+
+
+def nome_arquivo_pdf(orc):
+    """Mesmo nome do botao "Baixar PDF"."""
+    return f"Cotacao_{orc['numero']}.pdf"
+
+
+@contextmanager
+def sem_script_principal():
+    """
+    Para criar processos (spawn) de dentro do Streamlit: o script do app roda
+    registrado como __main__ (com __file__), e cada processo novo executaria
+    o app.py inteiro. Durante o bloco, __main__ vira um modulo vazio. Fora do
+    Streamlit (CLI) nao muda nada: la as funcoes podem estar no __main__.
+    Sessoes simultaneas esperam umas pelas outras, entao o bloco deve ser curto
+    (so o submit).
+    """
+    if "streamlit" not in sys.modules:
+        yield
+        return
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx() is None:
+        yield
+        return
+    with _principal_lock:
+        principal = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = principal
+
+
+def _iniciar_processo():
+    from gerar_pdf import aquecer_assets
+    aquecer_assets()
+
+
+def _renderizar(orc):
+    from gerar_pdf import gerar_pdf_orcamento
+    return nome_arquivo_pdf(orc), bytes(gerar_pdf_orcamento(orc))
+
+
+def em_paralelo(funcao, argumentos, processos):
+    """
+    funcao(*args) para cada args de `argumentos` (iteravel, consumido aos
+    poucos), num pool de `processos` processos; os resultados saem na ordem em
+    que ficam prontos, com no maximo 2 x processos pendentes. Com 1 processo
+    roda aqui mesmo, em ordem.
+    """
+    if processos <= 1:
+        for args in argumentos:
+            yield funcao(*args)
+        return
+
+    # spawn: o servidor do Streamlit tem threads, fork copiaria locks em uso
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processos, mp_context=contexto, initializer=_iniciar_processo) as pool:
+        fila = iter(argumentos)
+        pendentes = set()
+        while True:
+            while len(pendentes) < processos * 2:
+                args = next(fila, None)
+                if args is None:
+                    break
+                with sem_script_principal():
+                    pendentes.add(pool.submit(funcao, *args))
+            if not pendentes:
+                break
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                yield futuro.result()
+
+
+def selecionar_orcamentos(data_inicio=None, data_fim=None, vendedor=None, cliente=None):
+    """Orcamentos do lote; datas em AAAA-MM-DD (inclusivas)."""
+    return obter_repositorio().filtrar_orcamentos(data_inicio, data_fim, vendedor, cliente)
+
+
+def exportar_zip(orcamentos, destino, processos=None, progresso=None):
+    """
+    Grava um PDF por orcamento no ZIP `destino` (caminho ou arquivo aberto).
+    Retorna o numero de PDFs gravados.
+    """
+    total = len(orcamentos)
+    processos = max(1, min(processos or PROCESSOS, total // PDFS_POR_PROCESSO))
+    feitos = 0
+
+    # PDF ja e comprimido: ZIP_STORED evita gastar CPU recomprimindo
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zf:
+        def gravar(nome, pdf):
+            nonlocal feitos
+            zf.writestr(nome, pdf)
+            feitos += 1
+            if progresso:
+                progresso(feitos, total)
+
+        for nome, pdf in em_paralelo(_renderizar, ((orc,) for orc in orcamentos), processos):
+            gravar(nome, pdf)
+
+    return feitos
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Exporta orcamentos em um ZIP de PDFs")
+    parser.add_argument("--inicio", help="data inicial AAAA-MM-DD")
+    parser.add_argument("--fim", help="data final AAAA-MM-DD")
+    parser.add_argument("--vendedor")
+    parser.add_argument("--cliente", help="nome (parte) ou CPF/CNPJ")
+    parser.add_argument("--saida", default="orcamentos.zip")
+    parser.add_argument("--processos", type=int, default=PROCESSOS)
+    args = parser.parse_args()
+
+    selecionados = selecionar_orcamentos(args.inicio, args.fim, args.vendedor, args.cliente)
+    if not selecionados:
+        raise SystemExit("Nenhum orcamento no filtro.")
+
+    def mostrar(feitos, total):
+        print(f"\r{feitos}/{total}", end="", flush=True)
+
+    inicio = time.perf_counter()
+    gravados = exportar_zip(selecionados, args.saida, args.processos, mostrar)
+    segundos = time.perf_counter() - inicio
+    print(f"\n{gravados} PDFs em {args.saida} ({segundos:.1f}s, {gravados / segundos:.1f} PDF/s)")
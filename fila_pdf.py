@@ -0,0 +1,261 @@
+"""
+Fila de renderizacao de PDFs em segundo plano, com status por trabalho.
+
+O "Gerar PDF" nao renderiza mais na thread do script do Streamlit: o
+orcamento vai para a fila, um pool de processos renderiza (fpdf2 e CPU puro,
+threads disputariam o GIL com as sessoes) e a interface consulta o status a
+cada rerun ate o PDF ficar pronto:
+
+    trabalho = obter_fila_pdf().enviar(dados)   # idempotente
+    trabalho.aguardar(0.5)                      # True se terminou
+    trabalho.estado                             # na_fila | renderizando | pronto | erro
+    trabalho.pdf / trabalho.erro
+
+Trabalhos sao identificados por chave_pdf(dados): enviar o mesmo orcamento de
+novo (outro rerun, outro clique, outra sessao) devolve o trabalho que ja esta
+na fila, e PDFs ja renderizados saem do CachePDF sem ir para a fila.
+
+Limites (backpressure), para um pico de fim de mes nao estourar a memoria do
+container:
+
+    SALESFLOW_FILA_PDF_PROCESSOS   processos renderizando (padrao 2)
+    SALESFLOW_FILA_PDF_MAX         trabalhos na fila + renderizando (padrao 32)
+    SALESFLOW_FILA_PDF_MAX_ITENS   soma dos itens desses trabalhos (padrao 50000)
+    SALESFLOW_FILA_PDF_MB          PDFs prontos guardados na fila (padrao 64 MB)
+    SALESFLOW_FILA_PDF_TTL         segundos que um PDF pronto fica na fila (padrao 900)
+
+Acima de MAX ou MAX_ITENS, enviar() levanta FilaCheia. Um orcamento sozinho
+maior que MAX_ITENS ainda entra se a fila estiver vazia. PDFs prontos que
+saem da fila continuam no CachePDF: enviar() de novo os devolve na hora.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from exportar_lote import sem_script_principal
+from gerar_pdf import chave_pdf, obter_cache_pdf
+from instrumentacao import obter_instrumentacao
+
+
+PROCESSOS = int(os.environ.get("SALESFLOW_FILA_PDF_PROCESSOS", "2"))
+MAX_TRABALHOS = int(os.environ.get("SALESFLOW_FILA_PDF_MAX", "32"))
+MAX_ITENS = int(os.environ.get("SALESFLOW_FILA_PDF_MAX_ITENS", "50000"))
+MAX_MB_PRONTOS = int(os.environ.get("SALESFLOW_FILA_PDF_MB", "64"))
+TTL_PRONTOS = float(os.environ.get("SALESFLOW_FILA_PDF_TTL", "900"))
+
+ESTADO_NA_FILA = "na_fila"
+ESTADO_RENDERIZANDO = "renderizando"
+ESTADO_PRONTO = "pronto"
+ESTADO_ERRO = "erro"
+
+
+class FilaCheia(Exception):
+    """Fila no limite (trabalhos ou itens): tentar de novo em instantes."""
+
+
+def _iniciar_processo():
+    from gerar_pdf import aquecer_assets
+    aquecer_assets()
+
+
+def _renderizar(dados):
+    from gerar_pdf import gerar_pdf_orcamento
+    return bytes(gerar_pdf_orcamento(dados))
+
+
+class Trabalho:
+    """Um PDF pedido a fila; o estado e lido a cada rerun (polling)."""
+
+    def __init__(self, chave, itens):
+        self.chave = chave
+        self.itens = itens
+        self.enviado = time.monotonic()
+        self.concluido = None
+        self.pdf = None
+        self.erro = None
+        self._futuro = None
+        self._fim = threading.Event()
+
+    @property
+    def estado(self):
+        if self.pdf is not None:
+            return ESTADO_PRONTO
+        if self.erro is not None:
+            return ESTADO_ERRO
+        if self._futuro is not None and self._futuro.running():
+            return ESTADO_RENDERIZANDO
+        return ESTADO_NA_FILA
+
+    @property
+    def segundos(self):
+        """Tempo de fila + renderizacao (ate agora, se nao terminou)."""
+        return (self.concluido or time.monotonic()) - self.enviado
+
+    def aguardar(self, timeout=None):
+        """Espera ate `timeout` s; True se o trabalho terminou (pronto ou erro)."""
+        return self._fim.wait(timeout)
+
+    def _terminar(self, pdf=None, erro=None):
+        self.pdf, self.erro = pdf, erro
+        self.concluido = time.monotonic()
+        self._fim.set()
+
+
+class FilaPDF:
+    """Fila limitada de PDFs sobre um pool de processos (spawn), com deduplicacao."""
+
+    def __init__(self, processos=PROCESSOS, max_trabalhos=MAX_TRABALHOS, max_itens=MAX_ITENS,
+                 max_bytes_prontos=MAX_MB_PRONTOS * 1024 * 1024, ttl_prontos=TTL_PRONTOS, cache=None):
+        self.processos = max(1, processos)
+        self.max_trabalhos = max_trabalhos
+        self.max_itens = max_itens
+        self.max_bytes_prontos = max_bytes_prontos
+        self.ttl_prontos = ttl_prontos
+        self.cache = cache if cache is not None else obter_cache_pdf()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pendentes = {}           # chave -> Trabalho (na fila ou renderizando)
+        self._itens_pendentes = 0
+        self._prontos = OrderedDict()  # chave -> Trabalho terminado, do mais antigo ao mais novo
+        self._bytes_prontos = 0
+        self.enviados = 0
+        self.deduplicados = 0
+        self.recusados = 0
+
+    def _obter_pool(self):
+        if self._pool is None:
+            # spawn: o servidor do Streamlit tem threads, fork copiaria locks em uso
+            contexto = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(self.processos, mp_context=contexto, initializer=_iniciar_processo)
+        return self._pool
+
+    def enviar(self, dados: dict) -> Trabalho:
+        """
+        Trabalho do PDF de `dados`: o que ja existe para o mesmo conteudo, um
+        pronto (CachePDF) ou um novo na fila. FilaCheia se nao ha vaga.
+        """
+        chave = chave_pdf(dados)
+        with self._lock:
+            self._expirar()
+            trabalho = self._pendentes.get(chave) or self._prontos.get(chave)
+            if trabalho is not None and trabalho.estado != ESTADO_ERRO:
+                self.deduplicados += 1
+                return trabalho
+
+        itens = len(dados.get("itens", []))
+        trabalho = Trabalho(chave, itens)
+        pdf_bytes = self.cache.buscar(chave)
+        if pdf_bytes is not None:
+            trabalho._terminar(pdf=pdf_bytes)
+            with self._lock:
+                self._guardar_pronto(trabalho)
+            return trabalho
+
+        with self._lock:
+            # Outra sessao pode ter enfileirado o mesmo PDF enquanto o cache era lido
+            existente = self._pendentes.get(chave)
+            if existente is not None:
+                self.deduplicados += 1
+                return existente
+            if self._pendentes and (
+                len(self._pendentes) >= self.max_trabalhos or self._itens_pendentes + itens > self.max_itens
+            ):
+                self.recusados += 1
+                raise FilaCheia(
+                    f"{len(self._pendentes)} PDFs ({self._itens_pendentes} itens) na fila"
+                )
+            self._pendentes[chave] = trabalho
+            self._itens_pendentes += itens
+            self.enviados += 1
+            with sem_script_principal():
+                pool = self._obter_pool()
+                try:
+                    trabalho._futuro = pool.submit(_renderizar, dados)
+                except BrokenProcessPool:
+                    # Um processo morreu (ex.: falta de memoria): recria o pool
+                    self._descartar_pool(pool)
+                    pool = self._obter_pool()
+                    trabalho._futuro = pool.submit(_renderizar, dados)
+        trabalho._futuro.add_done_callback(lambda futuro: self._concluir(trabalho, futuro, pool))
+        return trabalho
+
+    def _descartar_pool(self, pool):
+        # Chamado com o lock: o proximo envio cria outro pool
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _concluir(self, trabalho, futuro, pool):
+        try:
+            pdf_bytes, erro = futuro.result(), None
+        except BrokenProcessPool as e:
+            pdf_bytes, erro = None, e
+            with self._lock:
+                self._descartar_pool(pool)
+        except Exception as e:
+            pdf_bytes, erro = None, e
+        if pdf_bytes is not None:
+            self.cache.guardar(trabalho.chave, pdf_bytes)
+        with self._lock:
+            self._pendentes.pop(trabalho.chave, None)
+            self._itens_pendentes -= trabalho.itens
+            trabalho._terminar(pdf=pdf_bytes, erro=erro)
+            if erro is None:
+                self._guardar_pronto(trabalho)
+        if erro is None:
+            # O span medido no processo filho se perde: mede aqui, de enviar() ate o fim
+            obter_instrumentacao().observar_amostrado("gerar_pdf_orcamento", trabalho.segundos)
+
+    def _guardar_pronto(self, trabalho):
+        # Chamado com o lock
+        if trabalho.chave in self._prontos:
+            return
+        self._prontos[trabalho.chave] = trabalho
+        self._bytes_prontos += len(trabalho.pdf)
+        self._expirar()
+
+    def _expirar(self):
+        # Chamado com o lock: descarta os mais antigos por idade e por bytes
+        agora = time.monotonic()
+        while self._prontos:
+            chave, trabalho = next(iter(self._prontos.items()))
+            if agora - trabalho.concluido <= self.ttl_prontos and self._bytes_prontos <= self.max_bytes_prontos:
+                break
+            del self._prontos[chave]
+            self._bytes_prontos -= len(trabalho.pdf)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "pendentes": len(self._pendentes),
+                "itens_pendentes": self._itens_pendentes,
+                "prontos": len(self._prontos),
+                "bytes_prontos": self._bytes_prontos,
+                "enviados": self.enviados,
+                "deduplicados": self.deduplicados,
+                "recusados": self.recusados,
+            }
+
+    def encerrar(self, aguardar=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=aguardar, cancel_futures=not aguardar)
+
+
+_fila_pdf = None
+_fila_lock = threading.Lock()
+
+
+def obter_fila_pdf():
+    """Fila unica por processo (compartilhada entre as sessoes do Streamlit)."""
+    global _fila_pdf
+    with _fila_lock:
+        if _fila_pdf is None:
+            _fila_pdf = FilaPDF()
+        return _fila_pdf
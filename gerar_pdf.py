@@ -3,20 +3,108 @@ Geracao de PDF para orcamentos usando fpdf2.
 Layout profissional Brasil UP.
 """
 
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
 from fpdf import FPDF
+from fpdf.image_parsing import get_img_info
+from PIL import Image
+
+from dinheiro import formatar_centavos, preco_item, total_orcamento, valor_item
+from instrumentacao import medido
+
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), 'logo.png')
+LOGO_LARGURA_MM = 50
+LOGO_DPI = 300  # resolucao de impressao; o PNG original (3230 px) e reduzido para ~590 px
+NOME_LOGO = 'logo-brasilup'
+
+_logo_info = None  # ImageInfo do fpdf2 ja decodificado; False = sem logo
+_assets_lock = threading.Lock()
+
+
+def carregar_logo():
+    """
+    Decodifica logo.png uma vez por processo, ja reduzido para a largura
+    impressa, e guarda o ImageInfo do fpdf2 para reusar em todo PDF.
+    """
+    global _logo_info
+    with _assets_lock:
+        if _logo_info is None:
+            if not os.path.exists(LOGO_PATH):
+                _logo_info = False
+            else:
+                with Image.open(LOGO_PATH) as img:
+                    largura_px = round(LOGO_LARGURA_MM / 25.4 * LOGO_DPI)
+                    if img.width > largura_px:
+                        altura_px = round(img.height * largura_px / img.width)
+                        img = img.resize((largura_px, altura_px), Image.LANCZOS)
+                    _logo_info = get_img_info(NOME_LOGO, img)
+        return _logo_info
+
+
+def aquecer_assets():
+    """Carrega os assets estaticos antes do primeiro PDF (chamado no startup)."""
+    carregar_logo()
+
+
+# Secao deste arquivo onde o layout termina (cache e CLI vem depois e nao entram na versao)
+FIM_DO_LAYOUT = b'# === CACHE DE PDFS GERADOS ==='
+
+
+def _versao_template():
+    """
+    Muda quando o layout (este arquivo ate FIM_DO_LAYOUT), a formatacao de
+    valores (dinheiro.py) ou o logo mudam: invalida os PDFs em cache.
+    """
+    import dinheiro
+
+    h = hashlib.sha256()
+    for caminho in (__file__, dinheiro.__file__, LOGO_PATH):
+        try:
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+        except FileNotFoundError:
+            continue
+        if caminho == __file__:
+            conteudo = conteudo[:conteudo.rfind(FIM_DO_LAYOUT)]
+        h.update(conteudo)
+    return h.hexdigest()[:16]
 
 
-def formatar_moeda(valor):
-    """Formata valor em reais."""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+VERSAO_TEMPLATE = _versao_template()
 
 
 class PDFOrcamento(FPDF):
+    cache_logo = True  # False = comportamento antigo (le o PNG a cada PDF), para medicao
+
     def __init__(self, dados):
         super().__init__()
         self.dados = dados
         self.set_auto_page_break(auto=True, margin=30)
+        self.logo = self._registrar_logo() if self.cache_logo else LOGO_PATH
+
+    def _registrar_logo(self):
+        """Coloca o logo ja decodificado no cache de imagens deste documento."""
+        logo = carregar_logo()
+        if not logo:
+            return None
+        # Copia rasa: os bytes comprimidos sao compartilhados entre documentos
+        info = type(logo)(logo)
+        info["i"] = len(self.image_cache.images) + 1
+        info["usages"] = 0
+        info["iccp_i"] = None
+        if info.get("iccp"):
+            perfis = self.image_cache.icc_profiles
+            info["iccp_i"] = perfis.setdefault(info["iccp"], len(perfis))
+            info["iccp"] = None
+        self.image_cache.images[NOME_LOGO] = info
+        return NOME_LOGO
 
     def header(self):
         # Fundo do header (aumentado para caber a logo)
@@ -27,12 +115,11 @@ class PDFOrcamento(FPDF):
         self.set_fill_color(30, 90, 138)
         self.rect(0, 42, 210, 2, 'F')
 
-        # Logo (direita) - tenta carregar imagem
-        logo_path = os.path.join(os.path.dirname(__file__), 'logo.png')
-        if os.path.exists(logo_path):
+        # Logo (direita) - decodificado uma vez por processo (carregar_logo)
+        if self.logo and (self.cache_logo or os.path.exists(self.logo)):
             # Logo: 3230x1291 px (proporcao ~2.5:1)
             # w=50mm -> h=20mm
-            self.image(logo_path, x=145, y=8, w=50)
+            self.image(self.logo, x=145, y=8, w=LOGO_LARGURA_MM)
         else:
             # Fallback: texto
             self.set_font('Helvetica', 'B', 22)
@@ -78,11 +165,154 @@ class PDFOrcamento(FPDF):
         self.cell(0, 4, f'Pagina {self.page_no()}', align='C')
 
 
-def gerar_pdf_orcamento(dados: dict) -> bytes:
+# === TABELA DE ITENS ===
+
+# (largura mm, titulo, alinhamento) de cada coluna
+COLUNAS_ITENS = ((80, '  DESCRICAO', 'L'), (30, 'QUANTIDADE', 'C'), (35, 'PRECO UNIT.', 'C'), (35, 'VALOR', 'C'))
+X_TABELA = 15
+LARGURA_TABELA = sum(largura for largura, _, _ in COLUNAS_ITENS)
+ALTURA_LINHA = 9  # linha com uma linha de descricao
+ENTRELINHA = 4.5  # cada linha a mais da descricao quebrada
+ALTURA_TOTAL = 11
+Y_CONTINUACAO = 50  # inicio da tabela nas paginas seguintes, abaixo do header
+MARGEM_RODAPE = 30
+
+
+class TabelaItens:
     """
-    Gera PDF do orcamento no formato Brasil UP.
-    Retorna bytes do PDF.
+    Tabela de itens paginada: quebra descricoes longas em varias linhas,
+    repete o cabecalho em cada pagina e nunca parte um item entre paginas.
+
+    Cada linha e um rect() de fundo + text() por coluna (cell() custa ~3x
+    mais por chamada) e as larguras de texto ficam em cache, entao o custo
+    por item e constante e o tempo cresce linear com o numero de itens.
     """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self.limite = pdf.h - MARGEM_RODAPE
+        self._larguras = {}  # texto -> largura na fonte das linhas
+        pdf.set_font('Helvetica', '', 9)
+        self.recuo = pdf.c_margin + pdf.get_string_width('  ')
+        self.largura_descricao = COLUNAS_ITENS[0][0] - self.recuo - pdf.c_margin
+
+    def _largura(self, texto):
+        largura = self._larguras.get(texto)
+        if largura is None:
+            largura = self._larguras[texto] = self.pdf.get_string_width(texto)
+        return largura
+
+    def _pedacos(self, palavra, largura):
+        """Palavra mais larga que a coluna: corta por caractere."""
+        if self._largura(palavra) <= largura:
+            return (palavra,)
+        pedacos, inicio, usado = [], 0, 0.0
+        for i, caractere in enumerate(palavra):
+            w = self._largura(caractere)
+            if usado + w > largura and i > inicio:
+                pedacos.append(palavra[inicio:i])
+                inicio, usado = i, 0.0
+            usado += w
+        pedacos.append(palavra[inicio:])
+        return pedacos
+
+    def quebrar(self, texto, largura):
+        """Linhas de `texto` que cabem em `largura` mm, palavra a palavra."""
+        if self._largura(texto) <= largura:
+            return [texto]
+        espaco = self._largura(' ')
+        linhas, atual, usado = [], [], 0.0
+        for palavra in texto.split():
+            for pedaco in self._pedacos(palavra, largura):
+                w = self._largura(pedaco)
+                if atual and usado + espaco + w > largura:
+                    linhas.append(' '.join(atual))
+                    atual, usado = [], 0.0
+                usado = usado + espaco + w if atual else w
+                atual.append(pedaco)
+        if atual:
+            linhas.append(' '.join(atual))
+        return linhas or ['']
+
+    def cabecalho(self):
+        pdf = self.pdf
+        y = pdf.get_y()
+        pdf.set_fill_color(30, 90, 138)
+        pdf.rect(X_TABELA, y, LARGURA_TABELA, ALTURA_LINHA, 'F')
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Helvetica', 'B', 8)
+        base = y + ALTURA_LINHA / 2 + 0.3 * pdf.font_size
+        x = X_TABELA
+        for largura, titulo, alinhamento in COLUNAS_ITENS:
+            if alinhamento == 'L':
+                pdf.text(x + pdf.c_margin, base, titulo)
+            else:
+                pdf.text(x + (largura - pdf.get_string_width(titulo)) / 2, base, titulo)
+            x += largura
+        pdf.set_y(y + ALTURA_LINHA)
+
+        # Estado das linhas de itens
+        pdf.set_font('Helvetica', '', 9)
+        pdf.set_text_color(55, 65, 81)
+        pdf.set_fill_color(248, 250, 252)
+
+    def nova_pagina(self):
+        self.pdf.add_page()
+        self.pdf.set_y(Y_CONTINUACAO)
+        self.cabecalho()
+
+    def linha(self, indice, item):
+        pdf = self.pdf
+        linhas = self.quebrar(item['descricao'], self.largura_descricao)
+        altura = ALTURA_LINHA + (len(linhas) - 1) * ENTRELINHA
+        if pdf.get_y() + altura > self.limite:
+            self.nova_pagina()
+        y = pdf.get_y()
+        if indice % 2 == 0:  # as demais ficam no branco da pagina
+            pdf.rect(X_TABELA, y, LARGURA_TABELA, altura, 'F')
+
+        # Baseline como a do cell(): centro da linha + 0.3 x tamanho da fonte
+        ajuste = 0.3 * pdf.font_size
+        base = y + (altura - (len(linhas) - 1) * ENTRELINHA) / 2 + ajuste
+        for k, texto in enumerate(linhas):
+            pdf.text(X_TABELA + self.recuo, base + k * ENTRELINHA, texto)
+
+        meio = y + altura / 2 + ajuste
+        x = X_TABELA + COLUNAS_ITENS[0][0]
+        colunas = (
+            f"{item['quantidade']:.0f} Un",
+            formatar_centavos(preco_item(item)),
+            formatar_centavos(valor_item(item)),
+        )
+        for (largura, _, _), texto in zip(COLUNAS_ITENS[1:], colunas):
+            pdf.text(x + (largura - self._largura(texto)) / 2, meio, texto)
+            x += largura
+        pdf.set_y(y + altura)
+
+    def total(self, total_centavos):
+        pdf = self.pdf
+        if pdf.get_y() + ALTURA_TOTAL > self.limite:
+            self.nova_pagina()
+        pdf.set_fill_color(30, 90, 138)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font('Helvetica', 'B', 11)
+        pdf.set_x(X_TABELA)
+        pdf.cell(LARGURA_TABELA - COLUNAS_ITENS[-1][0], ALTURA_TOTAL, 'TOTAL', fill=True, align='R')
+        pdf.cell(COLUNAS_ITENS[-1][0], ALTURA_TOTAL, formatar_centavos(total_centavos), fill=True, align='C')
+        pdf.ln()
+
+    def desenhar(self, itens, total_centavos):
+        # Quebra de pagina manual: a automatica nao repete o cabecalho
+        self.pdf.set_auto_page_break(False)
+        self.cabecalho()
+        for indice, item in enumerate(itens):
+            self.linha(indice, item)
+        self.total(total_centavos)
+        self.pdf.set_auto_page_break(True, margin=MARGEM_RODAPE)
+
+
+def montar_pdf_orcamento(dados: dict) -> PDFOrcamento:
+    """Monta o documento do orcamento em memoria, pronto para output()."""
     pdf = PDFOrcamento(dados)
     pdf.add_page()
 
@@ -166,41 +396,7 @@ def gerar_pdf_orcamento(dados: dict) -> bytes:
     # === TABELA DE ITENS ===
     pdf.set_y(y_start + 58)
 
-    # Header da tabela
-    pdf.set_fill_color(30, 90, 138)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font('Helvetica', 'B', 8)
-
-    pdf.set_x(15)
-    pdf.cell(80, 9, '  DESCRICAO', fill=True, align='L')
-    pdf.cell(30, 9, 'QUANTIDADE', fill=True, align='C')
-    pdf.cell(35, 9, 'PRECO UNIT.', fill=True, align='C')
-    pdf.cell(35, 9, 'VALOR', fill=True, align='C')
-    pdf.ln()
-
-    # Itens
-    pdf.set_font('Helvetica', '', 9)
-    pdf.set_text_color(55, 65, 81)
-
-    for i, item in enumerate(dados['itens']):
-        bg = (248, 250, 252) if i % 2 == 0 else (255, 255, 255)
-        pdf.set_fill_color(*bg)
-
-        pdf.set_x(15)
-        pdf.cell(80, 9, f"  {item['descricao']}", fill=True, align='L')
-        pdf.cell(30, 9, f"{item['quantidade']:.0f} Un", fill=True, align='C')
-        pdf.cell(35, 9, formatar_moeda(item['preco_unitario']), fill=True, align='C')
-        pdf.cell(35, 9, formatar_moeda(item['valor_total']), fill=True, align='C')
-        pdf.ln()
-
-    # Linha total
-    pdf.set_fill_color(30, 90, 138)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font('Helvetica', 'B', 11)
-    pdf.set_x(15)
-    pdf.cell(145, 11, 'TOTAL', fill=True, align='R')
-    pdf.cell(35, 11, formatar_moeda(dados['total']), fill=True, align='C')
-    pdf.ln()
+    TabelaItens(pdf).desenhar(dados['itens'], total_orcamento(dados))
 
     # Observacoes / Informacoes Importantes
     observacoes = dados.get('observacoes', '')
@@ -219,7 +415,360 @@ def gerar_pdf_orcamento(dados: dict) -> bytes:
         pdf.set_x(15)
         pdf.multi_cell(180, 5, f"  {observacoes}", border='LBR', fill=True, align='L')
 
-    return bytes(pdf.output())
+    return pdf
+
+
+@medido("gerar_pdf_orcamento")
+def gerar_pdf_orcamento(dados: dict) -> bytes:
+    """
+    Gera PDF do orcamento no formato Brasil UP.
+    Retorna bytes do PDF.
+    """
+    return bytes(montar_pdf_orcamento(dados).output())
+
+
+BLOCO_ESCRITA = 1024 * 1024
+
+
+@medido("gerar_pdf_orcamento")
+def escrever_pdf_orcamento(dados: dict, destino) -> int:
+    """
+    Gera o PDF direto em `destino` (caminho, arquivo ou resposta com write())
+    em blocos de 1 MB, sem a copia extra de bytes(). Retorna o tamanho.
+    """
+    saida = memoryview(montar_pdf_orcamento(dados).output())
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, 'wb') as f:
+            return _escrever_em_blocos(saida, f)
+    return _escrever_em_blocos(saida, destino)
+
+
+def _escrever_em_blocos(saida, arquivo):
+    for inicio in range(0, len(saida), BLOCO_ESCRITA):
+        arquivo.write(saida[inicio:inicio + BLOCO_ESCRITA])
+    return len(saida)
+
+
+# === CACHE DE PDFS GERADOS ===
+
+def chave_pdf(dados: dict) -> str:
+    """Hash estavel do orcamento (JSON canonico) + versao do template."""
+    canonico = json.dumps(dados, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{VERSAO_TEMPLATE}:{canonico}".encode('utf-8')).hexdigest()
+
+
+class CachePDF:
+    """
+    PDFs ja renderizados, enderecados pelo conteudo (chave_pdf).
+    Memoria: LRU limitado em bytes. Disco (opcional): um arquivo <hash>.pdf
+    por entrada, os menos usados (mtime) sao apagados ao passar do limite.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, diretorio=None, max_bytes_disco=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.diretorio = diretorio
+        self.max_bytes_disco = max_bytes_disco
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()  # chave -> bytes
+        self._bytes = 0
+        self.hits = 0
+        self.hits_disco = 0
+        self.misses = 0
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _guardar_memoria(self, chave, pdf_bytes):
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                return
+            self._memoria[chave] = pdf_bytes
+            self._bytes += len(pdf_bytes)
+            while self._bytes > self.max_bytes and len(self._memoria) > 1:
+                _, removido = self._memoria.popitem(last=False)
+                self._bytes -= len(removido)
+
+    def _ler_disco(self, chave):
+        if not self.diretorio:
+            return None
+        caminho = os.path.join(self.diretorio, f"{chave}.pdf")
+        try:
+            with open(caminho, 'rb') as f:
+                pdf_bytes = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(caminho)  # marca como usado recentemente
+        return pdf_bytes
+
+    def _gravar_disco(self, chave, pdf_bytes):
+        if not self.diretorio:
+            return
+        caminho = os.path.join(self.diretorio, f"{chave}.pdf")
+        tmp = f"{caminho}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            f.write(pdf_bytes)
+        os.replace(tmp, caminho)
+
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith('.pdf'):
+                st = entrada.stat()
+                arquivos.append((st.st_mtime, st.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, antigo in sorted(arquivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def buscar(self, chave: str):
+        """PDF ja renderizado (memoria ou disco) ou None; nunca renderiza."""
+        with self._lock:
+            pdf_bytes = self._memoria.get(chave)
+            if pdf_bytes is not None:
+                self._memoria.move_to_end(chave)
+                self.hits += 1
+                return pdf_bytes
+
+        pdf_bytes = self._ler_disco(chave)
+        if pdf_bytes is None:
+            self.misses += 1
+        else:
+            self.hits_disco += 1
+            self._guardar_memoria(chave, pdf_bytes)
+        return pdf_bytes
+
+    def guardar(self, chave: str, pdf_bytes: bytes):
+        """Guarda um PDF renderizado fora do cache (ex.: pela fila_pdf)."""
+        self._gravar_disco(chave, pdf_bytes)
+        self._guardar_memoria(chave, pdf_bytes)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "entradas": len(self._memoria),
+                "bytes": self._bytes,
+            }
+
+
+_cache_pdf = None
+
+
+def obter_cache_pdf():
+    """Cache unico por processo, configurado por SALESFLOW_CACHE_PDF_*."""
+    global _cache_pdf
+    with _assets_lock:
+        if _cache_pdf is None:
+            _cache_pdf = CachePDF(
+                max_bytes=int(os.environ.get("SALESFLOW_CACHE_PDF_MB", "64")) * 1024 * 1024,
+                diretorio=os.environ.get("SALESFLOW_CACHE_PDF_DIR") or None,
+                max_bytes_disco=int(os.environ.get("SALESFLOW_CACHE_PDF_DISCO_MB", "512")) * 1024 * 1024,
+            )
+        return _cache_pdf
+
+
+# === RENDERIZACAO EM LOTE (linha de comando) ===
+
+# Nome do PDF -> chave_pdf do conteudo renderizado (modo incremental)
+MANIFESTO = "manifesto_pdfs.json"
+# Segundos entre gravacoes do manifesto durante o lote (progresso sobrevive a um Ctrl+C)
+INTERVALO_MANIFESTO = 5.0
+
+
+def _orcamentos_de(dados):
+    """Um orcamento, uma lista, {"orcamentos": [...]} ou um registro do diario."""
+    if isinstance(dados, list):
+        yield from dados
+    elif "orcamentos" in dados:
+        yield from dados["orcamentos"]
+    elif "op" in dados:
+        if dados["op"] == "orcamento":
+            yield dados["dados"]
+    else:
+        yield dados
+
+
+def _ler_jsonl(linhas, nome):
+    for numero, linha in enumerate(linhas, 1):
+        if not linha.strip():
+            continue
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            raise ValueError(f"JSON invalido em {nome}:{numero}") from None
+        yield from _orcamentos_de(dados)
+
+
+def _ler_arquivo(caminho):
+    if caminho.endswith('.jsonl'):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            yield from _ler_jsonl(f, caminho)
+        return
+    diario = f"{os.path.splitext(caminho)[0]}.jsonl"
+    if os.path.exists(diario):
+        # orcamentos.json do app: snapshot + diario, sem a trava do app
+        from armazenamento import DiarioOrcamentos
+        yield from DiarioOrcamentos(caminho, diario, compactar_em_segundo_plano=False).carregar_sem_trava()["orcamentos"]
+        return
+    with open(caminho, 'r', encoding='utf-8') as f:
+        try:
+            dados = json.load(f)
+        except ValueError:
+            raise ValueError(f"JSON invalido em {caminho}") from None
+    yield from _orcamentos_de(dados)
+
+
+def _ler_origem(origem):
+    if os.path.isdir(origem):
+        nomes = sorted(os.listdir(origem))
+        for nome in nomes:
+            base, extensao = os.path.splitext(nome)
+            if extensao == '.jsonl' and f"{base}.json" in nomes:
+                continue  # diario do x.json ao lado, ja aplicado com ele
+            if extensao in ('.json', '.jsonl') and nome != MANIFESTO:
+                yield from _ler_arquivo(os.path.join(origem, nome))
+    else:
+        yield from _ler_arquivo(origem)
+
+
+def ler_orcamentos(origem):
+    """
+    Orcamentos de `origem`, um por numero (a ultima versao lida vale, na
+    posicao dela):
+        -            JSONL na entrada padrao, um orcamento por linha
+        diretorio    cada *.json e *.jsonl dele, em ordem de nome; o x.jsonl
+                     com um x.json ao lado e lido como diario deste
+        x.jsonl      um orcamento (ou registro do diario) por linha
+        x.json       orcamento, lista ou {"orcamentos": [...]}; com o diario
+                     x.jsonl ao lado (orcamentos.json do app), snapshot + diario
+
+    Le a origem duas vezes para nao guardar os orcamentos: a primeira passada
+    anota a ultima posicao de cada numero, a segunda entrega so essas. A
+    entrada padrao nao se rele, entao e copiada antes para um arquivo
+    temporario.
+    """
+    if origem != '-':
+        yield from _ultimas_versoes(lambda: _ler_origem(origem))
+        return
+
+    import shutil
+    import tempfile
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as copia:
+        shutil.copyfileobj(sys.stdin, copia)
+
+        def reler():
+            copia.seek(0)
+            return _ler_jsonl(copia, '<stdin>')
+
+        yield from _ultimas_versoes(reler)
+
+
+def _ultimas_versoes(ler):
+    """Duas passadas por ler(): guarda so numero -> ultima posicao, nunca os orcamentos."""
+    ultima = {}
+    for posicao, orc in enumerate(ler()):
+        numero = orc.get("numero") if isinstance(orc, dict) else None
+        if numero:
+            ultima[numero] = posicao
+    for posicao, orc in enumerate(ler()):
+        numero = orc.get("numero") if isinstance(orc, dict) else None
+        if not numero or ultima.get(numero) == posicao:
+            yield orc
+
+
+def _renderizar_para_arquivo(dados, caminho, chave):
+    """Worker do lote: grava o PDF em `caminho` (troca atomica). (caminho, chave, bytes, ms, erro)."""
+    inicio = time.perf_counter()
+    tmp = f"{caminho}.tmp{os.getpid()}"
+    try:
+        tamanho = escrever_pdf_orcamento(dados, tmp)
+        os.replace(tmp, caminho)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return caminho, chave, 0, 0.0, f"{type(e).__name__}: {e}"
+    return caminho, chave, tamanho, (time.perf_counter() - inicio) * 1000, None
+
+
+def renderizar_lote(orcamentos, destino, processos=None, incremental=False, limite=None, progresso=None):
+    """
+    Um PDF por orcamento em `destino` (Cotacao_<numero>.pdf), em paralelo no
+    pool do exportar_lote. Incremental: pula PDFs cujo conteudo e versao do
+    template (chave_pdf) batem com o manifesto. `limite`: renderiza no maximo
+    N nesta execucao (o resto fica para a proxima). Retorna o resumo com tempos.
+    """
+    import statistics
+    from armazenamento import escrever_json_atomico
+    from exportar_lote import PROCESSOS, em_paralelo, nome_arquivo_pdf
+
+    os.makedirs(destino, exist_ok=True)
+    caminho_manifesto = os.path.join(destino, MANIFESTO)
+    try:
+        with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifesto = {}
+
+    resumo = {"lidos": 0, "renderizados": 0, "em_dia": 0, "adiados": 0, "itens": 0, "bytes": 0, "erros": []}
+    tempos = []
+    inicio = time.perf_counter()
+
+    def tarefas():
+        enviados = 0
+        for orc in orcamentos:
+            resumo["lidos"] += 1
+            if not isinstance(orc, dict) or not orc.get("numero"):
+                resumo["erros"].append(f"#{resumo['lidos']}: orcamento sem numero")
+                continue
+            nome = nome_arquivo_pdf(orc)
+            caminho = os.path.join(destino, nome)
+            chave = chave_pdf(orc)
+            if incremental and manifesto.get(nome) == chave and os.path.exists(caminho):
+                resumo["em_dia"] += 1
+                continue
+            if limite is not None and enviados >= limite:
+                resumo["adiados"] += 1
+                continue
+            enviados += 1
+            resumo["itens"] += len(orc.get("itens", []))
+            yield orc, caminho, chave
+
+    processos = processos or PROCESSOS
+    if processos <= 1:
+        aquecer_assets()  # no pool, o initializer de cada processo faz isso
+    gravado = time.monotonic()
+    try:
+        for caminho, chave, tamanho, ms, erro in em_paralelo(_renderizar_para_arquivo, tarefas(), processos):
+            nome = os.path.basename(caminho)
+            if erro:
+                resumo["erros"].append(f"{nome}: {erro}")
+                manifesto.pop(nome, None)
+            else:
+                manifesto[nome] = chave
+                resumo["renderizados"] += 1
+                resumo["bytes"] += tamanho
+                tempos.append(ms)
+            if progresso:
+                progresso(resumo)
+            if time.monotonic() - gravado > INTERVALO_MANIFESTO:
+                escrever_json_atomico(caminho_manifesto, manifesto)
+                gravado = time.monotonic()
+    finally:
+        escrever_json_atomico(caminho_manifesto, manifesto)
+
+    resumo["segundos"] = time.perf_counter() - inicio
+    if tempos:
+        resumo["ms_mediana"] = statistics.median(tempos)
+        resumo["ms_p95"] = statistics.quantiles(tempos, n=20, method='inclusive')[-1] if len(tempos) > 1 else tempos[0]
+        resumo["ms_max"] = max(tempos)
+    return resumo
 
 
 if __name__ == "__main__":
@@ -251,6 +800,57 @@ if __name__ == "__main__":
         "observacoes": "Frete por conta do cliente. Prazo de entrega: 15 dias uteis."
     }
 
+    if sys.argv[1:2] == ["renderizar"]:
+        # python gerar_pdf.py renderizar ORIGEM [--saida pdfs] [--processos N] [--incremental] [--limite N]
+        import argparse
+
+        parser = argparse.ArgumentParser(prog="gerar_pdf.py renderizar",
+                                         description="Renderiza orcamentos em lote, um PDF por orcamento")
+        parser.add_argument("origem", help="orcamentos.json, arquivo .jsonl, diretorio de JSONs ou - (JSONL na entrada padrao)")
+        parser.add_argument("--saida", default="pdfs", help="diretorio dos PDFs (padrao: pdfs)")
+        parser.add_argument("--processos", type=int, help="processos do pool (padrao: SALESFLOW_PROCESSOS_PDF ou nucleos)")
+        parser.add_argument("--incremental", action="store_true",
+                            help="pula PDFs em dia (mesmo orcamento e mesma versao do template)")
+        parser.add_argument("--limite", type=int, help="renderiza no maximo N PDFs nesta execucao")
+        args = parser.parse_args(sys.argv[2:])
+
+        def mostrar(resumo):
+            print(f"\r{resumo['renderizados']} PDFs, {len(resumo['erros'])} erros", end="", file=sys.stderr, flush=True)
+
+        terminal = sys.stderr.isatty()
+        try:
+            resumo = renderizar_lote(ler_orcamentos(args.origem), args.saida, args.processos,
+                                     args.incremental, args.limite, mostrar if terminal else None)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Erro: {e}")
+        finally:
+            if terminal:
+                print(file=sys.stderr)
+
+        segundos = resumo["segundos"]
+        print(f"{resumo['lidos']} orcamentos: {resumo['renderizados']} renderizados, {resumo['em_dia']} em dia, "
+              f"{resumo['adiados']} adiados (--limite), {len(resumo['erros'])} erros")
+        print(f"{segundos:.1f}s, {resumo['renderizados'] / segundos if segundos else 0:.1f} PDF/s, "
+              f"{resumo['itens']} itens, {resumo['bytes'] / 1024 / 1024:.1f} MB em {args.saida}")
+        if "ms_mediana" in resumo:
+            print(f"por PDF: mediana {resumo['ms_mediana']:.1f} ms, p95 {resumo['ms_p95']:.1f} ms, "
+                  f"max {resumo['ms_max']:.1f} ms")
+        for erro in resumo["erros"][:10]:
+            print(f"  {erro}", file=sys.stderr)
+        sys.exit(1 if resumo["erros"] else 0)
+
+    if sys.argv[1:2] == ["--medir"]:
+        # python gerar_pdf.py --medir [N]: tempo e tamanho com e sem cache do logo
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for cache in (False, True):
+            PDFOrcamento.cache_logo = cache
+            inicio = time.perf_counter()
+            for _ in range(n):
+                pdf_bytes = gerar_pdf_orcamento(dados_teste)
+            ms = (time.perf_counter() - inicio) * 1000 / n
+            print(f"cache_logo={cache}: {ms:.1f} ms/PDF, {len(pdf_bytes) / 1024:.1f} KB")
+        sys.exit()
+
     pdf_bytes = gerar_pdf_orcamento(dados_teste)
     with open("teste_orcamento.pdf", "wb") as f:
         f.write(pdf_bytes)
@@ -0,0 +1,213 @@
+"""
+Entrada em grade: matriz produto x tamanho x quantidade -> itens do orcamento.
+
+Um pedido de uniformes (ex.: 200 funcionarios) vira todos os itens de uma vez,
+validados juntos, em vez de um clique e um rerun por item. Duas origens:
+
+    linhas_editor(catalogo, categoria, tamanhos)  -> tabela para o st.data_editor
+    entradas_do_editor(registros, tamanhos)       -> Entradas da tabela editada
+    ler_csv_grade(texto)                          -> Entradas + erros do CSV
+
+e um unico passo de validacao:
+
+    montar_itens_grade(catalogo, entradas)        -> (itens, erros)
+
+Formatos de CSV aceitos (separador ; , ou tab, detectado pela 1a linha):
+
+    produto;tamanho;quantidade[;preco]      uma linha por produto e tamanho
+    produto;P;M;G;GG[;preco]                matriz: um tamanho por coluna
+
+O produto pode ser o nome do catalogo (sem diferenciar maiusculas) ou o SKU.
+O tamanho e validado contra a grade da categoria (tamanhos_padrao) e aceita
+o rotulo inteiro ou qualquer parte dele ("G", "N° 4" ou "G/N° 4"). Preco em
+branco usa o do catalogo; "44,90" e "44.90" valem. Com qualquer erro nenhum
+item e criado.
+"""
+
+import csv
+import io
+import operator
+from collections import namedtuple
+
+from catalogo import chave_grade
+from dinheiro import novo_item
+
+COLUNA_PRODUTO = "Produto"
+COLUNA_PRECO = "Preco (R$)"
+MAX_ERROS = 20
+
+# linha: numero da linha no CSV (ou da tabela) para as mensagens de erro
+Entrada = namedtuple("Entrada", "linha produto tamanho quantidade preco")
+
+
+def tamanhos_digitados(texto):
+    """ "P, M, G" -> ("P", "M", "G") (categorias sem grade no catalogo)."""
+    return tuple(dict.fromkeys(t.strip().upper() for t in texto.split(",") if t.strip()))
+
+
+def linhas_editor(catalogo, categoria, tamanhos):
+    """Uma linha por produto da categoria: preco do catalogo e quantidade 0 por tamanho."""
+    linhas = []
+    for produto in catalogo.produtos_da_categoria(categoria):
+        linha = {COLUNA_PRODUTO: produto["nome"], COLUNA_PRECO: float(produto["preco"])}
+        linha.update((tamanho, 0) for tamanho in tamanhos)
+        linhas.append(linha)
+    return linhas
+
+
+def entradas_do_editor(registros, tamanhos):
+    """Celulas com quantidade da tabela editada (em branco/0 sao ignoradas)."""
+    entradas = []
+    for numero, registro in enumerate(registros, start=1):
+        for tamanho in tamanhos:
+            quantidade = registro.get(tamanho)
+            if _vazio(quantidade) or quantidade == 0:
+                continue
+            entradas.append(Entrada(numero, registro[COLUNA_PRODUTO], tamanho, quantidade, registro.get(COLUNA_PRECO)))
+    return entradas
+
+
+def _vazio(valor):
+    # NaN (celula apagada no data_editor) e o unico valor diferente de si mesmo
+    return valor is None or valor != valor or (isinstance(valor, str) and not valor.strip())
+
+
+def ler_csv_grade(texto):
+    """(entradas, erros) de um CSV em formato de linhas ou de matriz (ver docstring do modulo)."""
+    texto = texto.strip()
+    if not texto:
+        return [], []
+    primeira = texto.splitlines()[0]
+    separador = ";" if ";" in primeira else "\t" if "\t" in primeira else ","
+    linhas = [(n, [c.strip() for c in campos]) for n, campos in enumerate(csv.reader(io.StringIO(texto), delimiter=separador), 1)]
+    linhas = [(n, campos) for n, campos in linhas if any(campos)]
+    if not linhas:
+        return [], []
+
+    cabecalho = [chave_grade(c) for c in linhas[0][1]]
+    if cabecalho[0] not in ("produto", "sku", "item"):
+        return _ler_linhas(linhas, {"produto": 0, "tamanho": 1, "quantidade": 2, "preco": 3})
+    if "tamanho" in cabecalho or "quantidade" in cabecalho:
+        colunas = {nome: cabecalho.index(nome) for nome in ("tamanho", "quantidade", "preco") if nome in cabecalho}
+        if "quantidade" not in colunas:
+            return [], ["Linha 1: coluna 'quantidade' nao encontrada"]
+        colunas["produto"] = 0
+        return _ler_linhas(linhas[1:], colunas)
+    return _ler_matriz(linhas[1:], linhas[0][1], cabecalho)
+
+
+def _campo(campos, indice):
+    return campos[indice] if indice is not None and indice < len(campos) else ""
+
+
+def _ler_linhas(linhas, colunas):
+    entradas, erros = [], []
+    for numero, campos in linhas:
+        if len(campos) <= colunas["quantidade"]:
+            erros.append(f"Linha {numero}: esperado produto, tamanho e quantidade")
+            continue
+        quantidade = _campo(campos, colunas["quantidade"])
+        if not quantidade or quantidade == "0":
+            continue
+        entradas.append(Entrada(
+            numero, _campo(campos, colunas["produto"]), _campo(campos, colunas.get("tamanho")),
+            quantidade, _campo(campos, colunas.get("preco")),
+        ))
+    return entradas, erros
+
+
+def _ler_matriz(linhas, titulos, cabecalho):
+    preco = cabecalho.index("preco") if "preco" in cabecalho else None
+    tamanhos = [(i, titulos[i]) for i in range(1, len(titulos)) if i != preco and titulos[i]]
+    entradas = []
+    for numero, campos in linhas:
+        for i, tamanho in tamanhos:
+            quantidade = _campo(campos, i)
+            if quantidade and quantidade != "0":
+                entradas.append(Entrada(numero, campos[0], tamanho, quantidade, _campo(campos, preco)))
+    return entradas, []
+
+
+def _quantidade(valor):
+    """Inteiro positivo ou None."""
+    if isinstance(valor, str):
+        valor = valor.strip()
+        valor = int(valor) if valor.isdigit() else None
+    elif isinstance(valor, float):
+        valor = int(valor) if valor.is_integer() else None
+    elif valor is not None:
+        try:
+            valor = operator.index(valor)  # numpy.int64 do data_editor
+        except TypeError:
+            valor = None
+    return valor if valor is not None and valor > 0 else None
+
+
+def _preco(valor):
+    """Reais (float > 0), None se em branco, ou ValueError."""
+    if _vazio(valor):
+        return None
+    if isinstance(valor, str):
+        valor = valor.replace("R$", "").strip()
+        if "," in valor:  # formato brasileiro: 1.234,56
+            valor = valor.replace(".", "").replace(",", ".")
+    preco = float(valor)
+    if not preco > 0:
+        raise ValueError(valor)
+    return preco
+
+
+def _grade_por_rotulo(grade):
+    """Rotulos aceitos -> tamanho da grade: "G/N° 4" tambem por "G" e "N° 4"."""
+    rotulos = {}
+    for tamanho in grade:
+        for parte in (tamanho, *tamanho.split("/")):
+            rotulos.setdefault(parte.strip().upper(), tamanho)
+    return rotulos
+
+
+def montar_itens_grade(catalogo, entradas):
+    """
+    Valida todas as entradas e devolve (itens, erros). Havendo erro, itens
+    vem vazio: a grade entra inteira ou nao entra.
+    """
+    itens, erros = [], []
+    rotulos = {}  # categoria -> rotulos da grade
+    for entrada in entradas:
+        onde = f"Linha {entrada.linha}"
+        nome = str(entrada.produto).strip()
+        produto = catalogo.produto(nome) or catalogo.produto(nome.upper()) or catalogo.produto_por_sku(nome)
+        if produto is None:
+            erros.append(f"{onde}: produto '{nome}' nao esta no catalogo")
+            continue
+        quantidade = _quantidade(entrada.quantidade)
+        if quantidade is None:
+            erros.append(f"{onde}: quantidade invalida '{entrada.quantidade}' ({produto['nome']})")
+            continue
+        try:
+            preco = _preco(entrada.preco)
+        except ValueError:
+            erros.append(f"{onde}: preco invalido '{entrada.preco}' ({produto['nome']})")
+            continue
+
+        categoria = produto["categoria"]
+        if categoria not in rotulos:
+            rotulos[categoria] = _grade_por_rotulo(catalogo.grade(categoria))
+        tamanho = str(entrada.tamanho or "").strip()
+        if rotulos[categoria]:
+            tamanho = rotulos[categoria].get(tamanho.upper())
+            if tamanho is None:
+                erros.append(
+                    f"{onde}: tamanho '{entrada.tamanho}' fora da grade de {categoria} "
+                    f"({', '.join(catalogo.grade(categoria))})"
+                )
+                continue
+
+        descricao = f"{produto['nome']} {tamanho}".strip()
+        itens.append(novo_item(
+            descricao, quantidade, preco if preco is not None else produto["preco"],
+            produto=produto["nome"], categoria=categoria,
+        ))
+    if erros:
+        return [], erros
+    return itens, erros
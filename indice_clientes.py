@@ -0,0 +1,138 @@
+"""
+Indice em memoria dos clientes para a busca do "Selecionar Cliente Cadastrado".
+
+- por_id: (tipo, id) -> cliente, sem varrer listas nem comparar rotulos
+  (dois clientes com o mesmo nome continuam distintos).
+- Prefixo: listas ordenadas (bisect) do nome completo, de cada palavra da
+  razao social / nome fantasia / nome e do CNPJ/CPF em digitos.
+- Trigramas: trigrama -> clientes, para achar trechos no meio do nome
+  (intersecao dos conjuntos, sem varrer os clientes).
+
+buscar(termo, limite) devolve os melhores resultados nessa ordem: prefixo do
+nome completo, prefixo de palavra ou documento e trecho no meio do texto. Texto
+comparado sem acento e em minusculas.
+
+O indice e refeito so quando versao_clientes() do repositorio muda.
+"""
+
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from repositorio import documento_cliente, obter_repositorio, somente_digitos
+
+
+def normalizar(texto):
+    """Minusculas e sem acento: "Sao Joao" casa com "São João"."""
+    texto = texto or ""
+    if texto.isascii():
+        return texto.lower().strip()
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower().strip()
+
+
+def trigramas(texto):
+    """Trigramas com as bordas (" ab", "yz ") para marcar inicio e fim de palavra."""
+    return trigramas_internos(f" {texto} ")
+
+
+def trigramas_internos(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def rotulo_cliente(tipo, cliente):
+    """Rotulo do selectbox; o documento desempata nomes iguais."""
+    if tipo == "PJ":
+        return f"🏢 {cliente.get('razao_social', '')} - {cliente.get('cnpj') or 'Sem CNPJ'}"
+    return f"👤 {cliente.get('nome', '')} - {cliente.get('cpf') or 'Sem CPF'}"
+
+
+class IndiceClientes:
+    """Busca por id, prefixo e trigramas sobre os clientes carregados."""
+
+    def __init__(self, clientes, versao=None):
+        self.versao = versao
+        self.por_id = {}
+        self.chaves = []  # posicao -> (tipo, id), na ordem do cadastro
+        self._trigramas = defaultdict(set)
+        nomes, palavras = [], []
+
+        for tipo, lista in (("PJ", clientes.get("empresas", [])), ("PF", clientes.get("pessoas", []))):
+            for cliente in lista:
+                chave = (tipo, cliente.get("id"))
+                pos = len(self.chaves)
+                self.por_id[chave] = cliente
+                self.chaves.append(chave)
+
+                textos = {normalizar(cliente.get("razao_social") or cliente.get("nome"))}
+                if cliente.get("nome_fantasia"):
+                    textos.add(normalizar(cliente["nome_fantasia"]))
+                textos.discard("")
+                documento = documento_cliente(cliente)
+
+                nomes += [(texto, pos) for texto in textos]
+                palavras += [(p, pos) for texto in textos for p in set(texto.split())]
+                if documento:
+                    palavras.append((documento, pos))
+                for texto in textos | {documento}:
+                    for trigrama in trigramas(texto):
+                        self._trigramas[trigrama].add(pos)
+
+        nomes.sort()
+        palavras.sort()
+        self._nomes = [texto for texto, _ in nomes]
+        self._nomes_pos = [pos for _, pos in nomes]
+        self._palavras = [texto for texto, _ in palavras]
+        self._palavras_pos = [pos for _, pos in palavras]
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def rotulo(self, chave):
+        return rotulo_cliente(chave[0], self.por_id[chave])
+
+    @staticmethod
+    def _prefixo(ordenados, posicoes, termo, achados, limite):
+        i = bisect_left(ordenados, termo)
+        while i < len(ordenados) and len(achados) < limite and ordenados[i].startswith(termo):
+            if posicoes[i] not in achados:
+                achados.append(posicoes[i])
+            i += 1
+
+    def buscar(self, termo, limite=10):
+        """Ate `limite` chaves (tipo, id), das mais relevantes para as menos."""
+        termo = normalizar(termo)
+        if not termo:
+            return self.chaves[:limite]
+        if not any(c.isalpha() for c in termo):
+            termo = somente_digitos(termo) or termo  # CNPJ/CPF digitado com ou sem mascara
+
+        achados = []
+        self._prefixo(self._nomes, self._nomes_pos, termo, achados, limite)
+        self._prefixo(self._palavras, self._palavras_pos, termo, achados, limite)
+
+        if len(achados) < limite and len(termo) >= 3:
+            # Trecho no meio do nome: intersecao dos trigramas do termo, da
+            # lista mais curta para a mais longa (quem comeca palavra vem antes)
+            listas = sorted((self._trigramas.get(t, set()) for t in trigramas_internos(termo)), key=len)
+            candidatos = listas[0].intersection(*listas[1:]).difference(achados)
+            inicio_palavra = self._trigramas.get(f" {termo[:2]}", set())
+            achados += sorted(candidatos, key=lambda pos: (pos not in inicio_palavra, pos))[:limite - len(achados)]
+
+        return [self.chaves[pos] for pos in achados]
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obter_indice_clientes():
+    """Indice do processo, refeito quando os clientes mudam (em disco ou no banco)."""
+    global _indice
+    repo = obter_repositorio()
+    versao = repo.versao_clientes()
+    with _indice_lock:
+        if _indice is None or _indice.versao != versao:
+            _indice = IndiceClientes(repo.carregar_clientes(), versao)
+        return _indice
@@ -0,0 +1,220 @@
+"""
+Instrumentacao leve por rerun: spans de tempo agregados em histogramas.
+
+    with medir("carregar_clientes"):          # bloco
+        ...
+
+    @medido("gerar_pdf_orcamento")            # funcao inteira
+    def gerar_pdf_orcamento(dados): ...
+
+Cada span soma a duracao no histograma do seu nome (buckets fixos em
+segundos, como os do Prometheus). O app mede a leitura dos dados, as
+consultas de CNPJ/CEP, a geracao de PDF, cada aba e o rerun inteiro; o
+tempo do proprio Streamlit e o que sobra entre a duracao percebida e "rerun".
+O rerun so de uma secao (st.fragment) vai para "rerun_parcial".
+
+Amostragem (SALESFLOW_AMOSTRAGEM_SPANS, padrao 1.0): a decisao e tomada uma
+vez por rerun (todos os spans do rerun ou nenhum) e, fora de um rerun, por
+span. Com 0.1 so 1 em cada 10 reruns paga o custo (~1 us por span).
+
+Saidas:
+    texto_prometheus()                 snapshot no formato de exposicao de texto
+    SALESFLOW_PROMETHEUS_ARQUIVO=x     grava o snapshot em x no fim do rerun, no
+                                       maximo a cada SALESFLOW_PROMETHEUS_INTERVALO s
+                                       (textfile collector do node_exporter)
+    SALESFLOW_LOG_SPANS=1              uma linha JSON por span no logger
+                                       "salesflow.spans"
+    spans_rerun()                      spans do rerun atual (rodape de diagnostico)
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+AMOSTRAGEM = float(os.environ.get("SALESFLOW_AMOSTRAGEM_SPANS", "1.0"))
+ARQUIVO_PROMETHEUS = os.environ.get("SALESFLOW_PROMETHEUS_ARQUIVO", "")
+INTERVALO_PROMETHEUS = float(os.environ.get("SALESFLOW_PROMETHEUS_INTERVALO", "15"))
+LOG_SPANS = os.environ.get("SALESFLOW_LOG_SPANS") == "1"
+
+# Limites superiores dos buckets (segundos); o ultimo e +Inf
+LIMITES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    """Contagem por bucket, soma e total de observacoes (segundos)."""
+
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, segundos):
+        i = 0
+        while i < len(LIMITES) and segundos > LIMITES[i]:
+            i += 1
+        self.contagens[i] += 1
+        self.soma += segundos
+        self.total += 1
+
+    def quantil(self, q):
+        """Estimativa pelo limite do bucket (como histogram_quantile, sem interpolar)."""
+        alvo = q * self.total
+        acumulado = 0
+        for limite, n in zip(LIMITES + (float("inf"),), self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+
+class Instrumentacao:
+    """Histogramas por nome de span, compartilhados pelas sessoes do processo."""
+
+    def __init__(self, amostragem=AMOSTRAGEM, arquivo_prometheus=ARQUIVO_PROMETHEUS,
+                 intervalo=INTERVALO_PROMETHEUS, log=LOG_SPANS):
+        self.amostragem = amostragem
+        self.arquivo_prometheus = arquivo_prometheus
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._histogramas = {}  # nome -> Histograma
+        self._local = threading.local()  # cada sessao do Streamlit roda numa thread
+        self._ultima_exportacao = float("-inf")
+        self._logger = None
+        if log:
+            import logging
+            self._logger = logging.getLogger("salesflow.spans")
+            if not self._logger.handlers:  # sem configuracao de logging: stderr
+                self._logger.addHandler(logging.StreamHandler())
+                self._logger.setLevel(logging.INFO)
+                self._logger.propagate = False
+
+    def _amostrado(self):
+        decisao = getattr(self._local, "amostrado", None)
+        if decisao is None:  # fora de um rerun: decide por span
+            return random.random() < self.amostragem
+        return decisao
+
+    def inicio_rerun(self, nome="rerun"):
+        """Sorteia se este rerun e medido e zera a lista de spans da thread."""
+        self._local.amostrado = random.random() < self.amostragem
+        self._local.spans = []
+        self._local.inicio = time.perf_counter()
+        self._local.nome = nome
+
+    def fim_rerun(self):
+        """Fecha o span do rerun (nome dado no inicio) e grava o snapshot Prometheus se estiver na hora."""
+        inicio = getattr(self._local, "inicio", None)
+        if inicio is not None and self._local.amostrado:
+            self.observar(self._local.nome, time.perf_counter() - inicio)
+        self._local.amostrado = None
+        self._local.inicio = None
+        if self.arquivo_prometheus:
+            self.exportar_se_preciso()
+
+    def observar(self, nome, segundos):
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = Histograma()
+            histograma.observar(segundos)
+        spans = getattr(self._local, "spans", None)
+        if spans is not None:
+            spans.append((nome, segundos))
+        if self._logger:
+            self._logger.info(json.dumps({"span": nome, "ms": round(segundos * 1000, 3), "ts": time.time()}))
+
+    def observar_amostrado(self, nome, segundos):
+        """observar() sujeito a amostragem, para duracoes medidas fora de medir()."""
+        if self._amostrado():
+            self.observar(nome, segundos)
+
+    @contextmanager
+    def medir(self, nome):
+        if not self._amostrado():
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio)
+
+    def spans_rerun(self):
+        """[(nome, ms)] do rerun atual, na ordem em que terminaram."""
+        return [(nome, round(s * 1000, 3)) for nome, s in getattr(self._local, "spans", ())]
+
+    def estatisticas(self):
+        """{nome: {"n", "media_ms", "p50_ms", "p99_ms"}} desde o inicio do processo."""
+        with self._lock:
+            return {
+                nome: {
+                    "n": h.total,
+                    "media_ms": round(h.soma * 1000 / h.total, 3),
+                    "p50_ms": h.quantil(0.5) * 1000,
+                    "p99_ms": h.quantil(0.99) * 1000,
+                }
+                for nome, h in sorted(self._histogramas.items())
+            }
+
+    def texto_prometheus(self):
+        """Histogramas no formato de texto do Prometheus (buckets acumulados)."""
+        with self._lock:
+            copias = {nome: (list(h.contagens), h.soma, h.total) for nome, h in self._histogramas.items()}
+        linhas = [
+            "# HELP salesflow_span_seconds Duracao dos spans instrumentados (amostrados).",
+            "# TYPE salesflow_span_seconds histogram",
+        ]
+        for nome, (contagens, soma, total) in sorted(copias.items()):
+            acumulado = 0
+            for limite, n in zip(LIMITES + (float("inf"),), contagens):
+                acumulado += n
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f'salesflow_span_seconds_bucket{{span="{nome}",le="{le}"}} {acumulado}')
+            linhas.append(f'salesflow_span_seconds_sum{{span="{nome}"}} {soma:.6f}')
+            linhas.append(f'salesflow_span_seconds_count{{span="{nome}"}} {total}')
+        linhas += ["# TYPE salesflow_span_amostragem gauge", f"salesflow_span_amostragem {self.amostragem}"]
+        return "\n".join(linhas) + "\n"
+
+    def exportar_se_preciso(self):
+        """Grava o snapshot (tmp + os.replace) se passou o intervalo desde o ultimo."""
+        agora = time.monotonic()
+        with self._lock:
+            if agora - self._ultima_exportacao < self.intervalo:
+                return False
+            self._ultima_exportacao = agora
+        tmp = f"{self.arquivo_prometheus}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.texto_prometheus())
+        os.replace(tmp, self.arquivo_prometheus)
+        return True
+
+
+_instrumentacao = Instrumentacao()
+
+
+def obter_instrumentacao():
+    """Instrumentacao unica por processo (compartilhada entre sessoes)."""
+    return _instrumentacao
+
+
+def medir(nome):
+    """Span de um bloco: `with medir("nome"): ...`."""
+    return _instrumentacao.medir(nome)
+
+
+def medido(nome):
+    """Decorator: mede cada chamada da funcao como um span."""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with _instrumentacao.medir(nome):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
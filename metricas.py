@@ -0,0 +1,205 @@
+"""
+Metricas de vendas mantidas de forma incremental (base do dashboard do roadmap).
+
+Cada orcamento contribui para baldes em quatro dimensoes:
+
+    mes        "AAAA-MM" da data do orcamento
+    vendedor   nome do vendedor
+    produto    produto do catalogo ("Avulso" se nao achar)
+    categoria  categoria do catalogo ("Avulso" se nao achar)
+
+Itens avulsos (texto livre) caem todos no balde "Avulso": uma descricao por
+balde faria o numero de baldes crescer sem limite. Bases gravadas antes
+disso precisam de uma reconstrucao (reconstruir-metricas, abaixo).
+
+O repositorio grava no item o produto e a categoria resolvidos ao salvar
+(classificar_itens): a retirada de uma versao antiga usa o balde em que ela
+foi somada, mesmo que o catalogo tenha mudado depois.
+
+Campos de cada balde: orcamentos, valor, pecas, aprovados, valor_aprovado
+(status == "aprovado"; a taxa de conversao sai de aprovados / orcamentos).
+Valores guardados em centavos inteiros (dinheiro.py): retirar e aplicar nao
+acumula erro de float; consultar() devolve em reais.
+
+salvar_orcamento() do repositorio aplica so a diferenca: retira a
+contribuicao da versao anterior e aplica a da nova. Consultar custa O(baldes),
+sem varrer os orcamentos. No SQLite a tabela metricas e atualizada na mesma
+transacao do orcamento; no JSON fica em metricas.json (SALESFLOW_METRICAS).
+
+Reconstrucao completa (se o arquivo se perder ou divergir) e consulta:
+    python repositorio.py reconstruir-metricas
+    python metricas.py [mes|vendedor|produto|categoria ...]
+"""
+
+import json
+import os
+
+from armazenamento import assinatura_arquivo, escrever_json_atomico, obter_cache_leituras
+from dinheiro import reais, total_orcamento, valor_item
+
+
+ARQUIVO_METRICAS = os.environ.get("SALESFLOW_METRICAS", "metricas.json")
+
+DIMENSOES = ("mes", "vendedor", "produto", "categoria")
+CAMPOS = ("orcamentos", "valor", "pecas", "aprovados", "valor_aprovado")
+SEM_CATEGORIA = "Avulso"
+
+
+def produto_do_item(item, catalogo):
+    """
+    (produto, categoria) do item. Itens novos guardam os dois; nos antigos a
+    descricao e "PRODUTO TAMANHO", entao procura o maior prefixo que e um produto.
+    Fora do catalogo: ("Avulso", "Avulso").
+    """
+    if item.get("produto"):
+        return item["produto"], item.get("categoria") or SEM_CATEGORIA
+    palavras = item["descricao"].split()
+    for fim in range(len(palavras), 0, -1):
+        produto = catalogo.produto(" ".join(palavras[:fim])) if catalogo else None
+        if produto:
+            return produto["nome"], produto["categoria"]
+    return SEM_CATEGORIA, SEM_CATEGORIA
+
+
+def classificar_itens(orc, catalogo):
+    """Copia de `orc` com produto e categoria gravados nos itens que nao os tem."""
+    itens = []
+    for item in orc["itens"]:
+        if not item.get("produto"):
+            produto, categoria = produto_do_item(item, catalogo)
+            item = {**item, "produto": produto, "categoria": categoria}
+        itens.append(item)
+    return {**orc, "itens": itens}
+
+
+def contribuicoes(orc, catalogo=None):
+    """{(dimensao, chave): {campo: valor}} que o orcamento soma nos baldes."""
+    aprovado = orc.get("status") == "aprovado"
+    pecas = sum(item["quantidade"] for item in orc["itens"])
+    total = total_orcamento(orc)
+    do_orcamento = {
+        "orcamentos": 1,
+        "valor": total,
+        "pecas": pecas,
+        "aprovados": int(aprovado),
+        "valor_aprovado": total if aprovado else 0,
+    }
+    mes = (orc.get("data_iso") or "-".join(reversed(orc["data"].split("/"))))[:7]
+    resultado = {("mes", mes): dict(do_orcamento), ("vendedor", orc.get("vendedor") or "-"): dict(do_orcamento)}
+
+    for item in orc["itens"]:
+        produto, categoria = produto_do_item(item, catalogo)
+        valor = valor_item(item)
+        for chave in (("produto", produto), ("categoria", categoria)):
+            balde = resultado.setdefault(chave, dict.fromkeys(CAMPOS, 0))
+            balde["valor"] += valor
+            balde["pecas"] += item["quantidade"]
+            if aprovado:
+                balde["valor_aprovado"] += valor
+    # Orcamentos/aprovados por produto e categoria contam o orcamento uma vez
+    for (dimensao, _), balde in resultado.items():
+        if dimensao in ("produto", "categoria"):
+            balde["orcamentos"] = 1
+            balde["aprovados"] = int(aprovado)
+    return resultado
+
+
+def diferenca(antigo, novo, catalogo=None):
+    """Contribuicao de `novo` menos a de `antigo` (retirar e aplicar numa conta so)."""
+    delta = {}
+    for sinal, orc in ((-1, antigo), (1, novo)):
+        if orc is None:
+            continue
+        for chave, campos in contribuicoes(orc, catalogo).items():
+            balde = delta.setdefault(chave, dict.fromkeys(CAMPOS, 0))
+            for campo, valor in campos.items():
+                balde[campo] += sinal * valor
+    return delta
+
+
+def linha_metrica(chave, campos):
+    """Balde pronto para exibir: valores em reais e taxa de conversao."""
+    linha = {"chave": chave}
+    linha.update({campo: campos[campo] for campo in CAMPOS})
+    linha["valor"] = reais(campos["valor"])
+    linha["valor_aprovado"] = reais(campos["valor_aprovado"])
+    linha["conversao"] = round(campos["aprovados"] / campos["orcamentos"], 4) if campos["orcamentos"] else 0.0
+    return linha
+
+
+class MetricasJSON:
+    """
+    Baldes em metricas.json: {dimensao: {chave: {campo: valor}}}.
+    aplicar() e substituir() rodam sob trava_arquivo(self.trava), tomada pelo
+    repositorio junto com a gravacao do orcamento.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_METRICAS):
+        self.arquivo = arquivo
+        self.trava = f"{arquivo}.lock"
+
+    def carregar(self):
+        return obter_cache_leituras().obter(self.arquivo, assinatura_arquivo(self.arquivo), self._ler)
+
+    def _ler(self):
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                baldes = json.load(f)
+        except (FileNotFoundError, ValueError):
+            baldes = {}
+        for dimensao in DIMENSOES:
+            baldes.setdefault(dimensao, {})
+        return baldes
+
+    def _gravar(self, baldes):
+        escrever_json_atomico(self.arquivo, baldes)
+        obter_cache_leituras().atualizar(self.arquivo, assinatura_arquivo(self.arquivo), baldes)
+
+    def aplicar(self, delta):
+        """Soma o delta nos baldes e remove os que ficaram vazios."""
+        atuais = self.carregar()
+        baldes = {dimensao: dict(atuais[dimensao]) for dimensao in DIMENSOES}
+        for (dimensao, chave), campos in delta.items():
+            balde = dict(baldes[dimensao].get(chave) or dict.fromkeys(CAMPOS, 0))
+            for campo, valor in campos.items():
+                balde[campo] += valor
+            if balde["orcamentos"] > 0:
+                baldes[dimensao][chave] = balde
+            else:
+                baldes[dimensao].pop(chave, None)
+        self._gravar(baldes)
+
+    def substituir(self, baldes):
+        self._gravar(baldes)
+
+    def consultar(self, dimensao):
+        return [linha_metrica(chave, campos) for chave, campos in sorted(self.carregar()[dimensao].items())]
+
+
+def baldes_de(orcamentos, catalogo=None):
+    """Reconstrucao completa: soma as contribuicoes de todos os orcamentos."""
+    delta = {}
+    for orc in orcamentos:
+        for chave, campos in contribuicoes(orc, catalogo).items():
+            balde = delta.setdefault(chave, dict.fromkeys(CAMPOS, 0))
+            for campo, valor in campos.items():
+                balde[campo] += valor
+    baldes = {dimensao: {} for dimensao in DIMENSOES}
+    for (dimensao, chave), campos in delta.items():
+        baldes[dimensao][chave] = campos
+    return baldes
+
+
+if __name__ == "__main__":
+    import sys
+
+    from repositorio import obter_repositorio
+
+    repo = obter_repositorio()
+    for dimensao in sys.argv[1:] or DIMENSOES:
+        if dimensao not in DIMENSOES:
+            raise SystemExit(f"Dimensao invalida: {dimensao} (use {', '.join(DIMENSOES)})")
+        print(f"\n== {dimensao} ==")
+        for linha in repo.metricas(dimensao):
+            print(f"{linha['chave'][:40]:40} {linha['orcamentos']:>5} orc  R$ {linha['valor']:>12,.2f}"
+                  f"  {linha['pecas']:>7g} pc  conv {linha['conversao']:.0%}")
@@ -0,0 +1,712 @@
+"""
+Camada de repositorio: toda a persistencia do app passa por aqui.
+
+Backends (escolhidos por SALESFLOW_BACKEND):
+    json   -> arquivos atuais (clientes.json, orcamentos.json + diario, catalogo.json)
+    sqlite -> banco embutido (SALESFLOW_BANCO, padrao salesflow.db) em modo WAL,
+              com atualizacao por linha e indices por numero, documento,
+              data e vendedor
+
+Os dois backends expoem os mesmos metodos:
+    carregar_catalogo() / salvar_catalogo(catalogo) / adicionar_produto(produto)
+    carregar_clientes() / salvar_clientes(clientes) / adicionar_cliente(cliente)
+    buscar_cliente_por_documento(documento) / buscar_cliente(tipo, id)
+    pagina_clientes(busca, pagina, por_pagina) / versao_clientes()
+    carregar_orcamentos() / salvar_orcamentos(data) / salvar_orcamento(orcamento, novo)
+    buscar_orcamento(numero) / resumo_orcamentos() / proximo_numero()
+    filtrar_orcamentos(data_inicio, data_fim, vendedor, cliente)
+    metricas(dimensao) / reconstruir_metricas()
+
+salvar_orcamento() tambem atualiza as metricas de vendas (metricas.py):
+retira a contribuicao da versao anterior do orcamento e aplica a nova.
+Com novo=True (numero recem-alocado) levanta NumeroEmUso se o numero ja
+estiver salvo, em vez de substituir o orcamento existente.
+
+Migracao dos JSON para o SQLite:
+    python repositorio.py migrar [--banco salesflow.db]
+
+Reconstrucao das metricas a partir de todos os orcamentos:
+    python repositorio.py reconstruir-metricas
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from armazenamento import (
+    AlocadorNumeros,
+    NumeroEmUso,
+    assinatura_arquivo,
+    escrever_json_atomico,
+    maior_sequencia,
+    obter_alocador,
+    obter_cache_leituras,
+    obter_orcamentos,
+    trava_arquivo,
+)
+from catalogo import Catalogo
+from metricas import CAMPOS, MetricasJSON, baldes_de, classificar_itens, diferenca, linha_metrica
+
+
+BACKEND = os.environ.get("SALESFLOW_BACKEND", "json")
+ARQUIVO_BANCO = os.environ.get("SALESFLOW_BANCO", "salesflow.db")
+ARQUIVO_CATALOGO = "catalogo.json"
+ARQUIVO_CLIENTES = "clientes.json"
+
+
+def somente_digitos(texto):
+    return "".join(filter(str.isdigit, texto or ""))
+
+
+def documento_cliente(cliente):
+    """CNPJ (PJ) ou CPF (PF) normalizado para indexacao."""
+    return somente_digitos(cliente.get("cnpj") or cliente.get("cpf"))
+
+
+def data_iso_orcamento(orc):
+    """AAAA-MM-DD do orcamento (orcamentos antigos so tem "data" DD/MM/AAAA)."""
+    if orc.get("data_iso"):
+        return orc["data_iso"]
+    dia, mes, ano = orc["data"].split("/")
+    return f"{ano}-{mes}-{dia}"
+
+
+def orcamento_no_filtro(orc, data_inicio=None, data_fim=None, vendedor=None, cliente=None):
+    """Filtro usado no backend JSON (o SQLite faz o mesmo em SQL)."""
+    data = data_iso_orcamento(orc)
+    if data_inicio and data < data_inicio:
+        return False
+    if data_fim and data > data_fim:
+        return False
+    if vendedor and orc.get("vendedor") != vendedor:
+        return False
+    if cliente:
+        documento = somente_digitos(cliente)
+        if not (documento and documento_cliente(orc["cliente"]) == documento
+                or cliente.lower() in orc["cliente"]["nome"].lower()):
+            return False
+    return True
+
+
+def documento_da_busca(busca):
+    """Digitos da busca quando ela e um CPF/CNPJ (parcial); vazio se tiver letras."""
+    return "" if any(c.isalpha() for c in busca) else somente_digitos(busca)
+
+
+def resumo_cliente(cliente, tipo):
+    """Projecao leve da lista de clientes: nome, documento e cidade."""
+    return {
+        "tipo": tipo,
+        "id": cliente.get("id"),
+        "nome": cliente.get("razao_social") or cliente.get("nome", ""),
+        "documento": cliente.get("cnpj") or cliente.get("cpf") or "",
+        "cidade": cliente.get("endereco", {}).get("cidade", ""),
+    }
+
+
+def filtrar_resumos(projecao, busca):
+    """Resumos cujo nome contem a busca, ou cujo documento contem os digitos dela."""
+    termo, digitos = busca.lower(), documento_da_busca(busca)
+    return [
+        resumo for resumo, (nome, documento) in zip(projecao["resumos"], projecao["chaves"])
+        if termo in nome or (digitos and digitos in documento)
+    ]
+
+
+def resumo_orcamento(orc):
+    """Projecao leve usada nas listas (sem itens)."""
+    return {"numero": orc["numero"], "cliente": orc["cliente"]["nome"], "data": orc["data"]}
+
+
+# === BACKEND JSON ===
+
+class RepositorioJSON:
+    """Arquivos JSON do projeto; orcamentos via diario (armazenamento.py)."""
+
+    def __init__(self, catalogo=ARQUIVO_CATALOGO, clientes=ARQUIVO_CLIENTES):
+        self.arquivo_catalogo = catalogo
+        self.arquivo_clientes = clientes
+        self.metricas_vendas = MetricasJSON()
+        self._lock = threading.Lock()
+
+    # --- catalogo ---
+
+    def carregar_catalogo(self):
+        """Catalogo com indices, montado de novo so quando catalogo.json muda."""
+        return obter_cache_leituras().obter(
+            self.arquivo_catalogo, assinatura_arquivo(self.arquivo_catalogo), self._ler_catalogo
+        )
+
+    def _ler_catalogo(self):
+        with open(self.arquivo_catalogo, "r", encoding="utf-8") as f:
+            return Catalogo(json.load(f))
+
+    def salvar_catalogo(self, catalogo):
+        escrever_json_atomico(self.arquivo_catalogo, catalogo)
+        obter_cache_leituras().atualizar(
+            self.arquivo_catalogo, assinatura_arquivo(self.arquivo_catalogo), Catalogo(catalogo)
+        )
+
+    def adicionar_produto(self, produto):
+        with self._lock:
+            catalogo = dict(self.carregar_catalogo())
+            catalogo["produtos"] = list(catalogo["produtos"]) + [produto]
+            self.salvar_catalogo(catalogo)
+
+    # --- clientes ---
+
+    def carregar_clientes(self):
+        """Visao somente leitura; so relê o arquivo quando a assinatura muda."""
+        return obter_cache_leituras().obter(
+            self.arquivo_clientes, assinatura_arquivo(self.arquivo_clientes), self._ler_clientes
+        )
+
+    def _ler_clientes(self):
+        try:
+            with open(self.arquivo_clientes, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"empresas": [], "pessoas": []}
+        # Garante que tenha a estrutura correta
+        data.setdefault("empresas", [])
+        data.setdefault("pessoas", [])
+        return data
+
+    def salvar_clientes(self, clientes):
+        escrever_json_atomico(self.arquivo_clientes, clientes)
+        # Escrita propria: o cache passa a ser o que foi gravado, sem reler
+        obter_cache_leituras().atualizar(self.arquivo_clientes, assinatura_arquivo(self.arquivo_clientes), clientes)
+
+    def adicionar_cliente(self, cliente):
+        """Atribui o proximo id do tipo (PJ/PF) e salva. Retorna o cliente."""
+        lista = "empresas" if cliente["tipo"] == "PJ" else "pessoas"
+        with self._lock:
+            atuais = self.carregar_clientes()
+            clientes = {"empresas": list(atuais["empresas"]), "pessoas": list(atuais["pessoas"])}
+            cliente["id"] = max((c["id"] for c in clientes[lista]), default=0) + 1
+            clientes[lista].append(cliente)
+            self.salvar_clientes(clientes)
+        return cliente
+
+    def buscar_cliente_por_documento(self, documento):
+        documento = somente_digitos(documento)
+        clientes = self.carregar_clientes()
+        return next(
+            (c for c in clientes["empresas"] + clientes["pessoas"] if documento_cliente(c) == documento),
+            None,
+        )
+
+    def versao_clientes(self):
+        """Muda sempre que clientes.json muda (para indices em memoria)."""
+        return assinatura_arquivo(self.arquivo_clientes)
+
+    def buscar_cliente(self, tipo, id):
+        clientes = self.carregar_clientes()
+        return next((c for c in clientes["empresas" if tipo == "PJ" else "pessoas"] if c.get("id") == id), None)
+
+    def pagina_clientes(self, busca="", pagina=1, por_pagina=20):
+        """
+        (resumos da pagina, total no filtro). Busca por parte do nome ou do CNPJ/CPF.
+
+        A projecao (com as chaves de busca) e o resultado da ultima busca ficam no
+        cache de leituras pela assinatura de clientes.json; cada chamada so fatia.
+        """
+        cache, versao = obter_cache_leituras(), assinatura_arquivo(self.arquivo_clientes)
+        projecao = cache.obter(f"{self.arquivo_clientes}:resumos", versao, self._projetar_clientes)
+        resumos = projecao["resumos"]
+        if busca:
+            resumos = cache.obter(
+                f"{self.arquivo_clientes}:busca", (versao, busca), lambda: filtrar_resumos(projecao, busca)
+            )
+        inicio = (pagina - 1) * por_pagina
+        return resumos[inicio:inicio + por_pagina], len(resumos)
+
+    def _projetar_clientes(self):
+        clientes = self.carregar_clientes()
+        resumos = [resumo_cliente(c, "PJ") for c in clientes["empresas"]]
+        resumos += [resumo_cliente(c, "PF") for c in clientes["pessoas"]]
+        return {"resumos": resumos, "chaves": [(r["nome"].lower(), somente_digitos(r["documento"])) for r in resumos]}
+
+    # --- orcamentos ---
+
+    def carregar_orcamentos(self):
+        return obter_orcamentos().carregar()
+
+    def salvar_orcamentos(self, data):
+        catalogo = self.carregar_catalogo()
+        orcamentos = [classificar_itens(orc, catalogo) for orc in data.get("orcamentos", [])]
+        with trava_arquivo(self.metricas_vendas.trava):
+            obter_orcamentos().salvar_tudo({**data, "orcamentos": orcamentos})
+            self.metricas_vendas.substituir(baldes_de(orcamentos, catalogo))
+
+    def salvar_orcamento(self, orcamento, novo=False):
+        catalogo = self.carregar_catalogo()
+        orcamento = classificar_itens(orcamento, catalogo)
+        # Sob a trava das metricas: a versao anterior lida aqui e a que o delta retira
+        with trava_arquivo(self.metricas_vendas.trava):
+            anterior = obter_orcamentos().buscar(orcamento["numero"])
+            if novo and anterior is not None:
+                raise NumeroEmUso(orcamento["numero"])
+            obter_orcamentos().salvar_orcamento(orcamento)
+            self.metricas_vendas.aplicar(diferenca(anterior, orcamento, catalogo))
+
+    def buscar_orcamento(self, numero):
+        return obter_orcamentos().buscar(numero)
+
+    def resumo_orcamentos(self):
+        return [resumo_orcamento(orc) for orc in self.carregar_orcamentos()["orcamentos"]]
+
+    def filtrar_orcamentos(self, data_inicio=None, data_fim=None, vendedor=None, cliente=None):
+        """Orcamentos por periodo (AAAA-MM-DD), vendedor e cliente (nome ou CPF/CNPJ)."""
+        return [
+            orc for orc in self.carregar_orcamentos()["orcamentos"]
+            if orcamento_no_filtro(orc, data_inicio, data_fim, vendedor, cliente)
+        ]
+
+    def proximo_numero(self):
+        return obter_alocador().proximo()
+
+    # --- metricas ---
+
+    def metricas(self, dimensao):
+        """Baldes da dimensao (mes, vendedor, produto, categoria), sem ler os orcamentos."""
+        return self.metricas_vendas.consultar(dimensao)
+
+    def reconstruir_metricas(self):
+        with trava_arquivo(self.metricas_vendas.trava):
+            orcamentos = self.carregar_orcamentos()["orcamentos"]
+            self.metricas_vendas.substituir(baldes_de(orcamentos, self.carregar_catalogo()))
+
+
+# === BACKEND SQLITE ===
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogo (
+    chave TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    categoria TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    preco REAL NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clientes (
+    tipo TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    documento TEXT,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (tipo, id)
+);
+CREATE INDEX IF NOT EXISTS idx_clientes_documento ON clientes(documento);
+CREATE TABLE IF NOT EXISTS orcamentos (
+    numero TEXT PRIMARY KEY,
+    data_iso TEXT,
+    vendedor TEXT,
+    cliente_nome TEXT,
+    cliente_documento TEXT,
+    total REAL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orcamentos_data ON orcamentos(data_iso);
+CREATE INDEX IF NOT EXISTS idx_orcamentos_vendedor ON orcamentos(vendedor);
+CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente ON orcamentos(cliente_documento);
+CREATE TABLE IF NOT EXISTS sequencia (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metricas (
+    dimensao TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    orcamentos INTEGER NOT NULL,
+    valor INTEGER NOT NULL,  -- centavos
+    pecas REAL NOT NULL,
+    aprovados INTEGER NOT NULL,
+    valor_aprovado INTEGER NOT NULL,  -- centavos
+    PRIMARY KEY (dimensao, chave)
+);
+CREATE TABLE IF NOT EXISTS versoes (
+    tabela TEXT PRIMARY KEY,
+    versao INTEGER NOT NULL
+);
+""" + "".join(
+    # Contador por tabela, incrementado a cada escrita: versao dos caches em memoria
+    f"""
+INSERT OR IGNORE INTO versoes (tabela, versao) VALUES ('{tabela}', 0);
+CREATE TRIGGER IF NOT EXISTS {tabela}_versao_{evento.lower()} AFTER {evento} ON {tabela}
+BEGIN UPDATE versoes SET versao = versao + 1 WHERE tabela = '{tabela}'; END;
+"""
+    for tabela in ("clientes", "orcamentos", "catalogo", "produtos")
+    for evento in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+class AlocadorSQLite(AlocadorNumeros):
+    """AlocadorNumeros com o contador na tabela sequencia (transacao IMMEDIATE)."""
+
+    def __init__(self, repositorio, **kwargs):
+        super().__init__(**kwargs)
+        self.repositorio = repositorio
+
+    def _reservar(self, chave):
+        with self.repositorio._transacao(imediata=True) as con:
+            row = con.execute("SELECT valor FROM sequencia WHERE chave = ?", (chave,)).fetchone()
+            if row:
+                ultima = row[0]
+            else:
+                # Mes sem contador: comeca depois do maior numero ja salvo
+                numeros = con.execute(
+                    "SELECT numero FROM orcamentos WHERE numero LIKE ?", (f"ORS{chave[2:4]}{chave[5:7]}%",)
+                )
+                ultima = maior_sequencia((n for (n,) in numeros), chave, self.INICIO - 1)
+            con.execute(
+                "INSERT INTO sequencia (chave, valor) VALUES (?, ?) "
+                "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+                (chave, ultima + self.bloco),
+            )
+        return [ultima + 1, ultima + self.bloco]
+
+
+class RepositorioSQLite:
+    """Banco SQLite embutido. Uma conexao por thread (sessoes do Streamlit)."""
+
+    def __init__(self, caminho=ARQUIVO_BANCO, catalogo_inicial=ARQUIVO_CATALOGO):
+        self.caminho = caminho
+        self._local = threading.local()
+        self.alocador = AlocadorSQLite(self)
+        self._conexao().executescript(SCHEMA)
+        # Banco novo: semeia o catalogo para o app abrir mesmo sem migracao
+        if catalogo_inicial and os.path.exists(catalogo_inicial):
+            if not self._conexao().execute("SELECT 1 FROM catalogo LIMIT 1").fetchone():
+                with open(catalogo_inicial, "r", encoding="utf-8") as f:
+                    self.salvar_catalogo(json.load(f))
+
+    def _conexao(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _transacao(self, imediata=False):
+        return _Transacao(self._conexao(), imediata)
+
+    # --- catalogo ---
+
+    def carregar_catalogo(self):
+        """Catalogo com indices, montado de novo so quando catalogo/produtos mudam."""
+        return obter_cache_leituras().obter(
+            f"{self.caminho}:catalogo", (self._versao("catalogo"), self._versao("produtos")), self._ler_catalogo
+        )
+
+    def _ler_catalogo(self):
+        con = self._conexao()
+        catalogo = {chave: json.loads(dados) for chave, dados in con.execute("SELECT chave, dados FROM catalogo")}
+        catalogo["produtos"] = [json.loads(d) for (d,) in con.execute("SELECT dados FROM produtos ORDER BY id")]
+        return Catalogo(catalogo)
+
+    def salvar_catalogo(self, catalogo):
+        with self._transacao() as con:
+            con.execute("DELETE FROM catalogo")
+            con.executemany(
+                "INSERT INTO catalogo (chave, dados) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in catalogo.items() if k != "produtos"],
+            )
+            con.execute("DELETE FROM produtos")
+            for produto in catalogo.get("produtos", []):
+                self._inserir_produto(con, produto)
+        obter_cache_leituras().atualizar(
+            f"{self.caminho}:catalogo", (self._versao("catalogo"), self._versao("produtos")), Catalogo(catalogo)
+        )
+
+    def adicionar_produto(self, produto):
+        with self._transacao() as con:
+            self._inserir_produto(con, produto)
+
+    def _inserir_produto(self, con, produto):
+        con.execute(
+            "INSERT INTO produtos (categoria, nome, preco, dados) VALUES (?, ?, ?, ?)",
+            (produto["categoria"], produto["nome"], produto["preco"], json.dumps(produto, ensure_ascii=False)),
+        )
+
+    # --- clientes ---
+
+    def _versao(self, tabela):
+        return self._conexao().execute("SELECT versao FROM versoes WHERE tabela = ?", (tabela,)).fetchone()[0]
+
+    def carregar_clientes(self):
+        """Visao somente leitura; so relê a tabela quando o contador de versao muda."""
+        return obter_cache_leituras().obter(f"{self.caminho}:clientes", self._versao("clientes"), self._ler_clientes)
+
+    def _ler_clientes(self):
+        clientes = {"empresas": [], "pessoas": []}
+        for tipo, dados in self._conexao().execute("SELECT tipo, dados FROM clientes ORDER BY tipo, id"):
+            clientes["empresas" if tipo == "PJ" else "pessoas"].append(json.loads(dados))
+        return clientes
+
+    def salvar_clientes(self, clientes):
+        with self._transacao() as con:
+            con.execute("DELETE FROM clientes")
+            for cliente in clientes.get("empresas", []) + clientes.get("pessoas", []):
+                self._gravar_cliente(con, cliente)
+
+    def adicionar_cliente(self, cliente):
+        with self._transacao(imediata=True) as con:
+            (ultimo,) = con.execute("SELECT COALESCE(MAX(id), 0) FROM clientes WHERE tipo = ?", (cliente["tipo"],)).fetchone()
+            cliente["id"] = ultimo + 1
+            self._gravar_cliente(con, cliente)
+        return cliente
+
+    def buscar_cliente_por_documento(self, documento):
+        row = self._conexao().execute(
+            "SELECT dados FROM clientes WHERE documento = ? LIMIT 1", (somente_digitos(documento),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def versao_clientes(self):
+        """Contador mantido por triggers a cada escrita em clientes."""
+        return self._versao("clientes")
+
+    def buscar_cliente(self, tipo, id):
+        row = self._conexao().execute("SELECT dados FROM clientes WHERE tipo = ? AND id = ?", (tipo, id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pagina_clientes(self, busca="", pagina=1, por_pagina=20):
+        """Mesma paginacao do JSON, com LIMIT/OFFSET e sem decodificar o JSON de cada cliente."""
+        where, parametros = "", []
+        if busca:
+            digitos = documento_da_busca(busca)
+            where = "WHERE nome LIKE ? OR documento LIKE ?"
+            parametros = [f"%{busca}%", f"%{digitos}%" if digitos else None]
+        con = self._conexao()
+        (total,) = con.execute(f"SELECT COUNT(*) FROM clientes {where}", parametros).fetchone()
+        linhas = con.execute(
+            "SELECT tipo, id, nome, COALESCE(json_extract(dados, '$.cnpj'), json_extract(dados, '$.cpf'), ''), "
+            f"COALESCE(json_extract(dados, '$.endereco.cidade'), '') FROM clientes {where} "
+            "ORDER BY tipo DESC, id LIMIT ? OFFSET ?",
+            parametros + [por_pagina, (pagina - 1) * por_pagina],
+        )
+        chaves = ("tipo", "id", "nome", "documento", "cidade")
+        return [dict(zip(chaves, linha)) for linha in linhas], total
+
+    def _gravar_cliente(self, con, cliente):
+        con.execute(
+            "INSERT OR REPLACE INTO clientes (tipo, id, nome, documento, dados) VALUES (?, ?, ?, ?, ?)",
+            (
+                cliente["tipo"],
+                cliente["id"],
+                cliente.get("razao_social") or cliente.get("nome", ""),
+                documento_cliente(cliente),
+                json.dumps(cliente, ensure_ascii=False),
+            ),
+        )
+
+    # --- orcamentos ---
+
+    def carregar_orcamentos(self):
+        con = self._conexao()
+        orcamentos = obter_cache_leituras().obter(
+            f"{self.caminho}:orcamentos",
+            self._versao("orcamentos"),
+            lambda: [json.loads(d) for (d,) in con.execute("SELECT dados FROM orcamentos ORDER BY rowid")],
+        )
+        return {
+            "orcamentos": list(orcamentos),
+            "sequencia": dict(con.execute("SELECT chave, valor FROM sequencia")),
+        }
+
+    def salvar_orcamentos(self, data):
+        catalogo = self.carregar_catalogo()
+        orcamentos = [classificar_itens(orc, catalogo) for orc in data.get("orcamentos", [])]
+        with self._transacao(imediata=True) as con:
+            con.execute("DELETE FROM orcamentos")
+            for orc in orcamentos:
+                self._gravar_orcamento(con, orc)
+            self._regravar_metricas(con, orcamentos, catalogo)
+
+    def salvar_orcamento(self, orcamento, novo=False):
+        catalogo = self.carregar_catalogo()
+        orcamento = classificar_itens(orcamento, catalogo)
+        # IMMEDIATE: ninguem grava entre ler a versao anterior e aplicar o delta
+        with self._transacao(imediata=True) as con:
+            row = con.execute("SELECT dados FROM orcamentos WHERE numero = ?", (orcamento["numero"],)).fetchone()
+            if novo and row:
+                raise NumeroEmUso(orcamento["numero"])
+            anterior = json.loads(row[0]) if row else None
+            self._gravar_orcamento(con, orcamento)
+            self._aplicar_metricas(con, diferenca(anterior, orcamento, catalogo))
+
+    def _gravar_orcamento(self, con, orc):
+        # UPSERT preserva o rowid, entao a edicao mantem a ordem de criacao
+        con.execute(
+            "INSERT INTO orcamentos (numero, data_iso, vendedor, cliente_nome, cliente_documento, total, dados) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(numero) DO UPDATE SET data_iso = excluded.data_iso, vendedor = excluded.vendedor, "
+            "cliente_nome = excluded.cliente_nome, cliente_documento = excluded.cliente_documento, "
+            "total = excluded.total, dados = excluded.dados",
+            (
+                orc["numero"],
+                data_iso_orcamento(orc),
+                orc.get("vendedor"),
+                orc["cliente"]["nome"],
+                documento_cliente(orc["cliente"]),
+                orc.get("total"),
+                json.dumps(orc, ensure_ascii=False),
+            ),
+        )
+
+    def buscar_orcamento(self, numero):
+        row = self._conexao().execute("SELECT dados FROM orcamentos WHERE numero = ?", (numero,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def resumo_orcamentos(self):
+        return [
+            {"numero": numero, "cliente": cliente, "data": data}
+            for numero, cliente, data in self._conexao().execute(
+                "SELECT numero, cliente_nome, json_extract(dados, '$.data') FROM orcamentos ORDER BY rowid"
+            )
+        ]
+
+    def filtrar_orcamentos(self, data_inicio=None, data_fim=None, vendedor=None, cliente=None):
+        """Mesmo filtro do JSON, usando os indices de data, vendedor e documento."""
+        condicoes, parametros = [], []
+        if data_inicio:
+            condicoes.append("data_iso >= ?")
+            parametros.append(data_inicio)
+        if data_fim:
+            condicoes.append("data_iso <= ?")
+            parametros.append(data_fim)
+        if vendedor:
+            condicoes.append("vendedor = ?")
+            parametros.append(vendedor)
+        if cliente:
+            condicoes.append("(cliente_documento = ? OR cliente_nome LIKE ?)")
+            parametros += [somente_digitos(cliente) or None, f"%{cliente}%"]
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return [
+            json.loads(d)
+            for (d,) in self._conexao().execute(f"SELECT dados FROM orcamentos {where} ORDER BY rowid", parametros)
+        ]
+
+    def proximo_numero(self):
+        return self.alocador.proximo()
+
+    # --- metricas ---
+
+    def metricas(self, dimensao):
+        """Baldes da dimensao direto da tabela metricas (O(baldes))."""
+        return [
+            linha_metrica(chave, dict(zip(CAMPOS, campos)))
+            for chave, *campos in self._conexao().execute(
+                f"SELECT chave, {', '.join(CAMPOS)} FROM metricas WHERE dimensao = ? ORDER BY chave", (dimensao,)
+            )
+        ]
+
+    def reconstruir_metricas(self):
+        catalogo = self.carregar_catalogo()
+        with self._transacao(imediata=True) as con:
+            orcamentos = [json.loads(d) for (d,) in con.execute("SELECT dados FROM orcamentos ORDER BY rowid")]
+            self._regravar_metricas(con, orcamentos, catalogo)
+
+    def _regravar_metricas(self, con, orcamentos, catalogo):
+        con.execute("DELETE FROM metricas")
+        con.executemany(
+            f"INSERT INTO metricas (dimensao, chave, {', '.join(CAMPOS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (dimensao, chave, *(campos[campo] for campo in CAMPOS))
+                for dimensao, baldes in baldes_de(orcamentos, catalogo).items()
+                for chave, campos in baldes.items()
+            ],
+        )
+
+    def _aplicar_metricas(self, con, delta):
+        """Soma o delta em cada balde (UPSERT aditivo) e apaga os que ficaram vazios."""
+        soma = ", ".join(f"{campo} = {campo} + excluded.{campo}" for campo in CAMPOS)
+        con.executemany(
+            f"INSERT INTO metricas (dimensao, chave, {', '.join(CAMPOS)}) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT(dimensao, chave) DO UPDATE SET {soma}",
+            [(dimensao, chave, *(campos[campo] for campo in CAMPOS)) for (dimensao, chave), campos in delta.items()],
+        )
+        con.execute("DELETE FROM metricas WHERE orcamentos <= 0")
+
+
+class _Transacao:
+    """BEGIN/COMMIT explicito (conexao em autocommit); ROLLBACK em erro."""
+
+    def __init__(self, con, imediata):
+        self.con = con
+        self.imediata = imediata
+
+    def __enter__(self):
+        self.con.execute("BEGIN IMMEDIATE" if self.imediata else "BEGIN")
+        return self.con
+
+    def __exit__(self, tipo, *_):
+        self.con.execute("ROLLBACK" if tipo else "COMMIT")
+
+
+# === SELECAO DO BACKEND ===
+
+_repositorio = None
+_repositorio_lock = threading.Lock()
+
+
+def obter_repositorio():
+    """Repositorio unico por processo, conforme SALESFLOW_BACKEND."""
+    global _repositorio
+    with _repositorio_lock:
+        if _repositorio is None:
+            _repositorio = RepositorioSQLite() if BACKEND == "sqlite" else RepositorioJSON()
+        return _repositorio
+
+
+def migrar_json_para_sqlite(banco=ARQUIVO_BANCO):
+    """Importa catalogo, clientes, orcamentos e contadores ORS para o SQLite."""
+    origem = RepositorioJSON()
+    destino = RepositorioSQLite(banco, catalogo_inicial=None)
+
+    destino.salvar_catalogo(origem.carregar_catalogo())
+    clientes = origem.carregar_clientes()
+    destino.salvar_clientes(clientes)
+    orcamentos = origem.carregar_orcamentos()
+    destino.salvar_orcamentos(orcamentos)
+
+    try:
+        with open(obter_alocador().arquivo, "r", encoding="utf-8") as f:
+            sequencia = json.load(f)
+    except FileNotFoundError:
+        sequencia = {}
+    with destino._transacao() as con:
+        con.executemany(
+            "INSERT OR REPLACE INTO sequencia (chave, valor) VALUES (?, ?)", list(sequencia.items())
+        )
+
+    return {
+        "empresas": len(clientes["empresas"]),
+        "pessoas": len(clientes["pessoas"]),
+        "orcamentos": len(orcamentos["orcamentos"]),
+        "sequencias": len(sequencia),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ferramentas de persistencia do SalesFlow")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_migrar = sub.add_parser("migrar", help="importa os arquivos JSON para o SQLite")
+    p_migrar.add_argument("--banco", default=ARQUIVO_BANCO)
+    sub.add_parser("reconstruir-metricas", help="recalcula as metricas de vendas a partir dos orcamentos")
+    args = parser.parse_args()
+
+    if args.comando == "migrar":
+        totais = migrar_json_para_sqlite(args.banco)
+        print(f"Migrado para {args.banco}: " + ", ".join(f"{v} {k}" for k, v in totais.items()))
+    elif args.comando == "reconstruir-metricas":
+        obter_repositorio().reconstruir_metricas()
+        print("Metricas de vendas reconstruidas a partir dos orcamentos.")
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Os modulos do app ficam na raiz do repositorio
+sys.path.insert(0, RAIZ)
+
+from armazenamento import reiniciar_caches  # noqa: E402
+from repositorio import RepositorioJSON, RepositorioSQLite  # noqa: E402
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def repo(request, tmp_path, monkeypatch):
+    """Repositorio dos dois backends num diretorio vazio, so com o catalogo."""
+    shutil.copy(os.path.join(RAIZ, "catalogo.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    reiniciar_caches()
+    yield RepositorioJSON() if request.param == "json" else RepositorioSQLite(str(tmp_path / "t.db"))
+    reiniciar_caches()
+
+
+class ServidorFalso:
+    """
+    API local para os testes de rede: respostas[caminho] e uma lista de
+    (status, corpo JSON) entregues em ordem (a ultima se repete);
+    chamadas[caminho] conta as requisicoes recebidas.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.respostas = {}
+        self.chamadas = Counter()
+        self._lock = threading.Lock()
+
+    def proxima(self, caminho):
+        with self._lock:
+            self.chamadas[caminho] += 1
+            fila = self.respostas.get(caminho) or [(404, {})]
+            return fila.pop(0) if len(fila) > 1 else fila[0]
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, corpo = self.server.falso.proxima(self.path)
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    """ServidorFalso num http.server em 127.0.0.1, porta livre."""
+    http = ThreadingHTTPServer(("127.0.0.1", 0), _Manipulador)
+    http.falso = ServidorFalso(f"http://127.0.0.1:{http.server_address[1]}")
+    threading.Thread(target=http.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield http.falso
+    http.shutdown()
+    http.server_close()
@@ -0,0 +1,56 @@
+import json
+
+from armazenamento import DiarioOrcamentos
+
+
+def _diario(tmp_path):
+    return DiarioOrcamentos(str(tmp_path / "orcamentos.json"), str(tmp_path / "orcamentos.jsonl"),
+                            compactar_em_segundo_plano=False)
+
+
+def _numeros(diario):
+    return [orc["numero"] for orc in diario.carregar()["orcamentos"]]
+
+
+def test_linha_cortada_nao_esconde_nem_perde_registros_seguintes(tmp_path):
+    escritor = _diario(tmp_path)
+    escritor.salvar_orcamento({"numero": "A"})
+    # Escrita que morreu no meio: linha sem \n no fim do diario
+    with open(tmp_path / "orcamentos.jsonl", "ab") as f:
+        f.write(b'{"op": "orcamento", "dados": {"numero": "B"')
+
+    escritor.salvar_orcamento({"numero": "C"})
+    escritor.salvar_orcamento({"numero": "D"})
+
+    leitor = _diario(tmp_path)
+    assert _numeros(leitor) == ["A", "C", "D"]
+    assert leitor.buscar("C") == {"numero": "C"}
+
+    leitor.compactar()
+    with open(tmp_path / "orcamentos.json", encoding="utf-8") as f:
+        assert [orc["numero"] for orc in json.load(f)["orcamentos"]] == ["A", "C", "D"]
+    assert (tmp_path / "orcamentos.jsonl").read_bytes() == b""
+    assert _numeros(_diario(tmp_path)) == ["A", "C", "D"]
+
+
+def test_linha_invalida_no_meio_e_pulada(tmp_path):
+    with open(tmp_path / "orcamentos.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "orcamento", "dados": {"numero": "A"}}) + "\n")
+        f.write("{lixo\n")
+        f.write(json.dumps({"op": "orcamento", "dados": {"numero": "B"}}) + "\n")
+
+    assert [orc["numero"] for orc in _diario(tmp_path).carregar_sem_trava()["orcamentos"]] == ["A", "B"]
+    assert not (tmp_path / "orcamentos.json.lock").exists()
+    assert _numeros(_diario(tmp_path)) == ["A", "B"]
+
+
+def test_ultima_linha_incompleta_espera_o_resto(tmp_path):
+    diario = _diario(tmp_path)
+    diario.salvar_orcamento({"numero": "A"})
+    linha = json.dumps({"op": "orcamento", "dados": {"numero": "B"}}) + "\n"
+    with open(tmp_path / "orcamentos.jsonl", "a", encoding="utf-8") as f:
+        f.write(linha[:10])
+        f.flush()
+        assert _numeros(diario) == ["A"]
+        f.write(linha[10:])
+    assert _numeros(diario) == ["A", "B"]
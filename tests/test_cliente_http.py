@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from cliente_http import ClienteHTTP, ErroHTTP
+
+
+def _cliente(**kwargs):
+    return ClienteHTTP(**{"backoff_base": 0.01, "backoff_max": 0.02, "timeout": 2, "prazo": 5, **kwargs})
+
+
+def test_retenta_5xx_e_registra_latencia_de_cada_tentativa(servidor):
+    servidor.respostas["/x"] = [(503, {}), (200, {"ok": True})]
+    cliente = _cliente()
+
+    resposta = cliente.get(f"{servidor.url}/x", endpoint="teste")
+    assert resposta.status_code == 200 and resposta.json() == {"ok": True}
+    assert servidor.chamadas["/x"] == 2
+    assert cliente.percentis()["teste"]["n"] == 2
+    assert list(cliente.circuitos().values()) == [{"estado": "fechado", "falhas": 0}]
+
+
+def test_4xx_volta_sem_retentar(servidor):
+    cliente = _cliente()
+    assert cliente.get(f"{servidor.url}/nada").status_code == 404
+    assert servidor.chamadas["/nada"] == 1
+
+
+def test_circuito_abre_apos_falhas_e_fecha_no_teste_do_meio_aberto(servidor):
+    servidor.respostas["/x"] = [(503, {}), (503, {}), (200, {})]
+    cliente = _cliente(tentativas=1, limite_falhas=2, tempo_aberto=0.2)
+
+    for _ in range(2):
+        with pytest.raises(ErroHTTP) as erro:
+            cliente.get(f"{servidor.url}/x")
+        assert erro.value.tipo == "status"
+    with pytest.raises(ErroHTTP) as erro:
+        cliente.get(f"{servidor.url}/x")
+    assert erro.value.tipo == "circuito_aberto"
+    assert servidor.chamadas["/x"] == 2  # aberto: nem chega ao servidor
+
+    time.sleep(0.25)
+    assert cliente.get(f"{servidor.url}/x").status_code == 200
+    assert list(cliente.circuitos().values())[0]["estado"] == "fechado"
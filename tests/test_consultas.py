@@ -0,0 +1,81 @@
+import time
+
+from cliente_http import ClienteHTTP
+from consultas import CacheTTL, ConsultaCNPJ
+
+CNPJ = "11222333000181"
+CAMINHO = f"/cnpj/{CNPJ}"
+
+
+def _consulta(servidor, arquivo, ttl=0.2, ttl_negativo=0.2, janela=0.0):
+    cache = CacheTTL("cnpj", ttl, ttl_negativo, janela_revalidacao=janela, arquivo=str(arquivo))
+    http = ClienteHTTP(tentativas=1, timeout=2, prazo=5)
+    return ConsultaCNPJ(f"{servidor.url}/cnpj", cache=cache, http=http)
+
+
+def _contadores(consulta, *nomes):
+    estatisticas = consulta.estatisticas()
+    return {nome: estatisticas[nome] for nome in nomes}
+
+
+def test_ttl_vencido_volta_a_rede(servidor, tmp_path):
+    servidor.respostas[CAMINHO] = [(200, {"razao_social": "ACME"})]
+    consulta = _consulta(servidor, tmp_path / "cache.db")
+
+    assert consulta.consultar(CNPJ).dados == {"razao_social": "ACME"}
+    assert consulta.consultar(CNPJ).dados == {"razao_social": "ACME"}
+    assert servidor.chamadas[CAMINHO] == 1
+    time.sleep(0.25)
+    assert consulta.consultar(CNPJ).dados == {"razao_social": "ACME"}
+    assert servidor.chamadas[CAMINHO] == 2
+    assert _contadores(consulta, "misses", "hits_memoria", "hits_vencidos") == {
+        "misses": 2, "hits_memoria": 1, "hits_vencidos": 0}
+
+    # Outro processo (cache em memoria vazio) le do disco
+    outra = _consulta(servidor, tmp_path / "cache.db")
+    assert outra.consultar(CNPJ).dados == {"razao_social": "ACME"}
+    assert servidor.chamadas[CAMINHO] == 2
+    assert _contadores(outra, "hits_disco", "misses") == {"hits_disco": 1, "misses": 0}
+
+
+def test_nao_encontrado_fica_no_cache_negativo_ate_o_ttl_proprio(servidor, tmp_path):
+    consulta = _consulta(servidor, tmp_path / "cache.db", ttl=60, ttl_negativo=0.2, janela=60)
+
+    assert consulta.consultar(CNPJ).erro == "nao_encontrado"
+    assert consulta.consultar(CNPJ).erro == "nao_encontrado"
+    assert servidor.chamadas[CAMINHO] == 1
+    assert _contadores(consulta, "misses", "hits_memoria", "negativos") == {
+        "misses": 1, "hits_memoria": 1, "negativos": 2}
+
+    # Negativo vencido nao e servido durante a revalidacao: vai a rede na hora
+    servidor.respostas[CAMINHO] = [(200, {"razao_social": "NOVA"})]
+    time.sleep(0.25)
+    assert consulta.consultar(CNPJ).dados == {"razao_social": "NOVA"}
+    assert servidor.chamadas[CAMINHO] == 2
+
+
+def test_vencido_na_janela_e_servido_e_atualizado_em_segundo_plano(servidor, tmp_path):
+    servidor.respostas[CAMINHO] = [(200, {"versao": 1})]
+    consulta = _consulta(servidor, tmp_path / "cache.db", ttl=0.2, janela=60)
+    assert consulta.consultar(CNPJ).dados == {"versao": 1}
+
+    servidor.respostas[CAMINHO] = [(200, {"versao": 2})]
+    time.sleep(0.25)
+    assert consulta.consultar(CNPJ).dados == {"versao": 1}  # na hora, sem esperar a rede
+    assert _contadores(consulta, "hits_vencidos", "revalidacoes") == {"hits_vencidos": 1, "revalidacoes": 1}
+
+    limite = time.monotonic() + 5
+    while servidor.chamadas[CAMINHO] < 2 or consulta.cache._revalidando:
+        assert time.monotonic() < limite, "revalidacao nao terminou"
+        time.sleep(0.01)
+    assert consulta.consultar(CNPJ).dados == {"versao": 2}
+    assert servidor.chamadas[CAMINHO] == 2
+
+
+def test_falha_da_rede_nao_vai_para_o_cache(servidor, tmp_path):
+    servidor.respostas[CAMINHO] = [(503, {}), (200, {"razao_social": "ACME"})]
+    consulta = _consulta(servidor, tmp_path / "cache.db")
+
+    assert consulta.consultar(CNPJ).erro == "status"
+    assert consulta.consultar(CNPJ).dados == {"razao_social": "ACME"}
+    assert _contadores(consulta, "misses", "erros", "negativos") == {"misses": 2, "erros": 1, "negativos": 0}
@@ -0,0 +1,30 @@
+import io
+import json
+
+from gerar_pdf import ler_orcamentos
+
+
+LINHAS = [
+    {"numero": "ORS1", "versao": 1},
+    {"numero": "ORS2", "versao": 1},
+    {"op": "orcamento", "dados": {"numero": "ORS1", "versao": 2}},
+    {"sem": "numero"},
+    {"numero": "ORS3", "versao": 1},
+    {"numero": "ORS2", "versao": 2},
+]
+ESPERADO = [("ORS1", 2), (None, None), ("ORS3", 1), ("ORS2", 2)]
+
+
+def _resumo(orcamentos):
+    return [(orc.get("numero"), orc.get("versao")) for orc in orcamentos]
+
+
+def test_ultima_versao_de_cada_numero_na_posicao_dela(tmp_path):
+    arquivo = tmp_path / "lote.jsonl"
+    arquivo.write_text("".join(json.dumps(linha) + "\n" for linha in LINHAS), encoding="utf-8")
+    assert _resumo(ler_orcamentos(str(arquivo))) == ESPERADO
+
+
+def test_entrada_padrao_e_lida_duas_vezes_pela_copia(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(linha) + "\n" for linha in LINHAS)))
+    assert _resumo(ler_orcamentos("-")) == ESPERADO
@@ -0,0 +1,44 @@
+from armazenamento import copia_editavel
+from metricas import DIMENSOES
+
+
+def _orcamento(numero, itens):
+    return {
+        "numero": numero, "data": "10/03/2026", "vendedor": "Ana", "cliente": {"nome": "CLIENTE"},
+        "itens": itens, "total": sum(item["valor_total"] for item in itens),
+    }
+
+
+def _item(descricao, quantidade, preco):
+    return {"descricao": descricao, "quantidade": quantidade, "preco_unitario": preco,
+            "valor_total": quantidade * preco}
+
+
+def _metricas(repo):
+    return {dimensao: repo.metricas(dimensao) for dimensao in DIMENSOES}
+
+
+def test_incremental_igual_a_reconstrucao_depois_de_mudar_o_catalogo(repo):
+    repo.salvar_orcamento(_orcamento("ORS1", [_item("BONE BORDADO P", 1, 100.0)]))
+    repo.adicionar_produto({"categoria": "Acessorios", "nome": "BONE BORDADO", "preco": 100.0})
+
+    # Edicao como a do app: itens da versao gravada + um item novo
+    orc = copia_editavel(repo.buscar_orcamento("ORS1"))
+    orc["itens"][0]["quantidade"] = 2
+    orc["itens"][0]["valor_total"] = 200.0
+    orc["itens"].append(_item("BONE BORDADO M", 1, 100.0))
+    orc["total"] = 300.0
+    repo.salvar_orcamento(orc)
+
+    incremental = _metricas(repo)
+    repo.reconstruir_metricas()
+    assert incremental == _metricas(repo)
+
+    produtos = {linha["chave"]: linha["valor"] for linha in incremental["produto"]}
+    assert produtos == {"Avulso": 200.0, "BONE BORDADO": 100.0}
+
+
+def test_itens_avulsos_dividem_um_balde(repo):
+    repo.salvar_orcamento(_orcamento("ORS1", [_item(f"PECA {i}", 1, 10.0) for i in range(20)]))
+    assert [linha["chave"] for linha in repo.metricas("produto")] == ["Avulso"]
+    assert repo.buscar_orcamento("ORS1")["itens"][0]["produto"] == "Avulso"
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from armazenamento import AlocadorNumeros, NumeroEmUso, obter_cache_leituras
+from repositorio import RepositorioJSON
+
+
+def _orcamento(numero, cliente="CLIENTE"):
+    return {"numero": numero, "data": "10/03/2026", "vendedor": "Ana", "cliente": {"nome": cliente},
+            "itens": [], "total": 0}
+
+
+def _alocador(repo):
+    return getattr(repo, "alocador", None) or AlocadorNumeros()
+
+
+def test_sem_contador_comeca_depois_do_maior_numero_do_mes(repo):
+    for numero in ("ORS2603100", "ORS2603104", "ORS2603101", "ORS2602150"):
+        repo.salvar_orcamento(_orcamento(numero))
+
+    alocador = _alocador(repo)
+    assert alocador.proximo(datetime(2026, 3, 10)) == "ORS2603105"
+    assert alocador.proximo(datetime(2026, 3, 10)) == "ORS2603106"
+    assert alocador.proximo(datetime(2026, 4, 1)) == "ORS2604100"
+
+
+def test_orcamento_novo_nao_substitui_numero_existente(repo):
+    repo.salvar_orcamento(_orcamento("ORS2603100", "PRIMEIRO"))
+
+    with pytest.raises(NumeroEmUso):
+        repo.salvar_orcamento(_orcamento("ORS2603100", "SEGUNDO"), novo=True)
+    assert repo.buscar_orcamento("ORS2603100")["cliente"]["nome"] == "PRIMEIRO"
+    assert len(repo.carregar_orcamentos()["orcamentos"]) == 1
+
+    # Edicao (sem novo) continua substituindo pelo numero
+    repo.salvar_orcamento(_orcamento("ORS2603100", "EDITADO"))
+    assert repo.buscar_orcamento("ORS2603100")["cliente"]["nome"] == "EDITADO"
+
+
+def test_pagina_clientes_so_refaz_a_projecao_quando_o_arquivo_muda(repo):
+    for i in range(30):
+        repo.adicionar_cliente({"tipo": "PJ", "razao_social": f"EMPRESA {i}", "cnpj": f"{i:02d}.111.222/0001-00"})
+    repo.adicionar_cliente({"tipo": "PF", "nome": "Ana Silva", "cpf": "123.456.789-00"})
+
+    pagina, total = repo.pagina_clientes("", 2, 20)
+    assert total == 31 and [r["nome"] for r in pagina][-1] == "Ana Silva"
+    assert repo.pagina_clientes("silva", 1, 20)[1] == 1
+    assert repo.pagina_clientes("456.78", 1, 20)[0][0]["nome"] == "Ana Silva"
+    assert repo.pagina_clientes("empresa 1", 1, 5)[1] == 11
+
+    if isinstance(repo, RepositorioJSON):
+        antes = obter_cache_leituras().estatisticas()["clientes.json:resumos"]["parses"]
+        repo.pagina_clientes("", 1, 20)
+        repo.pagina_clientes("empresa 1", 2, 5)
+        assert obter_cache_leituras().estatisticas()["clientes.json:resumos"]["parses"] == antes
+
+    repo.adicionar_cliente({"tipo": "PF", "nome": "Bruno Silva", "cpf": "987.654.321-00"})
+    assert [r["nome"] for r in repo.pagina_clientes("silva", 1, 20)[0]] == ["Ana Silva", "Bruno Silva"]